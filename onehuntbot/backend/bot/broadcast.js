@@ -0,0 +1,50 @@
+const User = require('../models/User.model');
+
+// Broadcast a message to every matching user
+// Recipients are read in _id-ordered batches (a keyset scan, so a long,
+// throttled broadcast never holds a cursor open) and fed to the outbox at
+// low priority, pausing whenever its queue is above the high-water mark.
+const BATCH_SIZE = parseInt(process.env.BROADCAST_BATCH_SIZE) || 1000;
+const HIGH_WATER = parseInt(process.env.BROADCAST_HIGH_WATER) || 5000;
+
+const broadcast = async (outbox, { filter = { isActive: true, isBanned: false }, render, options = {}, paid = false }) => {
+  const stats = { queued: 0, sent: 0, failed: 0, startedAt: new Date() };
+  const sendOptions = paid ? { ...options, allow_paid_broadcast: true } : options;
+
+  let inFlight = 0;
+  let settle = null;
+  const settled = () => {
+    inFlight--;
+    if (inFlight === 0 && settle) settle();
+  };
+
+  let lastId = null;
+  for (;;) {
+    const batch = await User.find(lastId ? { ...filter, _id: { $gt: lastId } } : filter)
+      .select('telegramId username firstName')
+      .sort({ _id: 1 })
+      .limit(BATCH_SIZE)
+      .lean();
+
+    if (batch.length === 0) break;
+    lastId = batch[batch.length - 1]._id;
+
+    for (const user of batch) {
+      await outbox.waitForRoom(HIGH_WATER);
+
+      inFlight++;
+      stats.queued++;
+      outbox.send(user.telegramId, render(user), sendOptions, { priority: 'low' })
+        .then(() => { stats.sent++; }, () => { stats.failed++; })
+        .finally(settled);
+    }
+  }
+
+  if (inFlight > 0) await new Promise(resolve => { settle = resolve; });
+
+  stats.finishedAt = new Date();
+  console.log(`📣 Broadcast finished: ${stats.sent} sent, ${stats.failed} failed`);
+  return stats;
+};
+
+module.exports = broadcast;
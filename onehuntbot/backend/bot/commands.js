@@ -0,0 +1,152 @@
+const User = require('../models/User.model');
+const LRUCache = require('../utils/lruCache');
+const events = require('../services/events.service');
+const taskCatalog = require('../services/taskCatalog.service');
+const leaderboardService = require('../services/leaderboard.service');
+const referralService = require('../services/referral.service');
+
+// Telegram command handlers
+// Each handler is awaited by the update queue, which is what keeps replies
+// to one chat in order. Replies go through the rate-limited outbox, and
+// reads come from caches (user card, task catalog, leaderboard snapshot).
+const commands = [];
+
+const command = (pattern, handler) => commands.push({ pattern, handler });
+
+const USER_FIELDS = 'username firstName balance totalEarned level xp streak referralCode ' +
+  'directReferralCount indirectReferralCount isBanned';
+
+// Short-lived cache of the user card by Telegram id
+const users = new LRUCache({
+  max: 10000,
+  ttl: parseInt(process.env.BOT_USER_CACHE_TTL_MS) || 15 * 1000
+});
+
+events.on('user:updated', (user) => {
+  if (user && user.telegramId) users.delete(String(user.telegramId));
+});
+
+const findUser = async (telegramId) => {
+  const key = String(telegramId);
+  const cached = users.get(key);
+  if (cached !== undefined) return cached;
+
+  const user = await User.findOne({ telegramId: key }).select(USER_FIELDS).lean();
+  users.set(key, user);
+  return user;
+};
+
+const openAppKeyboard = (text = '🚀 Open App') => ({
+  reply_markup: {
+    inline_keyboard: [[
+      { text, web_app: { url: process.env.BASE_URL } }
+    ]]
+  }
+});
+
+// Run a handler only for registered users
+const registered = handler => async (outbox, msg, match) => {
+  const user = await findUser(msg.from.id);
+
+  if (!user || user.isBanned) {
+    await outbox.send(msg.chat.id, 'You are not registered yet. Open the app to create your account!', openAppKeyboard());
+    return;
+  }
+
+  await handler(outbox, msg, user, match);
+};
+
+command(/^\/start\b/, async (outbox, msg) => {
+  const username = msg.from.username || msg.from.first_name;
+
+  await outbox.send(msg.chat.id, `Welcome to XCX Wallet Bot, ${username}! 🎉\n\nOpen the app to get started!`, openAppKeyboard());
+});
+
+command(/^\/help\b/, async (outbox, msg) => {
+  const helpText = `
+🤖 *XCX Wallet Bot Commands*
+
+/start - Start the bot
+/help - Show this help message
+/balance - Check your balance
+/tasks - View available tasks
+/referral - Get your referral link
+/leaderboard - View top users
+/withdraw - Withdraw your earnings
+  `;
+
+  await outbox.send(msg.chat.id, helpText, { parse_mode: 'Markdown' });
+});
+
+command(/^\/balance\b/, registered(async (outbox, msg, user) => {
+  await outbox.send(msg.chat.id, [
+    '💰 *Your Balance*',
+    '',
+    `Balance: ${user.balance} coins`,
+    `Total earned: ${user.totalEarned} coins`,
+    `Level ${user.level} (${user.xp} XP)`,
+    `Streak: ${user.streak} days 🔥`
+  ].join('\n'), { parse_mode: 'Markdown' });
+}));
+
+command(/^\/tasks\b/, async (outbox, msg) => {
+  const tasks = (await taskCatalog.getActive()).slice(0, 10);
+
+  if (tasks.length === 0) {
+    await outbox.send(msg.chat.id, 'No tasks available right now. Check back soon!');
+    return;
+  }
+
+  const lines = tasks.map(task => `• ${task.title} (+${task.reward.coins} coins)`);
+  await outbox.send(msg.chat.id, `📋 Available tasks:\n\n${lines.join('\n')}`,
+    openAppKeyboard('✅ Complete tasks'));
+});
+
+command(/^\/referral\b/, registered(async (outbox, msg, user) => {
+  const [direct, indirect = 0] = referralService.LEVEL_REWARDS;
+
+  await outbox.send(msg.chat.id, [
+    '👥 Invite friends and earn!',
+    '',
+    `Your link: ${process.env.BASE_URL}?ref=${user.referralCode}`,
+    '',
+    `Direct referrals: ${user.directReferralCount || 0} (+${direct} coins each)`,
+    `Indirect referrals: ${user.indirectReferralCount || 0} (+${indirect} coins each)`
+  ].join('\n'));
+}));
+
+command(/^\/leaderboard\b/, async (outbox, msg) => {
+  const { rows } = await leaderboardService.getBoard('balance', 10);
+
+  const lines = rows.map(({ rank, user }) =>
+    `${rank}. ${user.username || user.firstName} - ${user.balance} coins`);
+  await outbox.send(msg.chat.id, `🏆 Top users\n\n${lines.join('\n') || 'No users yet'}`);
+});
+
+command(/^\/withdraw\b/, registered(async (outbox, msg, user) => {
+  const minWithdrawal = parseInt(process.env.MIN_WITHDRAWAL_AMOUNT) || 100;
+
+  if (user.balance < minWithdrawal) {
+    await outbox.send(msg.chat.id,
+      `Your balance is ${user.balance} coins. The minimum withdrawal is ${minWithdrawal} coins.`);
+    return;
+  }
+
+  await outbox.send(msg.chat.id,
+    `You can withdraw up to ${user.balance} coins. Withdrawals need a wallet address, so finish in the app:`,
+    openAppKeyboard('💸 Withdraw'));
+}));
+
+// Route one update to the first matching command handler
+exports.dispatch = async (outbox, update) => {
+  const msg = update.message;
+  if (!msg || typeof msg.text !== 'string') return;
+
+  for (const { pattern, handler } of commands) {
+    const match = msg.text.match(pattern);
+    if (match) {
+      await handler(outbox, msg, match);
+      return;
+    }
+  }
+};
@@ -0,0 +1,82 @@
+const TelegramBot = require('node-telegram-bot-api');
+const UpdateQueue = require('./updateQueue');
+const Outbox = require('./outbox');
+const broadcast = require('./broadcast');
+const webhookHandler = require('./webhook');
+const LRUCache = require('../utils/lruCache');
+const { dispatch } = require('./commands');
+const cluster = require('../services/cluster.service');
+
+// Telegram bot ingestion
+// BOT_MODE=webhook - updates arrive on POST /webhook (any number of web
+//                    replicas, no polling)
+// BOT_MODE=polling - this process long-polls Telegram (single instance only)
+// BOT_MODE=off     - send-only
+// Either way updates go through one bounded queue with per-chat ordering.
+// In cluster mode only the leader worker talks to Telegram: the others
+// forward webhook updates to it, so rate limits and ordering stay global.
+const MODE = cluster.isLeader() ? process.env.BOT_MODE || 'polling' : 'off';
+
+const bot = new TelegramBot(process.env.TELEGRAM_BOT_TOKEN, {
+  polling: MODE === 'polling',
+  ...(process.env.TELEGRAM_API_URL ? { baseApiUrl: process.env.TELEGRAM_API_URL } : {})
+});
+
+// All outbound messages are rate limited through the outbox
+const outbox = new Outbox({
+  bot,
+  globalRate: parseInt(process.env.TELEGRAM_GLOBAL_RATE) || 30,
+  chatRate: parseFloat(process.env.TELEGRAM_CHAT_RATE) || 1,
+  chatBurst: parseInt(process.env.TELEGRAM_CHAT_BURST) || 3
+});
+
+// Telegram redelivers updates it did not see acknowledged, so the queue
+// remembers recent update_ids
+const updateQueue = new UpdateQueue({
+  handler: update => dispatch(outbox, update),
+  concurrency: parseInt(process.env.BOT_WORKER_CONCURRENCY) || 8,
+  maxSize: parseInt(process.env.BOT_QUEUE_SIZE) || 10000,
+  recent: new LRUCache({ max: 10000, ttl: 10 * 60 * 1000 })
+});
+
+// Accept an update for processing; resolves false when the (leader's)
+// queue is full or the leader cannot be reached
+const ingest = async (update) => {
+  if (!cluster.isLeader()) return cluster.askLeader('bot:update', update);
+  return updateQueue.push(update);
+};
+
+if (MODE === 'polling') {
+  bot.on('message', message => updateQueue.push({ message }));
+}
+
+cluster.subscribe('bot:update', update => updateQueue.push(update));
+
+// Register the webhook with Telegram (webhook mode, if a URL is configured)
+const registerWebhook = async () => {
+  if (MODE !== 'webhook' || !process.env.BOT_WEBHOOK_URL) return;
+
+  await bot.setWebHook(process.env.BOT_WEBHOOK_URL, {
+    ...(process.env.TELEGRAM_WEBHOOK_SECRET ? { secret_token: process.env.TELEGRAM_WEBHOOK_SECRET } : {})
+  });
+  console.log('✅ Telegram webhook registered');
+};
+
+// Stop taking updates and finish the ones already queued
+const stop = async () => {
+  if (MODE === 'polling') await bot.stopPolling();
+  await updateQueue.onIdle();
+  await outbox.drain();
+};
+
+module.exports = {
+  bot,
+  MODE,
+  outbox,
+  broadcast: params => broadcast(outbox, params),
+  ingest,
+  registerWebhook,
+  stop,
+  updateQueue,
+  webhook: webhookHandler({ ingest, secret: process.env.TELEGRAM_WEBHOOK_SECRET })
+};
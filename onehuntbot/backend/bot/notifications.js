@@ -0,0 +1,52 @@
+const telegram = require('./index');
+const cluster = require('../services/cluster.service');
+
+// User-facing bot notifications
+// Fire-and-forget: a notification that cannot be delivered (user blocked
+// the bot, outbox full) never fails the request that triggered it. In
+// cluster mode they are forwarded to the leader worker, which owns the
+// outbox and its rate limits; arguments must therefore be plain data.
+const quietly = promise => promise.catch(error =>
+  console.error('❌ Notification failed:', error.message));
+
+const senders = {
+  // Several signups in quick succession collapse into one message
+  referralJoined: ({ telegramId, bonus }) => quietly(telegram.outbox.send(
+    telegramId,
+    count => count === 1
+      ? `🎉 A friend joined with your referral link! +${bonus} coins`
+      : `🎉 ${count} friends joined with your referral link! +${bonus * count} coins`,
+    {},
+    { coalesceKey: 'referral', priority: 'low' }
+  )),
+
+  // Runs in the background on the leader
+  taskAnnounced: ({ title, coins, paid }) => quietly(telegram.broadcast({
+    render: () => `🆕 New task: ${title}\n\nEarn ${coins} coins. Open the app to complete it!`,
+    options: {
+      reply_markup: {
+        inline_keyboard: [[
+          { text: '🚀 Open App', web_app: { url: process.env.BASE_URL } }
+        ]]
+      }
+    },
+    paid
+  }))
+};
+
+const notify = (name, params) => cluster.sendToLeader('bot:notify', { name, params });
+
+cluster.subscribe('bot:notify', ({ name, params }) => {
+  if (senders[name]) senders[name](params);
+});
+
+// Tell a referrer someone joined with their code
+exports.referralJoined = (referrer, bonus) => {
+  if (!referrer || !referrer.telegramId) return;
+  notify('referralJoined', { telegramId: referrer.telegramId, bonus });
+};
+
+// Announce a new task to every active user
+exports.taskAnnounced = (task, { paid = process.env.TELEGRAM_PAID_BROADCAST === 'true' } = {}) => {
+  notify('taskAnnounced', { title: task.title, coins: task.reward.coins, paid });
+};
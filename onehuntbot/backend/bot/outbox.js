@@ -0,0 +1,198 @@
+const TokenBucket = require('../utils/tokenBucket');
+const LRUCache = require('../utils/lruCache');
+
+// Outbound message scheduler
+// Every bot message goes through here so we stay inside Telegram's limits:
+// a global token bucket (~30 msg/s, higher with paid broadcasts) and one
+// bucket per chat (~1 msg/s). Messages to one chat are sent one at a time,
+// in order; interactive replies jump ahead of broadcast traffic. A 429
+// pauses sending for the retry_after Telegram asks for.
+const MAX_ATTEMPTS = 3;
+
+class Outbox {
+  constructor({ bot, globalRate = 30, chatRate = 1, chatBurst = 3, maxPending = 50000 }) {
+    this.bot = bot;
+    this.maxPending = maxPending;
+    this.globalBucket = new TokenBucket({ rate: globalRate });
+
+    // A chat's bucket is only needed until it would have refilled
+    this.chatRate = chatRate;
+    this.chatBurst = chatBurst;
+    this.chatBuckets = new LRUCache({
+      max: 100000,
+      ttl: new TokenBucket({ rate: chatRate, capacity: chatBurst }).idleMs
+    });
+
+    this.chats = new Map(); // chat id -> { items, queued, waiting, sending }
+    this.ready = { high: [], low: [] };
+    this.pending = 0;
+    this.pausedUntil = 0;
+    this.timer = null;
+    this.roomWaiters = [];
+    this.stats = { sent: 0, failed: 0, coalesced: 0, throttled: 0 };
+  }
+
+  // Queue a message. `text` may be a function of the coalesced count: with a
+  // coalesceKey, a second notification for the same chat and key that is still
+  // queued updates the pending message instead of sending another one.
+  send(chatId, text, options = {}, { coalesceKey, priority = 'high' } = {}) {
+    const key = String(chatId);
+    let chat = this.chats.get(key);
+
+    if (coalesceKey && chat) {
+      const existing = chat.items.find(item => item.coalesceKey === coalesceKey);
+      if (existing) {
+        existing.count += 1;
+        existing.text = typeof text === 'function' ? text(existing.count) : text;
+        existing.options = options;
+        this.stats.coalesced++;
+        return existing.promise;
+      }
+    }
+
+    if (this.pending >= this.maxPending) {
+      return Promise.reject(new Error('Outbox is full'));
+    }
+
+    const item = {
+      chatId,
+      text: typeof text === 'function' ? text(1) : text,
+      options,
+      coalesceKey,
+      priority,
+      count: 1,
+      attempts: 0
+    };
+    item.promise = new Promise((resolve, reject) => {
+      item.resolve = resolve;
+      item.reject = reject;
+    });
+
+    if (!chat) {
+      chat = { items: [], queued: false, waiting: false, sending: false };
+      this.chats.set(key, chat);
+    }
+
+    // Replies go ahead of queued broadcast messages for the same chat
+    const firstLow = priority === 'high' ? chat.items.findIndex(queued => queued.priority === 'low') : -1;
+    if (firstLow === -1) chat.items.push(item);
+    else chat.items.splice(firstLow, 0, item);
+
+    this.pending++;
+    this.markReady(key, chat);
+    this.pump();
+    return item.promise;
+  }
+
+  // Resolves once fewer than `limit` messages are queued (broadcast backpressure)
+  waitForRoom(limit) {
+    if (this.pending < limit) return Promise.resolve();
+    return new Promise(resolve => this.roomWaiters.push({ limit, resolve }));
+  }
+
+  bucketFor(key) {
+    let bucket = this.chatBuckets.get(key);
+    if (!bucket) {
+      bucket = new TokenBucket({ rate: this.chatRate, capacity: this.chatBurst });
+    }
+    // Re-set on every use so the entry lives until the bucket has refilled
+    this.chatBuckets.set(key, bucket);
+    return bucket;
+  }
+
+  markReady(key, chat) {
+    if (chat.queued || chat.waiting || chat.sending || chat.items.length === 0) return;
+    chat.queued = true;
+    this.ready[chat.items[0].priority === 'low' ? 'low' : 'high'].push(key);
+  }
+
+  wake(ms) {
+    if (this.timer) return;
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      this.pump();
+    }, ms);
+  }
+
+  pump() {
+    if (this.timer) return;
+
+    const now = Date.now();
+    if (now < this.pausedUntil) return this.wake(this.pausedUntil - now);
+
+    while (this.ready.high.length > 0 || this.ready.low.length > 0) {
+      const globalWait = this.globalBucket.wait(now);
+      if (globalWait > 0) return this.wake(globalWait);
+
+      const key = (this.ready.high.length > 0 ? this.ready.high : this.ready.low).shift();
+      const chat = this.chats.get(key);
+      chat.queued = false;
+
+      const chatWait = this.bucketFor(key).take(now);
+      if (chatWait > 0) {
+        chat.waiting = true;
+        setTimeout(() => {
+          chat.waiting = false;
+          this.markReady(key, chat);
+          this.pump();
+        }, chatWait);
+        continue;
+      }
+
+      this.globalBucket.take(now);
+      this.deliver(key, chat, chat.items.shift());
+    }
+  }
+
+  deliver(key, chat, item) {
+    chat.sending = true;
+    this.pending--;
+
+    this.bot.sendMessage(item.chatId, item.text, item.options)
+      .then((result) => {
+        this.stats.sent++;
+        item.resolve(result);
+      })
+      .catch((error) => {
+        const retryAfter = error.response?.body?.parameters?.retry_after;
+        const transient = retryAfter || error.code === 'EFATAL' ||
+          (error.response?.statusCode >= 500);
+
+        if (transient && item.attempts < MAX_ATTEMPTS - 1) {
+          item.attempts++;
+          chat.items.unshift(item);
+          this.pending++;
+
+          if (retryAfter) {
+            this.stats.throttled++;
+            this.pausedUntil = Math.max(this.pausedUntil, Date.now() + retryAfter * 1000);
+          }
+          return;
+        }
+
+        this.stats.failed++;
+        item.reject(error);
+      })
+      .finally(() => {
+        chat.sending = false;
+        if (chat.items.length > 0) this.markReady(key, chat);
+        else this.chats.delete(key);
+
+        this.roomWaiters = this.roomWaiters.filter((waiter) => {
+          if (this.pending >= waiter.limit) return true;
+          waiter.resolve();
+          return false;
+        });
+        this.pump();
+      });
+  }
+
+  // Resolves once everything queued has been sent (or has failed)
+  async drain() {
+    while (this.pending > 0 || [...this.chats.values()].some(chat => chat.sending)) {
+      await new Promise(resolve => setTimeout(resolve, 100));
+    }
+  }
+}
+
+module.exports = Outbox;
@@ -0,0 +1,87 @@
+// Bounded in-process queue for Telegram updates
+// Updates are processed by up to `concurrency` workers, but never more than
+// one at a time per chat, so each chat sees its updates in arrival order.
+// With `recent` (an LRUCache), redelivered update_ids are acknowledged
+// without being queued again.
+class UpdateQueue {
+  constructor({ handler, concurrency = 8, maxSize = 10000, recent = null }) {
+    this.handler = handler;
+    this.concurrency = concurrency;
+    this.maxSize = maxSize;
+    this.recent = recent;
+
+    this.chats = new Map(); // chat key -> pending updates
+    this.ready = [];        // chat keys with pending work and no active worker
+    this.busy = new Set();  // chat keys being processed
+    this.size = 0;
+    this.active = 0;
+    this.idleWaiters = [];
+  }
+
+  static chatKey(update) {
+    const message = update.message || update.edited_message || update.channel_post ||
+      update.callback_query?.message;
+    if (message?.chat) return `chat:${message.chat.id}`;
+    if (update.callback_query?.from) return `user:${update.callback_query.from.id}`;
+    return `update:${update.update_id}`;
+  }
+
+  // Enqueue an update; returns false when the queue is full. A rejected
+  // update is not remembered, so Telegram's retry of it is accepted.
+  push(update) {
+    const id = update.update_id;
+    if (this.recent && id !== undefined && this.recent.get(id)) return true;
+    if (this.size >= this.maxSize) return false;
+    if (this.recent && id !== undefined) this.recent.set(id, true);
+
+    const key = UpdateQueue.chatKey(update);
+    if (!this.chats.has(key)) {
+      this.chats.set(key, []);
+      if (!this.busy.has(key)) this.ready.push(key);
+    }
+    this.chats.get(key).push(update);
+    this.size += 1;
+
+    this.drain();
+    return true;
+  }
+
+  drain() {
+    while (this.active < this.concurrency && this.ready.length > 0) {
+      this.run(this.ready.shift());
+    }
+  }
+
+  async run(key) {
+    this.active += 1;
+    this.busy.add(key);
+
+    const pending = this.chats.get(key);
+    const update = pending.shift();
+    if (pending.length === 0) this.chats.delete(key);
+
+    try {
+      await this.handler(update);
+    } catch (error) {
+      console.error('❌ Telegram update failed:', error);
+    } finally {
+      this.size -= 1;
+      this.active -= 1;
+      this.busy.delete(key);
+      if (this.chats.has(key)) this.ready.push(key);
+
+      this.drain();
+      if (this.size === 0) {
+        this.idleWaiters.splice(0).forEach(resolve => resolve());
+      }
+    }
+  }
+
+  // Resolves once every queued update has been handled (graceful shutdown)
+  onIdle() {
+    if (this.size === 0) return Promise.resolve();
+    return new Promise(resolve => this.idleWaiters.push(resolve));
+  }
+}
+
+module.exports = UpdateQueue;
@@ -0,0 +1,14 @@
+// Telegram webhook route (POST /webhook)
+// Checks the secret token Telegram sends with every update, hands the
+// update to `ingest` and acknowledges as soon as it is queued. A 503 makes
+// Telegram retry later instead of dropping the update (queue full, or the
+// leader could not be reached).
+const webhookHandler = ({ ingest, secret }) => async (req, res) => {
+  if (secret && req.get('X-Telegram-Bot-Api-Secret-Token') !== secret) {
+    return res.sendStatus(401);
+  }
+
+  res.sendStatus(await ingest(req.body) ? 200 : 503);
+};
+
+module.exports = webhookHandler;
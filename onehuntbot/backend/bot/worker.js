@@ -0,0 +1,23 @@
+require('dotenv').config();
+const mongoose = require('mongoose');
+
+// Standalone bot worker: run exactly one of these with BOT_MODE=polling and
+// the web replicas with BOT_MODE=off (or put them all on BOT_MODE=webhook).
+process.env.BOT_MODE = process.env.BOT_MODE || 'polling';
+const telegram = require('./index');
+
+mongoose.connect(process.env.MONGODB_URI)
+  .then(() => console.log(`🤖 Bot worker running (${telegram.MODE} mode)`))
+  .catch(err => {
+    console.error('❌ MongoDB Connection Error:', err);
+    process.exit(1);
+  });
+
+const shutdown = async () => {
+  await telegram.stop();
+  await mongoose.disconnect();
+  process.exit(0);
+};
+
+process.once('SIGTERM', shutdown);
+process.once('SIGINT', shutdown);
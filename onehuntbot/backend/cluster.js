@@ -0,0 +1,86 @@
+require('dotenv').config();
+const cluster = require('cluster');
+const os = require('os');
+const MemoryStore = require('./utils/memoryStore');
+
+// Cluster mode: the primary forks WEB_CONCURRENCY workers running server.js.
+// One worker is the leader: it runs the bot, scheduled jobs and spool
+// recovery. The primary owns the shared rate-limit counters and relays
+// cache invalidations between workers.
+if (cluster.isPrimary) {
+  const WORKERS = parseInt(process.env.WEB_CONCURRENCY) || os.cpus().length;
+  const RESTART_DELAY = 1000;
+
+  const store = new MemoryStore({ persistPath: MemoryStore.defaultPersistPath() });
+  const leaders = new Map(); // worker id -> is leader
+  let shuttingDown = false;
+
+  const fork = (leader) => {
+    const worker = cluster.fork({ CLUSTER_LEADER: leader ? 'true' : 'false' });
+    leaders.set(worker.id, leader);
+    return worker;
+  };
+
+  const leaderWorker = () => Object.values(cluster.workers)
+    .find(worker => leaders.get(worker.id));
+
+  cluster.on('message', (worker, message) => {
+    if (!message || typeof message.cluster !== 'string') return;
+
+    if (message.cluster === 'call') {
+      if (!MemoryStore.OPERATIONS.includes(message.op)) return;
+      const result = store[message.op](...message.args);
+      worker.send({ cluster: 'reply', id: message.id, result });
+    } else if (message.cluster === 'publish') {
+      for (const other of Object.values(cluster.workers)) {
+        if (other.id !== worker.id && other.isConnected()) {
+          other.send({ cluster: 'message', channel: message.channel, payload: message.payload });
+        }
+      }
+    } else if (message.cluster === 'leader') {
+      const leader = leaderWorker();
+      if (leader && leader.isConnected()) {
+        leader.send({ cluster: 'message', channel: message.channel, payload: message.payload });
+      }
+    } else if (message.cluster === 'ask') {
+      // Relay to the leader; its answer comes back below. No leader: false.
+      const leader = leaderWorker();
+      if (leader && leader.isConnected()) {
+        leader.send({ ...message, from: worker.id });
+      } else {
+        worker.send({ cluster: 'reply', id: message.id, result: false });
+      }
+    } else if (message.cluster === 'answer') {
+      const asker = cluster.workers[message.to];
+      if (asker && asker.isConnected()) {
+        asker.send({ cluster: 'reply', id: message.id, result: message.result });
+      }
+    }
+  });
+
+  cluster.on('exit', (worker, code, signal) => {
+    const leader = leaders.get(worker.id);
+    leaders.delete(worker.id);
+    if (shuttingDown) return;
+
+    console.error(`❌ Worker ${worker.process.pid} exited (${signal || code}), restarting...`);
+    setTimeout(() => fork(leader), RESTART_DELAY);
+  });
+
+  const shutdown = (signal) => {
+    console.log(`${signal} received, stopping workers...`);
+    shuttingDown = true;
+    store.save();
+    for (const worker of Object.values(cluster.workers)) {
+      worker.process.kill('SIGTERM');
+    }
+  };
+
+  process.once('SIGTERM', () => shutdown('SIGTERM'));
+  process.once('SIGINT', () => shutdown('SIGINT'));
+
+  console.log(`🧩 Cluster primary ${process.pid} starting ${WORKERS} workers`);
+  for (let i = 0; i < WORKERS; i++) fork(i === 0);
+} else {
+  require('./server');
+}
@@ -1,7 +1,14 @@
 const User = require('../models/User.model');
+const referralService = require('../services/referral.service');
+const authCache = require('../services/authCache.service');
+const referralCodes = require('../services/referralCode.service');
+const events = require('../services/events.service');
+const achievementService = require('../services/achievement.service');
+const { pick } = require('../services/loader.service');
+const notifications = require('../bot/notifications');
+const { isValidTimezone } = require('../utils/timezone');
 const jwt = require('jsonwebtoken');
 const bcrypt = require('bcryptjs');
-const crypto = require('crypto');
 
 // Generate JWT Token
 const generateToken = (userId) => {
@@ -10,15 +17,70 @@ const generateToken = (userId) => {
   });
 };
 
-// Generate unique referral code
-const generateReferralCode = () => {
-  return crypto.randomBytes(4).toString('hex').toUpperCase();
+// Fields returned by the login upsert (response + cache/rank listeners)
+const AUTH_FIELDS = 'telegramId username balance level xp streak referralCode ' +
+  'isActive isBanned isAdmin achievements';
+
+// Login/registration as one update pipeline: a new user gets every default
+// set explicitly, and the login streak is computed from the stored
+// lastLoginDate on the server
+const loginPipeline = ({ username, firstName, lastName, timezone, referralCode, referrer }, now) => {
+  const today = new Date(now).setHours(0, 0, 0, 0);
+  const yesterday = new Date(today - 24 * 60 * 60 * 1000);
+  const isNewUser = { $eq: [{ $type: '$createdAt' }, 'missing'] };
+  const onInsert = (field, value) => ({ $ifNull: [`$${field}`, { $literal: value }] });
+
+  return [{
+    $set: {
+      username: onInsert('username', username),
+      firstName: onInsert('firstName', firstName || null),
+      lastName: onInsert('lastName', lastName || null),
+      timezone: onInsert('timezone', timezone),
+      referralCode: onInsert('referralCode', referralCode),
+      referredBy: { $cond: [isNewUser, referrer ? referrer._id : null, '$referredBy'] },
+      ancestors: { $cond: [isNewUser, { $literal: referrer ? referralService.ancestorsFor(referrer) : [] }, '$ancestors'] },
+
+      balance: onInsert('balance', 0),
+      totalEarned: onInsert('totalEarned', 0),
+      totalWithdrawn: onInsert('totalWithdrawn', 0),
+      level: onInsert('level', 1),
+      xp: onInsert('xp', 0),
+      directReferralCount: onInsert('directReferralCount', 0),
+      indirectReferralCount: onInsert('indirectReferralCount', 0),
+      totalReferralCount: onInsert('totalReferralCount', 0),
+      tasksCompleted: onInsert('tasksCompleted', 0),
+      dailyTasksCompleted: onInsert('dailyTasksCompleted', 0),
+      achievements: onInsert('achievements', []),
+      dailyRewardStreak: onInsert('dailyRewardStreak', 0),
+      isPremium: onInsert('isPremium', false),
+      isActive: onInsert('isActive', true),
+      isBanned: onInsert('isBanned', false),
+      isAdmin: onInsert('isAdmin', false),
+
+      // Same day: unchanged; consecutive day: +1; otherwise restart at 1
+      streak: {
+        $switch: {
+          branches: [
+            { case: { $gte: ['$lastLoginDate', new Date(today)] }, then: '$streak' },
+            { case: { $gte: ['$lastLoginDate', yesterday] }, then: { $add: [{ $ifNull: ['$streak', 0] }, 1] } }
+          ],
+          default: 1
+        }
+      },
+      lastLoginDate: now,
+      createdAt: onInsert('createdAt', now),
+      updatedAt: now
+    }
+  }];
 };
 
-// Register/Login user via Telegram
+const MAX_AUTH_ATTEMPTS = 3;
+
+// Register/Login user via Telegram (one upsert)
 exports.telegramAuth = async (req, res) => {
   try {
     const { telegramId, username, firstName, lastName, referralCode } = req.body;
+    const timezone = isValidTimezone(req.body.timezone) ? req.body.timezone : 'UTC';
 
     if (!telegramId || !username) {
       return res.status(400).json({ 
@@ -27,79 +89,49 @@ exports.telegramAuth = async (req, res) => {
       });
     }
 
-    // Check if user exists
-    let user = await User.findOne({ telegramId });
-
-    if (user) {
-      // Existing user - login
-      user.lastLoginDate = new Date();
-      await user.updateStreak();
-      await user.save();
-
-      const token = generateToken(user._id);
-
-      return res.json({
-        success: true,
-        message: 'Login successful',
-        data: {
-          token,
-          user: {
-            id: user._id,
-            username: user.username,
-            balance: user.balance,
-            level: user.level,
-            xp: user.xp,
-            streak: user.streak,
-            referralCode: user.referralCode
-          }
-        }
-      });
-    }
-
-    // New user - register
-    const newReferralCode = generateReferralCode();
-
-    user = new User({
-      telegramId,
-      username,
-      firstName,
-      lastName,
-      referralCode: newReferralCode,
-      lastLoginDate: new Date()
-    });
+    // Only read when a code is supplied; it applies to new users only
+    const referrer = referralCode
+      ? await User.findOne({ referralCode }).select('telegramId ancestors').lean()
+      : null;
+
+    let result;
+    for (let attempt = 1; !result; attempt++) {
+      const newReferralCode = await referralCodes.take();
+      try {
+        result = await User.findOneAndUpdate(
+          { telegramId: String(telegramId) },
+          loginPipeline({ username, firstName, lastName, timezone, referralCode: newReferralCode, referrer }, new Date()),
+          { upsert: true, new: true, projection: AUTH_FIELDS, includeResultMetadata: true }
+        );
+      } catch (error) {
+        // A concurrent first login for the same user, or a code clash with
+        // a legacy code: retry (the next attempt matches the existing user)
+        if (error.code !== 11000 || attempt >= MAX_AUTH_ATTEMPTS) throw error;
+        continue;
+      }
 
-    // Handle referral if code provided
-    if (referralCode) {
-      const referrer = await User.findOne({ referralCode });
-      if (referrer) {
-        user.referredBy = referrer._id;
-        referrer.directReferrals.push(user._id);
-
-        // Award referral bonus
-        const referralBonus = parseInt(process.env.REFERRAL_REWARD_DIRECT) || 100;
-        await referrer.addBalance(referralBonus);
-        await referrer.save();
-
-        // Check if referrer was also referred (indirect referral)
-        if (referrer.referredBy) {
-          const indirectReferrer = await User.findById(referrer.referredBy);
-          if (indirectReferrer) {
-            indirectReferrer.indirectReferrals.push(user._id);
-            const indirectBonus = parseInt(process.env.REFERRAL_REWARD_INDIRECT) || 50;
-            await indirectReferrer.addBalance(indirectBonus);
-            await indirectReferrer.save();
-          }
-        }
+      if (result.lastErrorObject.updatedExisting || result.value.referralCode !== newReferralCode) {
+        referralCodes.release(newReferralCode);
       }
     }
 
-    await user.save();
+    const user = result.value;
+    const isNew = !result.lastErrorObject.updatedExisting;
+    events.emit('user:updated', user);
+    // The login may have extended the streak
+    achievementService.check(user, { balance: user.balance, level: user.level });
+
+    // New user: pay every level of the referral chain in one bulk write
+    if (isNew && referrer) {
+      await referralService.payout(user, referralService.ancestorsFor(referrer));
+      notifications.referralJoined(referrer, referralService.LEVEL_REWARDS[0]);
+    }
 
     const token = generateToken(user._id);
 
-    res.status(201).json({
+    res.status(isNew ? 201 : 200).json({
       success: true,
-      message: 'Registration successful',
+      message: isNew ? 'Registration successful' : 'Login successful',
       data: {
         token,
         user: {
@@ -108,6 +140,7 @@ exports.telegramAuth = async (req, res) => {
           balance: user.balance,
           level: user.level,
           xp: user.xp,
+          streak: user.streak,
           referralCode: user.referralCode
         }
       }
@@ -122,17 +155,18 @@ exports.getCurrentUser = async (req, res) => {
   try {
     const user = await User.findById(req.user.id)
       .select('-__v')
-      .populate('referredBy', 'username')
-      .populate('directReferrals', 'username level')
-      .populate('indirectReferrals', 'username');
+      .lean();
 
     if (!user) {
       return res.status(404).json({ success: false, message: 'User not found' });
     }
 
+    // Referees are paged through GET /api/referrals/downline
+    const referredBy = pick(await req.loaders.users.load(user.referredBy), 'username');
+
     res.json({
       success: true,
-      data: user
+      data: { ...user, referredBy }
     });
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
@@ -148,8 +182,8 @@ exports.verifyToken = async (req, res) => {
       return res.status(401).json({ success: false, message: 'No token provided' });
     }
 
-    const decoded = jwt.verify(token, process.env.JWT_SECRET);
-    const user = await User.findById(decoded.id);
+    const decoded = authCache.verifyToken(token);
+    const user = await authCache.getPrincipal(decoded.id);
 
     if (!user) {
       return res.status(401).json({ success: false, message: 'Invalid token' });
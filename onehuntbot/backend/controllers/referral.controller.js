@@ -1,24 +1,37 @@
 const User = require('../models/User.model');
-const Reward = require('../models/Reward.model');
+const Referral = require('../models/Referral.model');
+const leaderboardService = require('../services/leaderboard.service');
+const referralService = require('../services/referral.service');
+const earningsService = require('../services/earnings.service');
+const notifications = require('../bot/notifications');
+const { resolve } = require('../services/loader.service');
+const { parseLimit, parseSortedPageQuery, toSortedPage } = require('../utils/pagination');
+
+// Downline sorts; each is served by a Referral index and ends in _id so
+// cursors are unique
+const DOWNLINE_SORTS = {
+  joined: { createdAt: -1, _id: -1 },
+  level: { level: 1, createdAt: -1, _id: -1 },
+  earnings: { earnings: -1, _id: -1 }
+};
+const DOWNLINE_FIELDS = 'referee level earnings createdAt';
+const DOWNLINE_USER_FIELDS = 'username firstName level';
 
 // Get referral information
 exports.getReferralInfo = async (req, res) => {
   try {
     const user = await User.findById(req.user.id)
-      .populate('directReferrals', 'username firstName level balance createdAt')
-      .populate('indirectReferrals', 'username firstName level');
+      .select('referralCode directReferralCount indirectReferralCount')
+      .lean();
 
     if (!user) {
       return res.status(404).json({ success: false, message: 'User not found' });
     }
 
-    // Calculate total earnings from referrals
-    const referralRewards = await Reward.find({
-      user: user._id,
-      type: 'referral'
-    });
+    const earnings = await earningsService.getSummary(user._id);
 
-    const totalReferralEarnings = referralRewards.reduce((sum, r) => sum + r.amount, 0);
+    // Total earnings from referrals (maintained aggregate)
+    const totalReferralEarnings = earnings.totals.referral || 0;
 
     res.json({
       success: true,
@@ -26,15 +39,14 @@ exports.getReferralInfo = async (req, res) => {
         referralCode: user.referralCode,
         referralLink: `${process.env.BASE_URL}?ref=${user.referralCode}`,
         stats: {
-          directCount: user.directReferrals.length,
-          indirectCount: user.indirectReferrals.length,
+          directCount: user.directReferralCount,
+          indirectCount: user.indirectReferralCount,
           totalEarnings: totalReferralEarnings
         },
-        directReferrals: user.directReferrals,
-        indirectReferrals: user.indirectReferrals,
         rewards: {
-          perDirectReferral: process.env.REFERRAL_REWARD_DIRECT || 100,
-          perIndirectReferral: process.env.REFERRAL_REWARD_INDIRECT || 50
+          perDirectReferral: referralService.LEVEL_REWARDS[0],
+          perIndirectReferral: referralService.LEVEL_REWARDS[1] || 0,
+          perLevel: referralService.LEVEL_REWARDS
         }
       }
     });
@@ -43,13 +55,76 @@ exports.getReferralInfo = async (req, res) => {
   }
 };
 
+// Get the user's downline, one page at a time
+// ?sort=joined|level|earnings, optional ?level= filter, cursor paging
+exports.getDownline = async (req, res) => {
+  try {
+    const sortName = req.query.sort || 'joined';
+    const sort = DOWNLINE_SORTS[sortName];
+
+    if (!sort) {
+      return res.status(400).json({ success: false, message: 'Invalid sort' });
+    }
+
+    const level = req.query.level ? parseInt(req.query.level) : null;
+    if (req.query.level && !(level >= 1)) {
+      return res.status(400).json({ success: false, message: 'Invalid level' });
+    }
+
+    const { limit, filter } = parseSortedPageQuery(req.query, sort);
+    const match = { referrer: req.user.id, ...(level && { level }), ...filter };
+
+    const [edges, user, earnings] = await Promise.all([
+      Referral.find(match)
+        .select(DOWNLINE_FIELDS)
+        .sort(sort)
+        .limit(limit + 1)
+        .lean(),
+      User.findById(req.user.id)
+        .select('directReferralCount indirectReferralCount')
+        .lean(),
+      earningsService.getSummary(req.user.id)
+    ]);
+
+    const { items, pagination } = toSortedPage(edges, limit, sort);
+    await resolve(req.loaders.users, items, 'referee', DOWNLINE_USER_FIELDS);
+
+    // Header from maintained counters, not from counting edges
+    const directCount = user ? user.directReferralCount : 0;
+    const indirectCount = user ? user.indirectReferralCount : 0;
+
+    res.json({
+      success: true,
+      data: {
+        summary: {
+          directCount,
+          indirectCount,
+          totalCount: directCount + indirectCount,
+          totalEarnings: earnings.totals.referral || 0
+        },
+        referrals: items.map(edge => ({
+          user: edge.referee,
+          level: edge.level,
+          earnings: edge.earnings || 0,
+          joinedAt: edge.createdAt
+        })),
+        pagination: { ...pagination, sort: sortName }
+      }
+    });
+  } catch (error) {
+    res.status(error.statusCode || 500).json({ success: false, message: error.message });
+  }
+};
+
 // Apply referral code (for new users)
 exports.applyReferralCode = async (req, res) => {
   try {
     const { referralCode } = req.body;
     const userId = req.user.id;
 
-    const user = await User.findById(userId);
+    const user = await User.findById(userId)
+      .select('username referredBy')
+      .lean();
 
     if (!user) {
       return res.status(404).json({ success: false, message: 'User not found' });
@@ -64,7 +139,9 @@ exports.applyReferralCode = async (req, res) => {
     }
 
     // Find referrer
-    const referrer = await User.findOne({ referralCode });
+    const referrer = await User.findOne({ referralCode })
+      .select('telegramId username ancestors')
+      .lean();
 
     if (!referrer) {
       return res.status(404).json({
@@ -73,56 +150,37 @@ exports.applyReferralCode = async (req, res) => {
       });
     }
 
-    // Can't refer yourself
-    if (referrer._id.toString() === userId.toString()) {
+    // Can't refer yourself, or be referred from inside your own downline
+    if (referrer._id.toString() === userId.toString() ||
+        (referrer.ancestors || []).some(id => id.toString() === userId.toString())) {
       return res.status(400).json({
         success: false,
         message: 'You cannot use your own referral code'
       });
     }
 
-    // Update user
-    user.referredBy = referrer._id;
-    await user.save();
-
-    // Update referrer
-    referrer.directReferrals.push(user._id);
-    const directBonus = parseInt(process.env.REFERRAL_REWARD_DIRECT) || 100;
-    await referrer.addBalance(directBonus);
-    await referrer.save();
-
-    // Create reward record
-    const reward = new Reward({
-      user: referrer._id,
-      type: 'referral',
-      amount: directBonus,
-      xp: 20,
-      description: `Direct referral: ${user.username}`,
-      relatedReferral: user._id
-    });
-    await reward.save();
-
-    // Check for indirect referral
-    if (referrer.referredBy) {
-      const indirectReferrer = await User.findById(referrer.referredBy);
-      if (indirectReferrer) {
-        indirectReferrer.indirectReferrals.push(user._id);
-        const indirectBonus = parseInt(process.env.REFERRAL_REWARD_INDIRECT) || 50;
-        await indirectReferrer.addBalance(indirectBonus);
-        await indirectReferrer.save();
-
-        const indirectReward = new Reward({
-          user: indirectReferrer._id,
-          type: 'referral',
-          amount: indirectBonus,
-          xp: 10,
-          description: `Indirect referral: ${user.username}`,
-          relatedReferral: user._id
-        });
-        await indirectReward.save();
-      }
+    // Update user; the referredBy guard makes concurrent applies a no-op
+    const ancestors = referralService.ancestorsFor(referrer);
+    const applied = await User.updateOne(
+      { _id: userId, referredBy: null },
+      { $set: { referredBy: referrer._id, ancestors } }
+    );
+
+    if (applied.modifiedCount === 0) {
+      return res.status(400).json({
+        success: false,
+        message: 'You have already used a referral code'
+      });
     }
 
+    // Future payouts from the user's existing downline reach the new chain
+    await referralService.extendDownline(userId, ancestors);
+
+    // Pay every level of the chain in one bulk write
+    await referralService.payout(user, ancestors);
+    const directBonus = referralService.LEVEL_REWARDS[0];
+    notifications.referralJoined(referrer, directBonus);
+
     res.json({
       success: true,
       message: 'Referral code applied successfully',
@@ -141,39 +199,16 @@ exports.applyReferralCode = async (req, res) => {
 // Get referral leaderboard
 exports.getReferralLeaderboard = async (req, res) => {
   try {
-    const limit = parseInt(req.query.limit) || 50;
-
-    const topReferrers = await User.aggregate([
-      { $match: { isActive: true, isBanned: false } },
-      {
-        $project: {
-          username: 1,
-          firstName: 1,
-          directCount: { $size: { $ifNull: ['$directReferrals', []] } },
-          indirectCount: { $size: { $ifNull: ['$indirectReferrals', []] } },
-          totalReferrals: {
-            $add: [
-              { $size: { $ifNull: ['$directReferrals', []] } },
-              { $size: { $ifNull: ['$indirectReferrals', []] } }
-            ]
-          }
-        }
-      },
-      { $sort: { directCount: -1, totalReferrals: -1 } },
-      { $limit: limit }
-    ]);
-
-    const rankedReferrers = topReferrers.map((user, index) => ({
-      rank: index + 1,
-      ...user
-    }));
+    const limit = parseLimit(req.query.limit, 50);
+    const { generatedAt, rows } = await leaderboardService.getBoard('directReferrals', limit);
 
     res.json({
       success: true,
-      data: rankedReferrers
+      data: rows,
+      generatedAt
     });
   } catch (error) {
-    res.status(500).json({ success: false, message: error.message });
+    res.status(error.statusCode || 500).json({ success: false, message: error.message });
   }
 };
 
@@ -1,64 +1,95 @@
 const User = require('../models/User.model');
 const Reward = require('../models/Reward.model');
+const rewardWriter = require('../services/rewardWriter.service');
+const ledger = require('../services/ledger.service');
+const events = require('../services/events.service');
+const spinService = require('../services/spin.service');
+const achievementService = require('../services/achievement.service');
+const { resolve } = require('../services/loader.service');
+const { parsePageQuery, toPage, KEYSET_SORT } = require('../utils/pagination');
+
+// Response projections
+const REWARD_HISTORY_FIELDS = 'type amount xp description relatedTask relatedReferral createdAt';
+const DAILY_REWARD_FIELDS = 'username balance level xp dailyRewardStreak lastDailyReward ' +
+  'isActive isBanned isAdmin achievements';
+
+// Daily reward: base + 5 per completed week of streak, plus 5 XP
+const DAILY_XP = 5;
+const dailyBase = () => parseInt(process.env.DAILY_LOGIN_REWARD) || 10;
+const dailyReward = streak => dailyBase() + Math.floor(streak / 7) * 5;
+
+// Start of the user's current and previous day, in their time zone
+const startOfDay = (now, daysBack = 0) => ({
+  $dateSubtract: {
+    startDate: { $dateTrunc: { date: now, unit: 'day', timezone: { $ifNull: ['$timezone', 'UTC'] } } },
+    unit: 'day',
+    amount: daysBack
+  }
+});
 
-// Claim daily login reward
+// Claim daily login reward: one conditional update that only matches if the
+// user has not claimed since their local midnight, so concurrent taps
+// cannot both pay out
 exports.claimDailyReward = async (req, res) => {
   try {
     const userId = req.user.id;
-    const user = await User.findById(userId);
+    const now = new Date();
+    const lastClaim = { $ifNull: ['$lastDailyReward', new Date(0)] };
+
+    const user = await User.findOneAndUpdate(
+      { _id: userId, $expr: { $lt: [lastClaim, startOfDay(now)] } },
+      [
+        {
+          $set: {
+            dailyRewardStreak: {
+              $cond: [
+                { $gte: [lastClaim, startOfDay(now, 1)] },
+                { $add: [{ $ifNull: ['$dailyRewardStreak', 0] }, 1] },
+                1
+              ]
+            },
+            lastDailyReward: now
+          }
+        },
+        ...User.creditStages({
+          coins: {
+            $add: [dailyBase(), { $multiply: [{ $floor: { $divide: ['$dailyRewardStreak', 7] } }, 5] }]
+          },
+          xp: DAILY_XP
+        })
+      ],
+      { new: true, projection: DAILY_REWARD_FIELDS }
+    );
 
     if (!user) {
-      return res.status(404).json({ success: false, message: 'User not found' });
-    }
-
-    // Check if already claimed today
-    const today = new Date().setHours(0, 0, 0, 0);
-    const lastClaim = user.lastDailyReward ? 
-      new Date(user.lastDailyReward).setHours(0, 0, 0, 0) : 0;
-
-    if (lastClaim === today) {
       return res.status(400).json({ 
         success: false, 
         message: 'Daily reward already claimed today' 
       });
     }
 
-    // Calculate streak
-    const yesterday = today - (24 * 60 * 60 * 1000);
-    if (lastClaim === yesterday) {
-      user.dailyRewardStreak += 1;
-    } else if (lastClaim < yesterday) {
-      user.dailyRewardStreak = 1;
-    }
-
-    // Calculate reward based on streak
-    const baseReward = parseInt(process.env.DAILY_LOGIN_REWARD) || 10;
-    const streakBonus = Math.floor(user.dailyRewardStreak / 7) * 5;
-    const totalReward = baseReward + streakBonus;
+    const streak = user.dailyRewardStreak;
+    const totalReward = dailyReward(streak);
 
-    // Award reward
-    await user.addBalance(totalReward);
-    await user.addXP(5);
-    user.lastDailyReward = new Date();
-    await user.save();
-
-    // Record reward
-    const reward = new Reward({
+    // One ledger append plus the Reward row
+    await ledger.post({ user: user._id, amount: totalReward, type: 'daily_login' });
+    rewardWriter.enqueue({
       user: userId,
       type: 'daily_login',
       amount: totalReward,
-      xp: 5,
-      description: `Day ${user.dailyRewardStreak} streak reward`
+      xp: DAILY_XP,
+      description: `Day ${streak} streak reward`
     });
-    await reward.save();
+    events.emit('user:updated', user);
+    achievementService.check(user, { balance: user.balance - totalReward });
 
     res.json({
       success: true,
       message: 'Daily reward claimed!',
       data: {
         reward: totalReward,
-        streak: user.dailyRewardStreak,
-        nextStreakBonus: Math.floor((user.dailyRewardStreak + 1) / 7) * 5
+        streak,
+        nextStreakBonus: Math.floor((streak + 1) / 7) * 5
       }
     });
   } catch (error) {
@@ -66,35 +97,31 @@ exports.claimDailyReward = async (req, res) => {
   }
 };
 
-// Spin the wheel
+// Spin the wheel (cooldown and daily budget enforced by the spin engine)
 exports.spinWheel = async (req, res) => {
   try {
-    const userId = req.user.id;
-    const user = await User.findById(userId);
-
-    if (!user) {
-      return res.status(404).json({ success: false, message: 'User not found' });
+    const result = await spinService.spin(req.user.id);
+
+    if (!result.allowed) {
+      res.set('Retry-After', String(Math.ceil(result.retryAfterMs / 1000)));
+      return res.status(429).json({
+        success: false,
+        message: result.reason === 'cooldown'
+          ? 'The wheel is cooling down, try again in a few seconds'
+          : 'No spins left today',
+        data: { retryAfter: Math.ceil(result.retryAfterMs / 1000) }
+      });
     }
 
-    // Implement spin wheel logic
-    // Random reward between 5-100 coins
-    const rewards = [5, 10, 15, 20, 25, 50, 75, 100];
-    const randomReward = rewards[Math.floor(Math.random() * rewards.length)];
-
-    await user.addBalance(randomReward);
-
-    const reward = new Reward({
-      user: userId,
-      type: 'spin_wheel',
-      amount: randomReward,
-      description: 'Spin wheel reward'
-    });
-    await reward.save();
-
     res.json({
       success: true,
       message: 'Wheel spun!',
-      data: { reward: randomReward }
+      data: {
+        reward: result.prize.coins,
+        xp: result.prize.xp || 0,
+        balance: result.balance,
+        spinsLeft: result.remaining
+      }
     });
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
@@ -105,31 +132,35 @@ exports.spinWheel = async (req, res) => {
 exports.getRewardHistory = async (req, res) => {
   try {
     const userId = req.user.id;
-    const page = parseInt(req.query.page) || 1;
-    const limit = parseInt(req.query.limit) || 20;
+    const { limit, filter } = parsePageQuery(req.query);
+
+    const rewards = await Reward.find({ user: userId, ...filter })
+      .select(REWARD_HISTORY_FIELDS)
+      .sort(KEYSET_SORT)
+      .limit(limit + 1)
+      .lean();
 
-    const rewards = await Reward.find({ user: userId })
-      .sort({ createdAt: -1 })
-      .skip((page - 1) * limit)
-      .limit(limit)
-      .populate('relatedTask', 'title')
-      .populate('relatedReferral', 'username');
+    const { items, pagination } = toPage(rewards, limit);
 
-    const total = await Reward.countDocuments({ user: userId });
+    // Titles and usernames for the page: one batched lookup per model
+    await Promise.all([
+      resolve(req.loaders.tasks, items, 'relatedTask', 'title'),
+      resolve(req.loaders.users, items, 'relatedReferral', 'username')
+    ]);
+
+    // Exact totals cost a count per request, so they are opt-in
+    if (req.query.includeTotal === 'true') {
+      pagination.total = await Reward.countDocuments({ user: userId });
+    }
 
     res.json({
       success: true,
       data: {
-        rewards,
-        pagination: {
-          page,
-          limit,
-          total,
-          pages: Math.ceil(total / limit)
-        }
+        rewards: items,
+        pagination
       }
     });
   } catch (error) {
-    res.status(500).json({ success: false, message: error.message });
+    res.status(error.statusCode || 500).json({ success: false, message: error.message });
   }
 };
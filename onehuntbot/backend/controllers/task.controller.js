@@ -1,20 +1,34 @@
 const Task = require('../models/Task.model');
 const TaskCompletion = require('../models/TaskCompletion.model');
 const User = require('../models/User.model');
-const { bot } = require('../server');
+const completionIndex = require('../services/completionIndex.service');
+const taskCatalog = require('../services/taskCatalog.service');
+const achievementService = require('../services/achievement.service');
+const notifications = require('../bot/notifications');
+const { resolve } = require('../services/loader.service');
+
+// Response projections (list reads are lean and serialized as-is)
+const TASK_LIST_FIELDS = taskCatalog.TASK_FIELDS;
+const COMPLETION_LIST_FIELDS = 'task status proof rewardGiven completedAt verifiedAt';
+
+// Send catalog-derived task lists with an ETag so clients can revalidate
+const sendTasks = (req, res, tasks) => {
+  res.set('ETag', taskCatalog.etagFor(tasks));
+  res.set('Cache-Control', 'private, no-cache');
+
+  if (req.fresh) {
+    return res.status(304).end();
+  }
+  res.json({ success: true, data: tasks });
+};
 
 // Get all active tasks
 exports.getAllTasks = async (req, res) => {
   try {
-    const tasks = await Task.find({ 
-      isActive: true,
-      $or: [
-        { endDate: { $gte: new Date() } },
-        { endDate: null }
-      ]
-    }).sort({ priority: -1, createdAt: -1 });
-
-    res.json({ success: true, data: tasks });
+    const type = req.query.type && req.query.type !== 'all' ? req.query.type : null;
+    const tasks = await taskCatalog.getActive(type);
+
+    sendTasks(req, res, tasks);
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
   }
@@ -24,12 +38,9 @@ exports.getAllTasks = async (req, res) => {
 exports.getTasksByType = async (req, res) => {
   try {
     const { type } = req.params;
-    const tasks = await Task.find({ 
-      type, 
-      isActive: true 
-    }).sort({ priority: -1 });
+    const tasks = await taskCatalog.getActive(type);
 
-    res.json({ success: true, data: tasks });
+    sendTasks(req, res, tasks);
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
   }
@@ -40,26 +51,17 @@ exports.getUserAvailableTasks = async (req, res) => {
   try {
     const userId = req.user.id;
 
-    // Get all active tasks
-    const allTasks = await Task.find({ isActive: true });
+    // Get all active tasks and the user's completion counts
+    const now = new Date();
+    const [allTasks, counts] = await Promise.all([
+      taskCatalog.getActive(null, now),
+      completionIndex.getCounts(userId)
+    ]);
 
-    // Get completed tasks
-    const completedTasks = await TaskCompletion.find({ 
-      user: userId,
-      status: 'verified'
-    }).select('task');
+    // Single pass with O(1) count lookups
+    const availableTasks = allTasks.filter(task => completionIndex.isAvailable(task, counts, now));
 
-    const completedTaskIds = completedTasks.map(ct => ct.task.toString());
-
-    // Filter out completed tasks (if maxCompletions = 1)
-    const availableTasks = allTasks.filter(task => {
-      if (task.maxCompletions === 1) {
-        return !completedTaskIds.includes(task._id.toString());
-      }
-      return true;
-    });
-
-    res.json({ success: true, data: availableTasks });
+    sendTasks(req, res, availableTasks);
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
   }
@@ -72,51 +74,91 @@ exports.completeTask = async (req, res) => {
     const userId = req.user.id;
     const { proof } = req.body;
 
-    const task = await Task.findById(id);
+    // Task comes from the in-process catalog (no round trip)
+    const task = await taskCatalog.getById(id);
     if (!task) {
       return res.status(404).json({ success: false, message: 'Task not found' });
     }
 
-    // Check if already completed
-    const existingCompletion = await TaskCompletion.findOne({
-      user: userId,
-      task: id,
-      status: 'verified'
-    });
+    const now = new Date();
+    if ((task.startDate && task.startDate > now) || (task.endDate && task.endDate < now)) {
+      return res.status(400).json({ success: false, message: 'Task is not available' });
+    }
 
-    if (existingCompletion && task.maxCompletions === 1) {
+    // Check if already completed as many times as allowed this period
+    const counts = await completionIndex.getCounts(userId);
+    const used = completionIndex.usedInPeriod(task, counts, now);
+
+    if (used >= (task.maxCompletions || 1)) {
       return res.status(400).json({ 
         success: false, 
         message: 'Task already completed' 
       });
     }
 
-    // Create completion record
-    const completion = new TaskCompletion({
-      user: userId,
-      task: id,
-      proof,
-      rewardGiven: task.reward
-    });
-
-    // Auto-verify or manual verify based on task
-    if (task.requirement.verificationMethod === 'auto') {
-      completion.status = 'verified';
-      completion.verifiedAt = new Date();
-
-      // Award rewards
-      const user = await User.findById(userId);
-      await user.addBalance(task.reward.coins);
-      await user.addXP(task.reward.xp);
-      user.tasksCompleted += 1;
-      await user.save();
-
-      // Update task completion count
-      task.currentCompletions += 1;
-      await task.save();
+    const isAuto = task.requirement?.verificationMethod === 'auto';
+    const period = completionIndex.periodOf(task, now);
+    // Rejected completions keep their slot, so count past them
+    const slot = completionIndex.nextSlot(task, counts, now);
+
+    // 1) Claim the completion slot; the unique (user, task, periodKey)
+    // index rejects concurrent duplicates
+    let completion;
+    try {
+      completion = await TaskCompletion.create({
+        user: userId,
+        task: id,
+        proof,
+        periodKey: `${period}#${slot}`,
+        rewardGiven: task.reward,
+        status: isAuto ? 'verified' : 'pending',
+        verifiedAt: isAuto ? now : undefined
+      });
+    } catch (error) {
+      if (error.code === 11000) {
+        completionIndex.invalidate(userId);
+        return res.status(400).json({ success: false, message: 'Task already completed' });
+      }
+      throw error;
     }
+    completionIndex.recordCompletion(userId, task, period, slot);
+
+    if (isAuto) {
+      // 2) Count the completion against the global limit, if any
+      const counted = await Task.updateOne(
+        {
+          _id: id,
+          $or: [
+            { totalCompletionsLimit: null },
+            { $expr: { $lt: ['$currentCompletions', '$totalCompletionsLimit'] } }
+          ]
+        },
+        { $inc: { currentCompletions: 1 } }
+      );
+
+      if (counted.modifiedCount === 0) {
+        await TaskCompletion.deleteOne({ _id: completion._id });
+        completionIndex.invalidate(userId);
+        return res.status(400).json({ success: false, message: 'Task completion limit reached' });
+      }
+      taskCatalog.recordCompletion(id);
+
+      // 3) Award rewards in a single update
+      const user = await User.credit({ _id: userId }, {
+        coins: task.reward.coins,
+        xp: task.reward.xp || 0,
+        inc: { tasksCompleted: 1, dailyTasksCompleted: 1 },
+        entry: { type: 'task_completion', ref: task._id, description: `Task completed: ${task.title}` }
+      });
 
-    await completion.save();
+      // Unlock achievements for the thresholds this completion crossed
+      if (user) {
+        achievementService.onStatsChanged(user, {
+          tasksCompleted: user.tasksCompleted - 1,
+          balance: user.balance - task.reward.coins
+        }).catch(error => console.error('❌ Achievement check failed:', error));
+      }
+    }
 
     res.json({ 
       success: true, 
@@ -136,8 +178,11 @@ exports.getUserCompletedTasks = async (req, res) => {
     const userId = req.user.id;
 
     const completions = await TaskCompletion.find({ user: userId })
-      .populate('task')
-      .sort({ completedAt: -1 });
+      .select(COMPLETION_LIST_FIELDS)
+      .sort({ completedAt: -1 })
+      .lean();
+
+    await resolve(req.loaders.tasks, completions, 'task', TASK_LIST_FIELDS);
 
     res.json({ success: true, data: completions });
   } catch (error) {
@@ -155,6 +200,12 @@ exports.createTask = async (req, res) => {
 
     const task = new Task(req.body);
     await task.save();
+    await taskCatalog.reload();
+
+    // ?announce=true broadcasts the new task to all users via the bot
+    if (req.query.announce === 'true' && task.isActive) {
+      notifications.taskAnnounced(task);
+    }
 
     res.status(201).json({ success: true, data: task });
   } catch (error) {
@@ -179,6 +230,7 @@ exports.updateTask = async (req, res) => {
       return res.status(404).json({ success: false, message: 'Task not found' });
     }
 
+    await taskCatalog.reload();
     res.json({ success: true, data: task });
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
@@ -198,6 +250,7 @@ exports.deleteTask = async (req, res) => {
       return res.status(404).json({ success: false, message: 'Task not found' });
     }
 
+    await taskCatalog.reload();
     res.json({ success: true, message: 'Task deleted successfully' });
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
@@ -206,7 +259,9 @@ exports.deleteTask = async (req, res) => {
 
 exports.getTaskById = async (req, res) => {
   try {
-    const task = await Task.findById(req.params.id);
+    // The catalog holds active tasks only; inactive ones come from Mongo
+    const task = await taskCatalog.getById(req.params.id) ||
+      await Task.findById(req.params.id).lean();
     if (!task) {
       return res.status(404).json({ success: false, message: 'Task not found' });
     }
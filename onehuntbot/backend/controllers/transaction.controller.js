@@ -1,5 +1,6 @@
 const User = require('../models/User.model');
 const mongoose = require('mongoose');
+const { parsePageQuery, toPage, KEYSET_SORT } = require('../utils/pagination');
 
 // Transaction Schema
 const transactionSchema = new mongoose.Schema({
@@ -43,38 +44,52 @@ transactionSchema.index({ status: 1 });
 
 const Transaction = mongoose.model('Transaction', transactionSchema);
 
+// Response projections (admin-only fields are never sent to users)
+const TRANSACTION_FIELDS = 'type amount fee status method walletAddress transactionHash ' +
+  'description processedAt createdAt';
+
+// Ledger posting that reverses a withdrawal's debit (amount and fee)
+const withdrawalRefund = (transaction) => ({
+  type: 'withdrawal_refund',
+  ref: transaction._id,
+  splits: [
+    { account: 'system:withdrawal', amount: transaction.amount },
+    { account: 'system:withdrawal_fee', amount: transaction.fee || 0 }
+  ]
+});
+
 // Get transaction history
 exports.getTransactionHistory = async (req, res) => {
   try {
     const userId = req.user.id;
-    const page = parseInt(req.query.page) || 1;
-    const limit = parseInt(req.query.limit) || 20;
+    const { limit, filter } = parsePageQuery(req.query);
     const type = req.query.type;
 
     const query = { user: userId };
     if (type) query.type = type;
 
-    const transactions = await Transaction.find(query)
-      .sort({ createdAt: -1 })
-      .skip((page - 1) * limit)
-      .limit(limit);
+    const transactions = await Transaction.find({ ...query, ...filter })
+      .select(TRANSACTION_FIELDS)
+      .sort(KEYSET_SORT)
+      .limit(limit + 1)
+      .lean();
 
-    const total = await Transaction.countDocuments(query);
+    const { items, pagination } = toPage(transactions, limit);
+
+    // Exact totals cost a count per request, so they are opt-in
+    if (req.query.includeTotal === 'true') {
+      pagination.total = await Transaction.countDocuments(query);
+    }
 
     res.json({
       success: true,
       data: {
-        transactions,
-        pagination: {
-          page,
-          limit,
-          total,
-          pages: Math.ceil(total / limit)
-        }
+        transactions: items,
+        pagination
       }
     });
   } catch (error) {
-    res.status(500).json({ success: false, message: error.message });
+    res.status(error.statusCode || 500).json({ success: false, message: error.message });
   }
 };
 
@@ -132,10 +147,24 @@ exports.requestWithdrawal = async (req, res) => {
       description: `Withdrawal request: ${amount} coins`
     });
 
-    await transaction.save();
+    // Deduct from user balance first (hold until processed); the debit is
+    // guarded atomically so concurrent requests cannot overdraw
+    await user.deductBalance(totalDeduction, {
+      type: 'withdrawal',
+      ref: transaction._id,
+      splits: [
+        { account: 'system:withdrawal', amount: -amount },
+        { account: 'system:withdrawal_fee', amount: -fee }
+      ]
+    });
 
-    // Deduct from user balance (hold until processed)
-    await user.deductBalance(totalDeduction);
+    // Without a withdrawal record nothing would ever refund the hold
+    try {
+      await transaction.save();
+    } catch (error) {
+      await user.addBalance(totalDeduction, withdrawalRefund(transaction));
+      throw error;
+    }
 
     res.json({
       success: true,
@@ -160,7 +189,9 @@ exports.getWithdrawalStatus = async (req, res) => {
       _id: transactionId,
       user: userId,
       type: 'withdrawal'
-    });
+    })
+      .select(TRANSACTION_FIELDS)
+      .lean();
 
     if (!transaction) {
       return res.status(404).json({
@@ -201,7 +232,7 @@ exports.cancelWithdrawal = async (req, res) => {
     // Refund amount
     const user = await User.findById(userId);
     const refundAmount = transaction.amount + (transaction.fee || 0);
-    await user.addBalance(refundAmount);
+    await user.addBalance(refundAmount, withdrawalRefund(transaction));
 
     // Update transaction
     transaction.status = 'cancelled';
@@ -260,14 +291,13 @@ exports.processWithdrawal = async (req, res) => {
     if (status === 'rejected') {
       const user = await User.findById(transaction.user);
       const refundAmount = transaction.amount + (transaction.fee || 0);
-      await user.addBalance(refundAmount);
+      await user.addBalance(refundAmount, withdrawalRefund(transaction));
     }
 
     // If completed, update user's total withdrawn
     if (status === 'completed') {
       const user = await User.findById(transaction.user);
-      user.totalWithdrawn += transaction.amount;
-      await user.save();
+      await user.stageIncrement('totalWithdrawn', transaction.amount).commitStaged();
     }
 
     res.json({
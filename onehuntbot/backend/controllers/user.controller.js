@@ -1,22 +1,29 @@
 const User = require('../models/User.model');
-const Reward = require('../models/Reward.model');
-const TaskCompletion = require('../models/TaskCompletion.model');
+const authCache = require('../services/authCache.service');
+const achievementService = require('../services/achievement.service');
+const earningsService = require('../services/earnings.service');
+const { pick } = require('../services/loader.service');
+const { isValidTimezone } = require('../utils/timezone');
+
+// Response projections
+const STATS_FIELDS = 'username level xp balance totalEarned totalWithdrawn streak ' +
+  'tasksCompleted dailyTasksCompleted directReferralCount indirectReferralCount achievements';
 
 // Get user profile
 exports.getProfile = async (req, res) => {
   try {
-    const user = await User.findById(req.user.id)
-      .populate('referredBy', 'username firstName')
-      .populate('directReferrals', 'username firstName level balance')
-      .populate('indirectReferrals', 'username firstName');
+    const user = await User.findById(req.user.id).lean();
 
     if (!user) {
       return res.status(404).json({ success: false, message: 'User not found' });
     }
 
+    // Referees are paged through GET /api/referrals/downline
+    const referredBy = pick(await req.loaders.users.load(user.referredBy), 'username firstName');
+
     res.json({
       success: true,
-      data: user
+      data: { ...user, referredBy }
     });
   } catch (error) {
     res.status(500).json({ success: false, message: error.message });
@@ -26,7 +33,11 @@ exports.getProfile = async (req, res) => {
 // Update user profile
 exports.updateProfile = async (req, res) => {
   try {
-    const { walletAddress, firstName, lastName } = req.body;
+    const { walletAddress, firstName, lastName, timezone } = req.body;
+
+    if (timezone !== undefined && !isValidTimezone(timezone)) {
+      return res.status(400).json({ success: false, message: 'Invalid timezone' });
+    }
 
     const user = await User.findById(req.user.id);
 
@@ -37,8 +48,10 @@ exports.updateProfile = async (req, res) => {
     if (walletAddress) user.walletAddress = walletAddress;
     if (firstName) user.firstName = firstName;
     if (lastName) user.lastName = lastName;
+    if (timezone) user.timezone = timezone;
 
     await user.save();
+    authCache.invalidate(user._id);
 
     res.json({
       success: true,
@@ -54,29 +67,22 @@ exports.updateProfile = async (req, res) => {
 exports.getUserStats = async (req, res) => {
   try {
     const userId = req.user.id;
-    const user = await User.findById(userId);
+    const user = await User.findById(userId)
+      .select(STATS_FIELDS)
+      .lean();
 
     if (!user) {
       return res.status(404).json({ success: false, message: 'User not found' });
     }
 
-    // Get total rewards earned
-    const totalRewards = await Reward.aggregate([
-      { $match: { user: user._id } },
-      { $group: { _id: null, total: { $sum: '$amount' } } }
-    ]);
-
-    // Get task completion stats
-    const taskStats = await TaskCompletion.aggregate([
-      { $match: { user: user._id, status: 'verified' } },
-      { $group: { _id: '$status', count: { $sum: 1 } } }
-    ]);
+    // Get total rewards earned (maintained aggregate, not a ledger scan)
+    const earnings = await earningsService.getSummary(user._id);
 
     // Referral stats
     const referralStats = {
-      directCount: user.directReferrals.length,
-      indirectCount: user.indirectReferrals.length,
-      totalReferrals: user.directReferrals.length + user.indirectReferrals.length
+      directCount: user.directReferralCount,
+      indirectCount: user.indirectReferralCount,
+      totalReferrals: user.directReferralCount + user.indirectReferralCount
     };
 
     res.json({
@@ -92,7 +98,8 @@ exports.getUserStats = async (req, res) => {
           streak: user.streak
         },
         rewards: {
-          total: totalRewards[0]?.total || 0,
+          total: earnings.total,
+          byType: earnings.totals,
           lifetime: user.totalEarned
         },
         tasks: {
@@ -115,7 +122,8 @@ exports.getUserStats = async (req, res) => {
 exports.getUserById = async (req, res) => {
   try {
     const user = await User.findById(req.params.id)
-      .select('username firstName level xp tasksCompleted achievements');
+      .select('username firstName level xp tasksCompleted achievements')
+      .lean();
 
     if (!user) {
       return res.status(404).json({ success: false, message: 'User not found' });
@@ -134,68 +142,24 @@ exports.getUserById = async (req, res) => {
 exports.checkAchievements = async (req, res) => {
   try {
     const userId = req.user.id;
-    const user = await User.findById(userId);
-    const Achievement = require('../models/Achievement.model');
-
-    const allAchievements = await Achievement.find({ isActive: true });
-    const newlyUnlocked = [];
-
-    for (const achievement of allAchievements) {
-      // Check if already unlocked
-      const alreadyHas = user.achievements.some(
-        a => a.achievementId === achievement._id.toString()
-      );
-
-      if (alreadyHas) continue;
-
-      // Check conditions
-      let unlocked = false;
-      switch (achievement.condition.type) {
-        case 'tasks_completed':
-          unlocked = user.tasksCompleted >= achievement.condition.value;
-          break;
-        case 'referrals_count':
-          unlocked = user.directReferrals.length >= achievement.condition.value;
-          break;
-        case 'balance_reached':
-          unlocked = user.balance >= achievement.condition.value;
-          break;
-        case 'streak_days':
-          unlocked = user.streak >= achievement.condition.value;
-          break;
-        case 'level_reached':
-          unlocked = user.level >= achievement.condition.value;
-          break;
-      }
-
-      if (unlocked) {
-        user.achievements.push({
-          achievementId: achievement._id,
-          unlockedAt: new Date()
-        });
+    const user = await User.findById(userId)
+      .select(STATS_FIELDS)
+      .lean();
 
-        // Award achievement rewards
-        if (achievement.reward.coins) {
-          await user.addBalance(achievement.reward.coins);
-        }
-        if (achievement.reward.xp) {
-          await user.addXP(achievement.reward.xp);
-        }
-
-        newlyUnlocked.push(achievement);
-      }
+    if (!user) {
+      return res.status(404).json({ success: false, message: 'User not found' });
     }
 
-    if (newlyUnlocked.length > 0) {
-      await user.save();
-    }
+    const candidates = await achievementService.evaluate(user);
+    const newlyUnlocked = await achievementService.award(user._id, candidates);
+    const totalAchievements = user.achievements.length + newlyUnlocked.length;
 
     res.json({
       success: true,
       message: newlyUnlocked.length > 0 ? 'New achievements unlocked!' : 'No new achievements',
       data: {
         newlyUnlocked,
-        totalAchievements: user.achievements.length
+        totalAchievements
       }
     });
   } catch (error) {
@@ -0,0 +1,210 @@
+const User = require('../models/User.model');
+const Task = require('../models/Task.model');
+const JobCheckpoint = require('../models/JobCheckpoint.model');
+const LedgerEntry = require('../models/LedgerEntry.model');
+const BalanceSnapshot = require('../models/BalanceSnapshot.model');
+const ledger = require('../services/ledger.service');
+const taskCatalog = require('../services/taskCatalog.service');
+const runner = require('./runner');
+
+// Scheduled batch jobs
+// Each run is identified by a runKey (the UTC date it is for), and its
+// filter is derived from that key, so a resumed run selects the same users
+// as the original one.
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+const runKeyFor = (date = new Date()) => date.toISOString().slice(0, 10);
+const startOf = runKey => new Date(`${runKey}T00:00:00.000Z`);
+
+// Every op re-checks its filter, so a user who logs in between the read and
+// the write is left alone
+const guardedOps = (filter, update) => docs => docs.map(doc => ({
+  updateOne: { filter: { $and: [{ _id: doc._id }, filter] }, update }
+}));
+
+// Anyone whose last login before yesterday missed a day. Daily reward
+// days follow each user's time zone, so that cutoff allows for the
+// furthest-ahead zone (UTC+14); the claim itself computes the exact streak.
+const TIMEZONE_SLACK_MS = 14 * 60 * 60 * 1000;
+
+const streakCutoffs = (runKey) => {
+  const login = new Date(startOf(runKey).getTime() - DAY_MS);
+  return { login, dailyReward: new Date(login.getTime() - TIMEZONE_SLACK_MS) };
+};
+
+const streakFilter = (runKey) => {
+  const cutoffs = streakCutoffs(runKey);
+  return {
+    $or: [
+      { streak: { $gt: 0 }, lastLoginDate: { $lt: cutoffs.login } },
+      { dailyRewardStreak: { $gt: 0 }, lastDailyReward: { $lt: cutoffs.dailyReward } }
+    ]
+  };
+};
+
+const definitions = {
+  'streak-reset': {
+    model: User,
+    filter: streakFilter,
+    select: '_id',
+    buildOps: (docs, runKey) => {
+      const cutoffs = streakCutoffs(runKey);
+      return guardedOps(streakFilter(runKey), [{
+        $set: {
+          streak: { $cond: [{ $lt: ['$lastLoginDate', cutoffs.login] }, 0, '$streak'] },
+          dailyRewardStreak: { $cond: [{ $lt: ['$lastDailyReward', cutoffs.dailyReward] }, 0, '$dailyRewardStreak'] }
+        }
+      }])(docs);
+    }
+  },
+
+  'daily-tasks-reset': {
+    model: User,
+    filter: () => ({ dailyTasksCompleted: { $gt: 0 } }),
+    select: '_id',
+    buildOps: docs => guardedOps({ dailyTasksCompleted: { $gt: 0 } }, { $set: { dailyTasksCompleted: 0 } })(docs)
+  },
+
+  'premium-expiry': {
+    model: User,
+    filter: runKey => ({ isPremium: true, premiumExpiry: { $lt: startOf(runKey) } }),
+    select: '_id',
+    buildOps: (docs, runKey) => guardedOps(
+      { isPremium: true, premiumExpiry: { $lt: startOf(runKey) } },
+      { $set: { isPremium: false } }
+    )(docs)
+  },
+
+  // One-off: fill the referral total for accounts created before it existed
+  'referral-totals': {
+    model: User,
+    filter: () => ({ totalReferralCount: { $exists: false } }),
+    select: '_id',
+    buildOps: guardedOps({ totalReferralCount: { $exists: false } }, [{
+      $set: {
+        totalReferralCount: {
+          $add: [{ $ifNull: ['$directReferralCount', 0] }, { $ifNull: ['$indirectReferralCount', 0] }]
+        }
+      }
+    }])
+  }
+};
+
+// Recurring tasks start each period with a fresh global completion count
+for (const period of ['daily', 'weekly', 'monthly']) {
+  const filter = { isRecurring: true, recurringPeriod: period, currentCompletions: { $gt: 0 } };
+  definitions[`${period}-task-rollover`] = {
+    model: Task,
+    filter: () => filter,
+    select: '_id',
+    buildOps: guardedOps(filter, { $set: { currentCompletions: 0 } })
+  };
+}
+
+// Ledger snapshots: the runKey is the window of entry seqs it folds in,
+// "<after>-<through>"
+const SEQ_WINDOW = /^(\d+)-(\d+)$/;
+
+const windowOf = (runKey) => {
+  const [, after, through] = runKey.match(SEQ_WINDOW);
+  return { seq: { $gt: Number(after), $lte: Number(through) } };
+};
+
+definitions['balance-snapshot'] = {
+  model: LedgerEntry,
+  target: BalanceSnapshot,
+  key: 'seq',
+  ordered: true,
+  filter: runKey => ({ ...windowOf(runKey), account: 'user' }),
+  select: 'user amount seq',
+  buildOps: ledger.snapshotOps
+};
+
+for (const [name, definition] of Object.entries(definitions)) definition.name = name;
+
+exports.definitions = definitions;
+
+// Run jobs one after another; one failing does not stop the rest
+const runAll = async (names, runKey) => {
+  const results = {};
+  for (const name of names) {
+    try {
+      results[name] = await runner.run(definitions[name], runKey);
+    } catch (error) {
+      console.error(`❌ Job ${name} (${runKey}) failed:`, error);
+      results[name] = { error: error.message };
+    }
+  }
+  return results;
+};
+
+exports.run = (name, runKey = runKeyFor()) => runner.run(definitions[name], runKey);
+
+// Midnight UTC: user resets, premium expiry, and rollover of daily (and on
+// the 1st, monthly) recurring tasks
+exports.runDaily = async (date = new Date()) => {
+  const runKey = runKeyFor(date);
+  const names = ['streak-reset', 'daily-tasks-reset', 'premium-expiry', 'daily-task-rollover'];
+  if (date.getUTCDate() === 1) names.push('monthly-task-rollover');
+
+  const results = await runAll(names, runKey);
+  await taskCatalog.reload();
+  return results;
+};
+
+// Monday 00:00 UTC: weeks start on Monday, matching task periods
+exports.runWeekly = async (date = new Date()) => {
+  const results = await runAll(['weekly-task-rollover'], runKeyFor(date));
+  await taskCatalog.reload();
+  return results;
+};
+
+// Snapshot ledger entries by insert order, continuing from the last window.
+// Seqs are handed out just before each insert, so the window stops at the
+// last seq inserted LEDGER_SNAPSHOT_LAG_MS ago: every lower seq has landed
+// by then. Entries replayed late from a spool get fresh, higher seqs.
+const SNAPSHOT_LAG_MS = parseInt(process.env.LEDGER_SNAPSHOT_LAG_MS) || 5 * 60 * 1000;
+
+exports.runSnapshot = async () => {
+  const unfinished = await JobCheckpoint.findOne({
+    job: 'balance-snapshot',
+    status: { $ne: 'done' },
+    runKey: SEQ_WINDOW
+  })
+    .select('runKey')
+    .lean();
+  if (unfinished) return runAll(['balance-snapshot'], unfinished.runKey);
+
+  const [last, settled] = await Promise.all([
+    JobCheckpoint.findOne({ job: 'balance-snapshot', status: 'done', runKey: SEQ_WINDOW })
+      .sort({ createdAt: -1 })
+      .select('runKey')
+      .lean(),
+    LedgerEntry.findOne({ insertedAt: { $lte: new Date(Date.now() - SNAPSHOT_LAG_MS) } })
+      .sort({ seq: -1 })
+      .select('seq')
+      .lean()
+  ]);
+
+  const after = last ? Number(last.runKey.match(SEQ_WINDOW)[2]) : 0;
+  const through = settled ? settled.seq : 0;
+  if (through <= after) return {};
+
+  return runAll(['balance-snapshot'], `${after}-${through}`);
+};
+
+// Resume runs left unfinished by a crash or restart
+exports.resumeUnfinished = async () => {
+  const unfinished = await JobCheckpoint.find({
+    status: { $ne: 'done' },
+    lockedUntil: { $lt: new Date() }
+  }).select('job runKey').lean();
+
+  const results = {};
+  for (const { job, runKey } of unfinished) {
+    if (!definitions[job]) continue;
+    Object.assign(results, await runAll([job], runKey));
+  }
+  if (unfinished.length > 0) await taskCatalog.reload();
+  return results;
+};
@@ -0,0 +1,144 @@
+const os = require('os');
+const JobCheckpoint = require('../models/JobCheckpoint.model');
+
+// Streaming batch executor
+// Walks the matching documents in key order (_id unless the definition
+// names another unique field), JOB_BATCH_SIZE at a time, and writes each
+// chunk with one unordered bulkWrite. After every chunk the checkpoint
+// records the last key, so a crashed run resumes where it stopped.
+// Between chunks the runner sleeps in proportion to how long the chunk
+// took (JOB_THROTTLE_RATIO), keeping the database mostly free for
+// foreground traffic.
+const BATCH_SIZE = parseInt(process.env.JOB_BATCH_SIZE) || 1000;
+const THROTTLE_RATIO = parseFloat(process.env.JOB_THROTTLE_RATIO) || 1;
+const MIN_PAUSE_MS = parseInt(process.env.JOB_MIN_PAUSE_MS) || 50;
+const LEASE_MS = parseInt(process.env.JOB_LEASE_MS) || 5 * 60 * 1000;
+const PROGRESS_INTERVAL_MS = 10 * 1000;
+
+const OWNER = `${os.hostname()}:${process.pid}`;
+
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+// Claim a run: create its checkpoint, or take over one whose lease expired.
+// Returns null if the run is finished or another process holds it.
+const acquire = async (job, runKey) => {
+  const now = new Date();
+  const lease = { owner: OWNER, lockedUntil: new Date(now.getTime() + LEASE_MS) };
+
+  try {
+    return await JobCheckpoint.findOneAndUpdate(
+      {
+        _id: `${job}:${runKey}`,
+        status: { $ne: 'done' },
+        $or: [{ lockedUntil: { $lt: now } }, { owner: OWNER }]
+      },
+      {
+        $set: { ...lease, status: 'running' },
+        $setOnInsert: { job, runKey, startedAt: now }
+      },
+      { upsert: true, new: true }
+    ).lean();
+  } catch (error) {
+    // Duplicate key: the checkpoint exists but is done or leased elsewhere
+    if (error.code === 11000) return null;
+    throw error;
+  }
+};
+
+/**
+ * Run one batch job to completion (or resume it).
+ *
+ * definition: {
+ *   name,                  job name
+ *   model,                 Mongoose model to scan
+ *   filter(runKey),        documents to process
+ *   key,                   unique field to walk in order (default: _id)
+ *   select,                projection handed to buildOps
+ *   buildOps(docs, runKey) bulkWrite operations for one chunk
+ *   target,                model the ops are written to (default: model)
+ *   ordered                run each chunk's ops in order (default: false)
+ * }
+ */
+const run = async (definition, runKey) => {
+  const { name, model, select } = definition;
+  const key = definition.key || '_id';
+  const target = definition.target || model;
+  const ordered = Boolean(definition.ordered);
+  const checkpoint = await acquire(name, runKey);
+  if (!checkpoint) return null;
+
+  const filter = definition.filter(runKey);
+  const metrics = {
+    job: name,
+    runKey,
+    batches: checkpoint.batches,
+    processed: checkpoint.processed,
+    modified: checkpoint.modified
+  };
+  let lastId = checkpoint.lastId || null;
+  let durationMs = checkpoint.durationMs;
+  let lastReport = Date.now();
+
+  console.log(`⚙️  Job ${name} (${runKey}) ${lastId ? `resuming after ${lastId}` : 'started'}`);
+
+  try {
+    for (;;) {
+      const started = Date.now();
+
+      const docs = await model.find(lastId !== null ? { $and: [filter, { [key]: { $gt: lastId } }] } : filter)
+        .select(select)
+        .sort({ [key]: 1 })
+        .limit(BATCH_SIZE)
+        .lean();
+
+      if (docs.length === 0) break;
+
+      const ops = definition.buildOps(docs, runKey);
+      const result = ops.length > 0 ? await target.bulkWrite(ops, { ordered }) : null;
+
+      lastId = docs[docs.length - 1][key];
+      metrics.batches++;
+      metrics.processed += docs.length;
+      metrics.modified += result ? result.modifiedCount : 0;
+
+      const elapsed = Date.now() - started;
+      durationMs += elapsed;
+
+      await JobCheckpoint.updateOne({ _id: checkpoint._id, owner: OWNER }, {
+        $set: {
+          lastId,
+          batches: metrics.batches,
+          processed: metrics.processed,
+          modified: metrics.modified,
+          durationMs,
+          lockedUntil: new Date(Date.now() + LEASE_MS)
+        }
+      });
+
+      if (Date.now() - lastReport >= PROGRESS_INTERVAL_MS) {
+        lastReport = Date.now();
+        const rate = Math.round(metrics.processed / Math.max(durationMs / 1000, 0.001));
+        console.log(`⚙️  Job ${name}: ${metrics.processed} processed, ${metrics.modified} modified (${rate}/s)`);
+      }
+
+      if (docs.length < BATCH_SIZE) break;
+      await sleep(Math.max(MIN_PAUSE_MS, elapsed * THROTTLE_RATIO));
+    }
+
+    await JobCheckpoint.updateOne({ _id: checkpoint._id }, {
+      $set: { status: 'done', finishedAt: new Date(), lockedUntil: null, durationMs }
+    });
+
+    console.log(`✅ Job ${name} (${runKey}) done: ${metrics.processed} processed, ${metrics.modified} modified in ${metrics.batches} batches`);
+    return { ...metrics, durationMs };
+  } catch (error) {
+    // Release the lease so the next resume can pick it up straight away
+    await JobCheckpoint.updateOne({ _id: checkpoint._id }, {
+      $set: { status: 'failed', error: error.message, lockedUntil: new Date(0) }
+    }).catch(() => {});
+    throw error;
+  }
+};
+
+exports.run = run;
+exports.BATCH_SIZE = BATCH_SIZE;
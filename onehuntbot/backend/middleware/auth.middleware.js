@@ -1,5 +1,4 @@
-const jwt = require('jsonwebtoken');
-const User = require('../models/User.model');
+const authCache = require('../services/authCache.service');
 
 const auth = async (req, res, next) => {
   try {
@@ -12,8 +11,9 @@ const auth = async (req, res, next) => {
       });
     }
 
-    const decoded = jwt.verify(token, process.env.JWT_SECRET);
-    const user = await User.findById(decoded.id);
+    // Cached token verification and principal lookup
+    const decoded = authCache.verifyToken(token);
+    const user = await authCache.getPrincipal(decoded.id);
 
     if (!user) {
       return res.status(401).json({ 
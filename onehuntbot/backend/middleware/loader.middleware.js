@@ -0,0 +1,9 @@
+const { createLoaders } = require('../services/loader.service');
+
+// Attach fresh per-request loaders (see services/loader.service.js)
+const loaders = (req, res, next) => {
+  req.loaders = createLoaders();
+  next();
+};
+
+module.exports = loaders;
@@ -0,0 +1,71 @@
+const rateLimit = require('express-rate-limit');
+const cluster = require('../services/cluster.service');
+
+// Rate limiting
+// Write hot paths are limited per authenticated user (sliding window,
+// shared across cluster workers) so users behind one carrier NAT do not
+// throttle each other. Budgets are "<limit>/<seconds>" and can be
+// overridden with RATE_LIMIT_<NAME> (e.g. RATE_LIMIT_SPIN=10/60).
+const DEFAULT_BUDGETS = {
+  spin: '10/60',
+  daily: '5/60',
+  withdraw: '5/3600',
+  taskComplete: '30/60'
+};
+
+const parseBudget = (value) => {
+  const [limit, seconds] = value.split('/').map(Number);
+  return { limit, windowMs: seconds * 1000 };
+};
+
+const budgetFor = (name) => {
+  const envName = `RATE_LIMIT_${name.replace(/[A-Z]/g, c => `_${c}`).toUpperCase()}`;
+  return parseBudget(process.env[envName] || DEFAULT_BUDGETS[name]);
+};
+
+// Per-user limiter for one route; use after the auth middleware
+exports.userLimit = (name) => {
+  const { limit, windowMs } = budgetFor(name);
+
+  return async (req, res, next) => {
+    try {
+      const result = await cluster.call('slide', `user:${name}:${req.user.id}`, windowMs, limit);
+
+      res.set('RateLimit-Limit', String(limit));
+      res.set('RateLimit-Remaining', String(result.remaining));
+
+      if (!result.allowed) {
+        res.set('Retry-After', String(Math.ceil(result.retryAfterMs / 1000)));
+        return res.status(429).json({
+          success: false,
+          message: 'Too many requests, please try again later.'
+        });
+      }
+
+      next();
+    } catch (error) {
+      // Fail open: a limiter problem must not take the endpoint down
+      console.error(`❌ Rate limiter ${name} failed:`, error);
+      next();
+    }
+  };
+};
+
+// Unauthenticated login: its own per-IP budget
+exports.authLimit = rateLimit({
+  windowMs: 15 * 60 * 1000, // 15 minutes
+  max: parseInt(process.env.AUTH_RATE_LIMIT) || 100,
+  standardHeaders: true,
+  legacyHeaders: false,
+  store: new cluster.RateLimitStore({ prefix: 'auth:' })
+});
+
+// Coarse per-IP backstop for the whole API (flood protection only; high
+// enough that users sharing an IP are not affected)
+exports.ipLimit = rateLimit({
+  windowMs: 60 * 1000,
+  max: parseInt(process.env.API_IP_RATE_LIMIT) || 600,
+  standardHeaders: true,
+  legacyHeaders: false,
+  store: new cluster.RateLimitStore({ prefix: 'api:' })
+});
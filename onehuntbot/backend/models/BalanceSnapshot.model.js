@@ -0,0 +1,25 @@
+const mongoose = require('mongoose');
+
+// Latest ledger balance per user (keyed by the user's _id), covering every
+// entry up to lastSeq. Advanced incrementally by the balance-snapshot job.
+const balanceSnapshotSchema = new mongoose.Schema({
+  _id: {
+    type: mongoose.Schema.Types.ObjectId,
+    ref: 'User'
+  },
+
+  // Integer minor units
+  balance: {
+    type: Number,
+    default: 0
+  },
+  lastSeq: Number,
+  entryCount: {
+    type: Number,
+    default: 0
+  },
+
+  takenAt: Date
+});
+
+module.exports = mongoose.model('BalanceSnapshot', balanceSnapshotSchema);
@@ -0,0 +1,24 @@
+const mongoose = require('mongoose');
+
+// Named monotonic counters; used to hand out disjoint ranges of sequence
+// numbers (e.g. referral codes) to each process
+const counterSchema = new mongoose.Schema({
+  _id: String,
+  seq: {
+    type: Number,
+    default: 0
+  }
+});
+
+// Reserve `count` values; returns the first and last of the range
+counterSchema.statics.reserve = async function(name, count) {
+  const counter = await this.findOneAndUpdate(
+    { _id: name },
+    { $inc: { seq: count } },
+    { upsert: true, new: true }
+  ).lean();
+
+  return { first: counter.seq - count + 1, last: counter.seq };
+};
+
+module.exports = mongoose.model('Counter', counterSchema);
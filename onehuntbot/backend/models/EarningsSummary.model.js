@@ -0,0 +1,41 @@
+const mongoose = require('mongoose');
+
+// Running reward totals per user, keyed by the user's _id. Maintained on
+// every Reward insert and periodically reconciled against the ledger.
+const earningsSummarySchema = new mongoose.Schema({
+  _id: {
+    type: mongoose.Schema.Types.ObjectId,
+    ref: 'User'
+  },
+
+  // Reward type -> total amount / number of rewards
+  totals: {
+    type: Map,
+    of: Number,
+    default: {}
+  },
+  counts: {
+    type: Map,
+    of: Number,
+    default: {}
+  },
+
+  total: {
+    type: Number,
+    default: 0
+  },
+  xp: {
+    type: Number,
+    default: 0
+  },
+  rewardCount: {
+    type: Number,
+    default: 0
+  },
+
+  reconciledAt: Date
+}, {
+  timestamps: true
+});
+
+module.exports = mongoose.model('EarningsSummary', earningsSummarySchema);
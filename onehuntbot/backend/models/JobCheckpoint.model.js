@@ -0,0 +1,57 @@
+const mongoose = require('mongoose');
+
+// Progress of one run of a batch job (see backend/jobs), keyed
+// "<job>:<runKey>". Lets a crashed run resume after the last chunk it
+// wrote, and doubles as the job's progress record.
+const jobCheckpointSchema = new mongoose.Schema({
+  _id: String,
+  job: {
+    type: String,
+    required: true
+  },
+  runKey: {
+    type: String,
+    required: true
+  },
+
+  status: {
+    type: String,
+    enum: ['running', 'done', 'failed'],
+    default: 'running'
+  },
+  // Lease held by the process running the job
+  owner: String,
+  lockedUntil: Date,
+
+  // Keyset position: last key (usually _id) whose chunk was written
+  lastId: mongoose.Schema.Types.Mixed,
+
+  // Progress metrics
+  batches: {
+    type: Number,
+    default: 0
+  },
+  processed: {
+    type: Number,
+    default: 0
+  },
+  modified: {
+    type: Number,
+    default: 0
+  },
+  durationMs: {
+    type: Number,
+    default: 0
+  },
+
+  startedAt: Date,
+  finishedAt: Date,
+  error: String
+}, {
+  timestamps: true
+});
+
+jobCheckpointSchema.index({ job: 1, createdAt: -1 });
+jobCheckpointSchema.index({ status: 1, lockedUntil: 1 });
+
+module.exports = mongoose.model('JobCheckpoint', jobCheckpointSchema);
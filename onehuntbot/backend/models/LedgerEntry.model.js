@@ -0,0 +1,53 @@
+const mongoose = require('mongoose');
+
+// Append-only double-entry ledger. Every balance change is one posting made
+// of lines that sum to zero: the user's account on one side, a system
+// account (system:<type>) on the other. Amounts are integer minor units
+// (see ledger.service SCALE).
+const ledgerEntrySchema = new mongoose.Schema({
+  posting: {
+    type: mongoose.Schema.Types.ObjectId,
+    required: true
+  },
+
+  // "user" lines carry the user id; system lines do not
+  account: {
+    type: String,
+    required: true
+  },
+  user: {
+    type: mongoose.Schema.Types.ObjectId,
+    ref: 'User'
+  },
+
+  amount: {
+    type: Number,
+    required: true,
+    validate: {
+      validator: Number.isInteger,
+      message: 'Ledger amounts must be integer minor units'
+    }
+  },
+
+  type: {
+    type: String,
+    required: true
+  },
+  ref: mongoose.Schema.Types.ObjectId,
+  description: String,
+
+  // Insert-time order, assigned per insert attempt (createdAt and _id are
+  // set when the entry is queued, which can be long before it lands)
+  seq: Number,
+  insertedAt: Date
+}, {
+  timestamps: { createdAt: true, updatedAt: false }
+});
+
+// Per-user tail scans (balance = snapshot + entries after it)
+ledgerEntrySchema.index({ user: 1, seq: 1 }, { partialFilterExpression: { user: { $exists: true } } });
+ledgerEntrySchema.index({ seq: 1 });
+ledgerEntrySchema.index({ account: 1, _id: 1 });
+ledgerEntrySchema.index({ posting: 1 });
+
+module.exports = mongoose.model('LedgerEntry', ledgerEntrySchema);
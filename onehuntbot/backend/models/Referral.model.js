@@ -0,0 +1,39 @@
+const mongoose = require('mongoose');
+
+// One edge per (referrer, referee) pair; level 1 = direct, 2 = indirect
+const referralSchema = new mongoose.Schema({
+  referrer: {
+    type: mongoose.Schema.Types.ObjectId,
+    ref: 'User',
+    required: true
+  },
+
+  referee: {
+    type: mongoose.Schema.Types.ObjectId,
+    ref: 'User',
+    required: true
+  },
+
+  level: {
+    type: Number,
+    default: 1,
+    min: 1
+  },
+
+  // Coins the referrer has earned through this referee
+  earnings: {
+    type: Number,
+    default: 0
+  }
+}, {
+  timestamps: true
+});
+
+// Downline listings: one index per sort, each usable with or without a
+// level filter (level-sorted pages walk the first one)
+referralSchema.index({ referrer: 1, level: 1, createdAt: -1, _id: -1 });
+referralSchema.index({ referrer: 1, createdAt: -1, _id: -1 });
+referralSchema.index({ referrer: 1, earnings: -1, _id: -1 });
+referralSchema.index({ referee: 1, referrer: 1 }, { unique: true });
+
+module.exports = mongoose.model('Referral', referralSchema);
@@ -34,11 +34,15 @@ const rewardSchema = new mongoose.Schema({
   relatedReferral: {
     type: mongoose.Schema.Types.ObjectId,
     ref: 'User'
-  }
+  },
+
+  // Spins are credited in batches after insert; false until then
+  credited: Boolean
 }, {
   timestamps: true
 });
 
 rewardSchema.index({ user: 1, createdAt: -1 });
+rewardSchema.index({ createdAt: 1 }, { partialFilterExpression: { credited: false } });
 
 module.exports = mongoose.model('Reward', rewardSchema);
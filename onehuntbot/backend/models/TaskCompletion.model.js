@@ -33,6 +33,9 @@ const taskCompletionSchema = new mongoose.Schema({
     xp: Number
   },
 
+  // Completion slot: "<period>#<n>", e.g. "once#1" or "2024-05-01#2"
+  periodKey: String,
+
   // Completion details
   completedAt: {
     type: Date,
@@ -45,7 +48,12 @@ const taskCompletionSchema = new mongoose.Schema({
   timestamps: true
 });
 
-// Compound index to prevent duplicate completions
 taskCompletionSchema.index({ user: 1, task: 1 }, { unique: false });
 
+// One completion per (user, task, period slot); guards against double taps
+taskCompletionSchema.index(
+  { user: 1, task: 1, periodKey: 1 },
+  { unique: true, partialFilterExpression: { periodKey: { $exists: true } } }
+);
+
 module.exports = mongoose.model('TaskCompletion', taskCompletionSchema);
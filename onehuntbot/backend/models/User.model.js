@@ -1,4 +1,6 @@
 const mongoose = require('mongoose');
+const events = require('../services/events.service');
+const ledger = require('../services/ledger.service');
 
 const userSchema = new mongoose.Schema({
   telegramId: {
@@ -43,6 +45,11 @@ const userSchema = new mongoose.Schema({
     default: 0
   },
   lastLoginDate: Date,
+  // IANA zone; daily rewards reset at the user's local midnight
+  timezone: {
+    type: String,
+    default: 'UTC'
+  },
 
   // Referrals
   referralCode: {
@@ -54,14 +61,25 @@ const userSchema = new mongoose.Schema({
     type: mongoose.Schema.Types.ObjectId,
     ref: 'User'
   },
-  directReferrals: [{
-    type: mongoose.Schema.Types.ObjectId,
-    ref: 'User'
-  }],
-  indirectReferrals: [{
+  // Referral chain above this user, nearest first (bounded depth)
+  ancestors: [{
     type: mongoose.Schema.Types.ObjectId,
     ref: 'User'
   }],
+  // Edges live in the Referral collection; these are maintained counters
+  directReferralCount: {
+    type: Number,
+    default: 0
+  },
+  indirectReferralCount: {
+    type: Number,
+    default: 0
+  },
+  // Referrals at every paid level (sort key of the referrals leaderboard)
+  totalReferralCount: {
+    type: Number,
+    default: 0
+  },
 
   // Stats
   tasksCompleted: {
@@ -79,6 +97,12 @@ const userSchema = new mongoose.Schema({
     unlockedAt: Date
   }],
 
+  // Spin rows already credited (recent ids; see spin.service)
+  spinCredits: {
+    type: [mongoose.Schema.Types.ObjectId],
+    select: false
+  },
+
   // Daily Rewards
   lastDailyReward: Date,
   dailyRewardStreak: {
@@ -101,6 +125,10 @@ const userSchema = new mongoose.Schema({
   isBanned: {
     type: Boolean,
     default: false
+  },
+  isAdmin: {
+    type: Boolean,
+    default: false
   }
 }, {
   timestamps: true
@@ -110,46 +138,207 @@ const userSchema = new mongoose.Schema({
 userSchema.index({ balance: -1 });
 userSchema.index({ xp: -1 });
 userSchema.index({ level: -1 });
+userSchema.index({ directReferralCount: -1, indirectReferralCount: -1 });
+userSchema.index({ totalReferralCount: -1, directReferralCount: -1 });
+userSchema.index({ ancestors: 1 });
+
+// Staged mutations
+// Balance/XP/streak changes are queued on the document and written by
+// commitStaged() as one atomic $inc/$set update instead of a save() each.
+// Balance changes carry a ledger entry ({ type, ref, description }) that is
+// posted once the update commits.
+const getStaged = (doc) => {
+  if (!doc.$locals.staged) {
+    doc.$locals.staged = { $inc: {}, $set: {}, $push: {}, ledger: [] };
+  }
+  return doc.$locals.staged;
+};
+
+userSchema.methods.stageIncrement = function(field, amount) {
+  const staged = getStaged(this);
+  staged.$inc[field] = (staged.$inc[field] || 0) + amount;
+  this[field] = (this[field] || 0) + amount;
+  return this;
+};
+
+userSchema.methods.stageSet = function(field, value) {
+  getStaged(this).$set[field] = value;
+  this[field] = value;
+  return this;
+};
+
+userSchema.methods.stagePush = function(field, value) {
+  const staged = getStaged(this);
+  if (!staged.$push[field]) {
+    staged.$push[field] = { $each: [] };
+  }
+  staged.$push[field].$each.push(value);
+  this[field].push(value);
+  return this;
+};
 
-// Methods
-userSchema.methods.addBalance = function(amount) {
-  this.balance += amount;
-  this.totalEarned += amount;
-  return this.save();
+userSchema.methods.stageBalance = function(amount, entry = {}) {
+  getStaged(this).ledger.push({ ...entry, amount });
+  this.stageIncrement('balance', amount);
+  return this.stageIncrement('totalEarned', amount);
 };
 
-userSchema.methods.deductBalance = function(amount) {
+userSchema.methods.stageDebit = function(amount, entry = {}) {
   if (this.balance < amount) {
     throw new Error('Insufficient balance');
   }
-  this.balance -= amount;
-  return this.save();
+  getStaged(this).ledger.push({ ...entry, amount: -amount });
+  return this.stageIncrement('balance', -amount);
 };
 
-userSchema.methods.addXP = function(xp) {
-  this.xp += xp;
+userSchema.methods.stageXP = function(xp) {
+  const level = this.level;
+  let newXP = this.xp + xp;
   // Level up logic
-  const xpForNextLevel = this.level * 100;
-  if (this.xp >= xpForNextLevel) {
-    this.level += 1;
-    this.xp -= xpForNextLevel;
+  const xpForNextLevel = level * 100;
+  if (newXP >= xpForNextLevel) {
+    newXP -= xpForNextLevel;
+    this.stageIncrement('level', 1);
   }
-  return this.save();
+  return this.stageIncrement('xp', newXP - this.xp);
 };
 
-userSchema.methods.updateStreak = function() {
+userSchema.methods.stageStreak = function() {
   const today = new Date().setHours(0, 0, 0, 0);
   const lastLogin = this.lastLoginDate ? new Date(this.lastLoginDate).setHours(0, 0, 0, 0) : 0;
   const dayDiff = (today - lastLogin) / (1000 * 60 * 60 * 24);
 
   if (dayDiff === 1) {
-    this.streak += 1;
+    this.stageIncrement('streak', 1);
   } else if (dayDiff > 1) {
-    this.streak = 1;
+    this.stageSet('streak', 1);
+  }
+
+  return this.stageSet('lastLoginDate', new Date());
+};
+
+userSchema.methods.commitStaged = async function() {
+  const staged = this.$locals.staged;
+  if (!staged) return this;
+  if (this.isNew) {
+    this.$locals.staged = null;
+    await this.save();
+    await ledger.postAll(this._id, staged.ledger);
+    return this;
+  }
+
+  const update = {};
+  for (const op of ['$inc', '$set', '$push']) {
+    if (Object.keys(staged[op]).length > 0) update[op] = staged[op];
+  }
+
+  // Net debits are guarded so concurrent requests cannot overdraw
+  const filter = { _id: this._id };
+  if (staged.$inc.balance < 0) {
+    filter.balance = { $gte: -staged.$inc.balance };
+  }
+
+  const result = await this.constructor.updateOne(filter, update);
+  this.$locals.staged = null;
+  if (result.matchedCount === 0) {
+    throw new Error('Insufficient balance');
+  }
+  await ledger.postAll(this._id, staged.ledger);
+
+  for (const op of Object.keys(update)) {
+    Object.keys(update[op]).forEach(field => this.unmarkModified(field));
+  }
+  events.emit('user:updated', this);
+  return this;
+};
+
+// Credit coins/XP (with level-up), bump counters and append to arrays in
+// one update pipeline, without loading the document first
+userSchema.statics.creditStages = function({ coins = 0, xp = 0, inc = {}, append = {} }) {
+  const $set = {
+    balance: { $add: [{ $ifNull: ['$balance', 0] }, coins] },
+    totalEarned: { $add: [{ $ifNull: ['$totalEarned', 0] }, coins] },
+    xp: { $add: [{ $ifNull: ['$xp', 0] }, xp] }
+  };
+  for (const [field, amount] of Object.entries(inc)) {
+    $set[field] = { $add: [{ $ifNull: [`$${field}`, 0] }, amount] };
+  }
+  for (const [field, values] of Object.entries(append)) {
+    $set[field] = { $concatArrays: [{ $ifNull: [`$${field}`, []] }, { $literal: values }] };
   }
 
-  this.lastLoginDate = new Date();
-  return this.save();
+  const xpForNextLevel = { $multiply: [{ $ifNull: ['$level', 1] }, 100] };
+  const levelsUp = { $gte: ['$xp', xpForNextLevel] };
+
+  return [
+    { $set },
+    {
+      $set: {
+        level: { $cond: [levelsUp, { $add: [{ $ifNull: ['$level', 1] }, 1] }, '$level'] },
+        xp: { $cond: [levelsUp, { $subtract: ['$xp', xpForNextLevel] }, '$xp'] }
+      }
+    }
+  ];
+};
+
+// `credit.entry` describes the ledger posting for the coins
+userSchema.statics.credit = async function(filter, credit, options = {}) {
+  const user = await this.findOneAndUpdate(filter, this.creditStages(credit), {
+    new: true,
+    ...options
+  });
+  if (user) {
+    if (credit.coins) await ledger.post({ ...credit.entry, user: user._id, amount: credit.coins });
+    events.emit('user:updated', user);
+  }
+  return user;
+};
+
+// Bulk writes bypass the documents: reload the changed users and announce
+// them, so the rank index and caches see the new balances
+const ANNOUNCED_FIELDS = 'telegramId username balance totalEarned level xp isActive isBanned isAdmin';
+
+userSchema.statics.announce = async function(ids) {
+  if (ids.length === 0) return;
+  const users = await this.find({ _id: { $in: ids } }).select(ANNOUNCED_FIELDS).lean();
+  users.forEach(user => events.emit('user:updated', user));
+};
+
+userSchema.post('save', function(doc) {
+  events.emit('user:updated', doc);
+});
+
+// Query updates bypass the document, so announce changes to the fields
+// that authentication caches (bans, admin flags, usernames)
+const PRINCIPAL_FIELDS = ['username', 'isBanned', 'isAdmin', 'isActive'];
+
+userSchema.post(['updateOne', 'updateMany', 'findOneAndUpdate'], function() {
+  const update = this.getUpdate();
+  if (!update || Array.isArray(update)) return;
+
+  const touched = [update, update.$set || {}, update.$unset || {}];
+  if (!PRINCIPAL_FIELDS.some(field => touched.some(fields => field in fields))) return;
+
+  const { _id } = this.getFilter();
+  const isSingleId = _id && (typeof _id === 'string' || _id instanceof mongoose.Types.ObjectId);
+  events.emit('user:invalidated', isSingleId ? _id : undefined);
+});
+
+// Single-change helpers, each one atomic write
+userSchema.methods.addBalance = function(amount, entry) {
+  return this.stageBalance(amount, entry).commitStaged();
+};
+
+userSchema.methods.deductBalance = function(amount, entry) {
+  return this.stageDebit(amount, entry).commitStaged();
+};
+
+userSchema.methods.addXP = function(xp) {
+  return this.stageXP(xp).commitStaged();
+};
+
+userSchema.methods.updateStreak = function() {
+  return this.stageStreak().commitStaged();
 };
 
 module.exports = mongoose.model('User', userSchema);
@@ -2,9 +2,10 @@ const express = require('express');
 const router = express.Router();
 const authController = require('../controllers/auth.controller');
 const auth = require('../middleware/auth.middleware');
+const { authLimit } = require('../middleware/rateLimit.middleware');
 
 // Telegram authentication
-router.post('/telegram', authController.telegramAuth);
+router.post('/telegram', authLimit, authController.telegramAuth);
 
 // Get current user
 router.get('/me', auth, authController.getCurrentUser);
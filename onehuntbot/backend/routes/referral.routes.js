@@ -6,6 +6,9 @@ const auth = require('../middleware/auth.middleware');
 // Get referral info
 router.get('/info', auth, referralController.getReferralInfo);
 
+// Get downline (paged)
+router.get('/downline', auth, referralController.getDownline);
+
 // Apply referral code
 router.post('/apply', auth, referralController.applyReferralCode);
 
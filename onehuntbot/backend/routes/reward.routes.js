@@ -2,12 +2,13 @@ const express = require('express');
 const router = express.Router();
 const rewardController = require('../controllers/reward.controller');
 const auth = require('../middleware/auth.middleware');
+const { userLimit } = require('../middleware/rateLimit.middleware');
 
 // Claim daily reward
-router.post('/daily', auth, rewardController.claimDailyReward);
+router.post('/daily', auth, userLimit('daily'), rewardController.claimDailyReward);
 
 // Spin the wheel
-router.post('/spin', auth, rewardController.spinWheel);
+router.post('/spin', auth, userLimit('spin'), rewardController.spinWheel);
 
 // Get reward history
 router.get('/history', auth, rewardController.getRewardHistory);
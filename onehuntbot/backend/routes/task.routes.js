@@ -2,6 +2,7 @@ const express = require('express');
 const router = express.Router();
 const taskController = require('../controllers/task.controller');
 const auth = require('../middleware/auth.middleware');
+const { userLimit } = require('../middleware/rateLimit.middleware');
 
 // Get all tasks
 router.get('/', auth, taskController.getAllTasks);
@@ -13,7 +14,7 @@ router.get('/:id', auth, taskController.getTaskById);
 router.get('/type/:type', auth, taskController.getTasksByType);
 
 // Complete task
-router.post('/:id/complete', auth, taskController.completeTask);
+router.post('/:id/complete', auth, userLimit('taskComplete'), taskController.completeTask);
 
 // Get user's completed tasks
 router.get('/user/completed', auth, taskController.getUserCompletedTasks);
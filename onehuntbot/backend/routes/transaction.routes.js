@@ -2,12 +2,13 @@ const express = require('express');
 const router = express.Router();
 const transactionController = require('../controllers/transaction.controller');
 const auth = require('../middleware/auth.middleware');
+const { userLimit } = require('../middleware/rateLimit.middleware');
 
 // Get transaction history
 router.get('/', auth, transactionController.getTransactionHistory);
 
 // Request withdrawal
-router.post('/withdraw', auth, transactionController.requestWithdrawal);
+router.post('/withdraw', auth, userLimit('withdraw'), transactionController.requestWithdrawal);
 
 // Get withdrawal status
 router.get('/withdraw/:transactionId', auth, transactionController.getWithdrawalStatus);
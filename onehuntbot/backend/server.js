@@ -2,10 +2,8 @@ const express = require('express');
 const mongoose = require('mongoose');
 const cors = require('cors');
 const helmet = require('helmet');
-const rateLimit = require('express-rate-limit');
 require('dotenv').config();
 
-const TelegramBot = require('node-telegram-bot-api');
 const cron = require('node-cron');
 
 // Import routes
@@ -19,25 +17,48 @@ const leaderboardRoutes = require('./routes/leaderboard.routes');
 
 // Import middleware
 const errorHandler = require('./middleware/error.middleware');
+const { ipLimit } = require('./middleware/rateLimit.middleware');
+const loaders = require('./middleware/loader.middleware');
+
+// Telegram bot (mode, queue and command handlers live in ./bot)
+const telegram = require('./bot');
+const { bot } = telegram;
+
+// Import services
+const leaderboardService = require('./services/leaderboard.service');
+const rankIndex = require('./services/rankIndex.service');
+const rewardWriter = require('./services/rewardWriter.service');
+const earningsService = require('./services/earnings.service');
+const ledger = require('./services/ledger.service');
+const referralCodes = require('./services/referralCode.service');
+const spinService = require('./services/spin.service');
+const cluster = require('./services/cluster.service');
+const jobs = require('./jobs');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
 
-// Initialize Telegram Bot
-const bot = new TelegramBot(process.env.TELEGRAM_BOT_TOKEN, { polling: true });
+// This process enforces spin and daily budgets, so it keeps them on disk
+cluster.persistBudgets();
+
+// Behind a reverse proxy, set TRUST_PROXY (hop count) so per-IP limits see
+// client addresses instead of the proxy's
+if (process.env.TRUST_PROXY) {
+  app.set('trust proxy', parseInt(process.env.TRUST_PROXY) || process.env.TRUST_PROXY);
+}
 
 // Middleware
 app.use(helmet());
-app.use(cors());
+app.use(cors({ exposedHeaders: ['ETag'] }));
 app.use(express.json());
 app.use(express.urlencoded({ extended: true }));
 
-// Rate limiting
-const limiter = rateLimit({
-  windowMs: 15 * 60 * 1000, // 15 minutes
-  max: 100 // limit each IP to 100 requests per windowMs
-});
-app.use('/api/', limiter);
+// Rate limiting: per-IP flood backstop here; per-user budgets on the write
+// routes and a per-IP login budget are applied in the routers
+app.use('/api/', ipLimit);
+
+// Per-request batching loaders for referenced users and tasks
+app.use('/api/', loaders);
 
 // Serve static files (frontend)
 app.use(express.static('public'));
@@ -47,7 +68,18 @@ mongoose.connect(process.env.MONGODB_URI, {
   useNewUrlParser: true,
   useUnifiedTopology: true
 })
-.then(() => console.log('✅ MongoDB Connected'))
+.then(() => {
+  console.log('✅ MongoDB Connected');
+  rankIndex.rebuild();
+  referralCodes.warm().catch(err => console.error('❌ Referral code pool refill failed:', err));
+  if (cluster.isLeader()) {
+    leaderboardService.refreshAll();
+    rewardWriter.recover().catch(err => console.error('❌ Reward spool recovery failed:', err));
+    ledger.writer.recover().catch(err => console.error('❌ Ledger spool recovery failed:', err));
+    spinService.writer.recover().catch(err => console.error('❌ Spin spool recovery failed:', err));
+    jobs.resumeUnfinished().catch(err => console.error('❌ Job resume failed:', err));
+  }
+})
 .catch(err => console.error('❌ MongoDB Connection Error:', err));
 
 // Routes
@@ -59,11 +91,8 @@ app.use('/api/referrals', referralRoutes);
 app.use('/api/transactions', transactionRoutes);
 app.use('/api/leaderboard', leaderboardRoutes);
 
-// Telegram Webhook
-app.post('/webhook', (req, res) => {
-  bot.processUpdate(req.body);
-  res.sendStatus(200);
-});
+// Telegram Webhook: acknowledge immediately, process from the queue
+app.post('/webhook', telegram.webhook);
 
 // Health check
 app.get('/health', (req, res) => {
@@ -74,52 +103,94 @@ app.get('/health', (req, res) => {
 app.use(errorHandler);
 
 // Scheduled Tasks
-// Daily reward reset
-cron.schedule('0 0 * * *', async () => {
-  console.log('Running daily reset tasks...');
-  // Reset daily tasks, distribute rewards, etc.
-});
+// In-process caches are refreshed by every worker; leaderboard snapshots
+// and jobs that write to the database run only on the leader (see cluster.js)
 
-// Weekly leaderboard update
-cron.schedule('0 0 * * 0', async () => {
-  console.log('Running weekly leaderboard update...');
+// Rank index rebuild (corrects drift from missed or concurrent updates)
+cron.schedule(process.env.RANK_INDEX_REBUILD_CRON || '0 * * * *', async () => {
+  await rankIndex.rebuild();
 });
 
-// Telegram Bot Commands
-bot.onText(/\/start/, async (msg) => {
-  const chatId = msg.chat.id;
-  const userId = msg.from.id;
-  const username = msg.from.username || msg.from.first_name;
-
-  bot.sendMessage(chatId, \`Welcome to XCX Wallet Bot, \${username}! 🎉\n\nOpen the app to get started!\`, {
-    reply_markup: {
-      inline_keyboard: [[
-        { text: '🚀 Open App', web_app: { url: process.env.BASE_URL } }
-      ]]
+if (cluster.isLeader()) {
+  // Leaderboard snapshot refresh (broadcast to the other workers)
+  cron.schedule(process.env.LEADERBOARD_REFRESH_CRON || '*/5 * * * *', async () => {
+    await leaderboardService.refreshAll();
+  });
+
+  // Credit spins whose batch commit failed
+  cron.schedule(process.env.SPIN_SWEEP_CRON || '* * * * *', async () => {
+    try {
+      await spinService.sweep();
+    } catch (err) {
+      console.error('❌ Spin sweep failed:', err);
     }
   });
-});
 
-bot.onText(/\/help/, (msg) => {
-  const helpText = \`
-🤖 *XCX Wallet Bot Commands*
+  // Daily resets: streaks, daily task counts, premium expiry, recurring tasks
+  cron.schedule('0 0 * * *', async () => {
+    console.log('Running daily reset tasks...');
+    await jobs.runDaily();
+  }, { timezone: 'Etc/UTC' });
+
+  // Earnings summary reconciliation against the Reward ledger (off-peak)
+  cron.schedule(process.env.EARNINGS_RECONCILE_CRON || '30 3 * * *', async () => {
+    try {
+      await earningsService.reconcile();
+    } catch (err) {
+      console.error('❌ Earnings reconciliation failed:', err);
+    }
+  });
 
-/start - Start the bot
-/help - Show this help message
-/balance - Check your balance
-/tasks - View available tasks
-/referral - Get your referral link
-/leaderboard - View top users
-/withdraw - Withdraw your earnings
-  \`;
+  // Ledger balance snapshots (incremental: only entries since the last run)
+  cron.schedule(process.env.LEDGER_SNAPSHOT_CRON || '15 * * * *', async () => {
+    try {
+      await jobs.runSnapshot();
+    } catch (err) {
+      console.error('❌ Ledger snapshot failed:', err);
+    }
+  });
 
-  bot.sendMessage(msg.chat.id, helpText, { parse_mode: 'Markdown' });
-});
+  // Weekly recurring-task rollover (weeks start on Monday)
+  cron.schedule('0 0 * * 1', async () => {
+    console.log('Running weekly reset tasks...');
+    await jobs.runWeekly();
+  }, { timezone: 'Etc/UTC' });
+}
 
 // Start server
-app.listen(PORT, () => {
-  console.log(\`🚀 Server running on port \${PORT}\`);
-  console.log(\`📱 Telegram Bot is active\`);
+const server = app.listen(PORT, () => {
+  console.log(`🚀 Server running on port ${PORT}`);
+  console.log(`📱 Telegram Bot is active (${telegram.MODE} mode)`);
+  if (cluster.isLeader()) {
+    telegram.registerWebhook().catch(err => console.error('❌ Webhook registration failed:', err));
+  }
 });
 
+// Graceful shutdown: stop accepting requests, then drain buffered writes
+// (a clustered worker can get both the terminal's SIGINT and the primary's
+// SIGTERM, so the second signal is ignored)
+let shuttingDown = false;
+const shutdown = async (signal) => {
+  if (shuttingDown) return;
+  shuttingDown = true;
+  console.log(`${signal} received, shutting down...`);
+  server.close();
+
+  try {
+    await telegram.stop();
+    await rewardWriter.close();
+    await spinService.writer.close();
+    await ledger.writer.close();
+    cluster.persist();
+    await mongoose.disconnect();
+    process.exit(0);
+  } catch (err) {
+    console.error('❌ Shutdown error:', err);
+    process.exit(1);
+  }
+};
+
+process.on('SIGTERM', () => shutdown('SIGTERM'));
+process.on('SIGINT', () => shutdown('SIGINT'));
+
 module.exports = { app, bot };
@@ -0,0 +1,164 @@
+const Achievement = require('../models/Achievement.model');
+const User = require('../models/User.model');
+const rewardWriter = require('./rewardWriter.service');
+
+// Achievement engine
+// Active achievements are indexed per condition type as arrays sorted by
+// threshold, so a stat change only binary-searches the thresholds it
+// crossed. Everything newly unlocked is awarded in one user write.
+const TTL = parseInt(process.env.ACHIEVEMENT_CACHE_TTL_MS) || 5 * 60 * 1000;
+
+// Condition type -> User field it is measured on
+const STAT_FIELDS = {
+  tasks_completed: 'tasksCompleted',
+  referrals_count: 'directReferralCount',
+  balance_reached: 'balance',
+  streak_days: 'streak',
+  level_reached: 'level'
+};
+
+let index = null;
+let loading = null;
+
+const buildIndex = (achievements) => {
+  const thresholds = {};
+  for (const type of Object.keys(STAT_FIELDS)) thresholds[type] = [];
+
+  for (const achievement of achievements) {
+    const { type, value } = achievement.condition || {};
+    if (thresholds[type] && typeof value === 'number') {
+      thresholds[type].push(achievement);
+    }
+  }
+  for (const list of Object.values(thresholds)) {
+    list.sort((a, b) => a.condition.value - b.condition.value);
+  }
+
+  return { loadedAt: Date.now(), thresholds };
+};
+
+const reload = () => {
+  if (!loading) {
+    loading = Achievement.find({ isActive: true })
+      .lean()
+      .then(achievements => {
+        index = buildIndex(achievements);
+        return index;
+      })
+      .finally(() => {
+        loading = null;
+      });
+  }
+  return loading;
+};
+
+exports.reload = reload;
+
+const getIndex = async () => {
+  if (!index || Date.now() - index.loadedAt > TTL) return reload();
+  return index;
+};
+
+// Number of achievements in a sorted list whose threshold is <= value
+const upperBound = (list, value) => {
+  let lo = 0;
+  let hi = list.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (list[mid].condition.value <= value) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+};
+
+// Achievements the user qualifies for but does not own yet. `previous`
+// holds stat values from before a change; types it covers only examine the
+// thresholds crossed since then, the rest are checked from zero.
+exports.evaluate = async (user, previous = {}) => {
+  const { thresholds } = await getIndex();
+  const owned = new Set((user.achievements || []).map(a => String(a.achievementId)));
+  const unlocked = [];
+
+  for (const [type, field] of Object.entries(STAT_FIELDS)) {
+    const list = thresholds[type];
+    if (list.length === 0) continue;
+
+    const value = user[field] || 0;
+    const from = field in previous ? upperBound(list, previous[field]) : 0;
+    const to = upperBound(list, value);
+
+    for (let i = from; i < to; i++) {
+      if (!owned.has(list[i]._id.toString())) unlocked.push(list[i]);
+    }
+  }
+  return unlocked;
+};
+
+// One conditional credit for a set of achievements; matches only if the
+// user owns none of them yet
+const creditAchievements = (userId, achievements, now) => {
+  const ids = achievements.map(a => a._id.toString());
+  return User.credit(
+    { _id: userId, 'achievements.achievementId': { $nin: ids } },
+    {
+      coins: achievements.reduce((sum, a) => sum + (a.reward?.coins || 0), 0),
+      xp: achievements.reduce((sum, a) => sum + (a.reward?.xp || 0), 0),
+      entry: { type: 'achievement', description: `Achievements: ${ids.join(', ')}` },
+      append: { achievements: ids.map(achievementId => ({ achievementId, unlockedAt: now })) }
+    }
+  );
+};
+
+// Award achievements, normally in a single conditional write. If that does
+// not match (a concurrent award got one of them first), fall back to one
+// write per achievement so the others are still awarded exactly once.
+// Returns the achievements this call actually awarded.
+exports.award = async (userId, achievements) => {
+  if (achievements.length === 0) return [];
+
+  const now = new Date();
+  let awarded = [];
+
+  if (await creditAchievements(userId, achievements, now)) {
+    awarded = achievements;
+  } else if (achievements.length > 1) {
+    for (const achievement of achievements) {
+      if (await creditAchievements(userId, [achievement], now)) awarded.push(achievement);
+    }
+  }
+
+  awarded.forEach(achievement => rewardWriter.enqueue({
+    user: userId,
+    type: 'achievement',
+    amount: achievement.reward?.coins || 0,
+    xp: achievement.reward?.xp || 0,
+    description: `Achievement unlocked: ${achievement.name}`
+  }));
+
+  return awarded;
+};
+
+// Evaluate after a stat change and award anything newly crossed. `user`
+// must include `achievements` and the stat fields that changed.
+exports.onStatsChanged = async (user, previous) => {
+  const unlocked = await exports.evaluate(user, previous);
+  return exports.award(user._id, unlocked);
+};
+
+// For bulk updates that do not return the documents (referral payouts,
+// spin batches): load the users' stats and check every threshold
+const CHECK_FIELDS = `achievements ${Object.values(STAT_FIELDS).join(' ')}`;
+
+exports.checkUsers = async (userIds) => {
+  if (userIds.length === 0) return;
+  const users = await User.find({ _id: { $in: userIds } }).select(CHECK_FIELDS).lean();
+  for (const user of users) {
+    await exports.onStatsChanged(user);
+  }
+};
+
+// Fire-and-forget variant for request paths
+exports.check = (user, previous) => {
+  exports.onStatsChanged(user, previous)
+    .catch(error => console.error('❌ Achievement check failed:', error));
+};
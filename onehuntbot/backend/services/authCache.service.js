@@ -0,0 +1,84 @@
+const crypto = require('crypto');
+const jwt = require('jsonwebtoken');
+const User = require('../models/User.model');
+const LRUCache = require('../utils/lruCache');
+const events = require('./events.service');
+const cluster = require('./cluster.service');
+
+// Authenticated principal cache
+// Caches verified JWTs (keyed by token hash) and a small projection of the
+// user so the auth middleware does not hit Mongo on every request.
+const PRINCIPAL_FIELDS = 'username isBanned isAdmin isActive';
+const TTL = parseInt(process.env.AUTH_CACHE_TTL_MS) || 60 * 1000;
+const MAX_ENTRIES = parseInt(process.env.AUTH_CACHE_MAX) || 50000;
+
+const tokens = new LRUCache({ max: MAX_ENTRIES, ttl: TTL });
+const principals = new LRUCache({ max: MAX_ENTRIES, ttl: TTL });
+const loading = new Map();
+
+const hashToken = (token) => crypto.createHash('sha256').update(token).digest('base64');
+
+// Verify a JWT, reusing the result for repeated tokens; throws like jwt.verify
+exports.verifyToken = (token) => {
+  const key = hashToken(token);
+  const cached = tokens.get(key);
+  if (cached) return cached;
+
+  const decoded = jwt.verify(token, process.env.JWT_SECRET);
+  const ttl = decoded.exp ? Math.min(TTL, decoded.exp * 1000 - Date.now()) : TTL;
+  tokens.set(key, decoded, ttl);
+  return decoded;
+};
+
+// Load the principal for a user id; concurrent misses share one query
+exports.getPrincipal = async (id) => {
+  const key = id.toString();
+  const cached = principals.get(key);
+  if (cached) return cached;
+
+  if (!loading.has(key)) {
+    loading.set(key, User.findById(key)
+      .select(PRINCIPAL_FIELDS)
+      .lean()
+      .then(user => {
+        if (!user) return null;
+        const principal = { ...user, id: user._id.toString() };
+        principals.set(key, principal);
+        return principal;
+      })
+      .finally(() => loading.delete(key)));
+  }
+  return loading.get(key);
+};
+
+const dropLocal = (id) => {
+  if (id === undefined || id === null) {
+    principals.clear();
+    return;
+  }
+  principals.delete(id.toString());
+};
+
+// Drop a principal (or all of them) here and in every other worker
+const invalidate = (id) => {
+  dropLocal(id);
+  cluster.publish('authCache:invalidate', id === undefined || id === null ? null : id.toString());
+};
+
+exports.invalidate = invalidate;
+
+cluster.subscribe('authCache:invalidate', dropLocal);
+
+// Document saves: drop the entry only if a cached field actually changed
+events.on('user:updated', (user) => {
+  const cached = principals.get(user._id.toString());
+  if (!cached) return;
+
+  const changed = PRINCIPAL_FIELDS.split(' ').some(field => cached[field] !== user[field]);
+  if (changed) invalidate(user._id);
+});
+
+// Query updates that touch principal fields (bans, admin tooling)
+events.on('user:invalidated', invalidate);
+
+exports.PRINCIPAL_FIELDS = PRINCIPAL_FIELDS;
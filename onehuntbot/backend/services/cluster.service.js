@@ -0,0 +1,148 @@
+const cluster = require('cluster');
+const MemoryStore = require('../utils/memoryStore');
+
+// Worker side of cluster mode (see backend/cluster.js)
+// - call(op, ...args): shared store operation, answered by the primary
+// - publish/subscribe: fan a message out to every other worker
+// - sendToLeader: deliver a message to the designated worker (bot, jobs)
+// - askLeader: the same, resolving with the leader handler's answer
+// Outside cluster mode (or if the primary does not answer) everything runs
+// against a local in-memory stand-in, so single-process behavior is unchanged.
+const clustered = cluster.isWorker && process.env.CLUSTER_LEADER !== undefined;
+const CALL_TIMEOUT = parseInt(process.env.CLUSTER_CALL_TIMEOUT_MS) || 1000;
+
+// Importing this module never persists anything: other processes that load
+// it (bot worker, scripts) would overwrite the server's budgets file
+const localStore = new MemoryStore();
+const subscribers = new Map(); // channel -> handlers
+const pending = new Map();     // request id -> { resolve, timer }
+let nextId = 0;
+
+const isLeader = () => !clustered || process.env.CLUSTER_LEADER === 'true';
+
+const deliver = (channel, payload) => {
+  for (const handler of subscribers.get(channel) || []) {
+    try {
+      handler(payload);
+    } catch (error) {
+      console.error(`❌ Cluster handler for ${channel} failed:`, error);
+    }
+  }
+};
+
+// Value returned by the first handler for a channel (askLeader)
+const answer = (channel, payload) => {
+  const [handler] = subscribers.get(channel) || [];
+  if (!handler) return false;
+  try {
+    return handler(payload);
+  } catch (error) {
+    console.error(`❌ Cluster handler for ${channel} failed:`, error);
+    return false;
+  }
+};
+
+const callLocal = (op, args) => localStore[op](...args);
+
+// Send a request answered with { cluster: 'reply', id, result }; resolves
+// with fallback() if no reply arrives in time
+const request = (message, fallback) => new Promise((resolve) => {
+  const id = ++nextId;
+  const timer = setTimeout(() => {
+    pending.delete(id);
+    resolve(fallback());
+  }, CALL_TIMEOUT);
+
+  pending.set(id, { resolve, timer });
+  process.send({ ...message, id });
+});
+
+exports.clustered = clustered;
+
+// Server entrypoint outside cluster mode: the local store is the real one,
+// so its budgets are persisted (in cluster mode the primary does this)
+exports.persistBudgets = () => {
+  if (!clustered) localStore.persistTo(MemoryStore.defaultPersistPath());
+};
+
+// Save persisted state now (graceful shutdown)
+exports.persist = () => localStore.save();
+exports.isLeader = isLeader;
+
+exports.call = (op, ...args) => {
+  if (!MemoryStore.OPERATIONS.includes(op)) {
+    return Promise.reject(new Error(`Unknown store operation: ${op}`));
+  }
+  if (!clustered) return Promise.resolve(callLocal(op, args));
+
+  // A primary that stops answering degrades to per-worker counting
+  return request({ cluster: 'call', op, args }, () => callLocal(op, args));
+};
+
+exports.subscribe = (channel, handler) => {
+  if (!subscribers.has(channel)) subscribers.set(channel, []);
+  subscribers.get(channel).push(handler);
+};
+
+// Other workers only: the publisher has already applied the change locally
+exports.publish = (channel, payload) => {
+  if (clustered) process.send({ cluster: 'publish', channel, payload });
+};
+
+exports.sendToLeader = (channel, payload) => {
+  if (isLeader()) deliver(channel, payload);
+  else process.send({ cluster: 'leader', channel, payload });
+};
+
+// Resolves with the leader's answer, or false if it does not answer in time
+exports.askLeader = (channel, payload) => {
+  if (isLeader()) return Promise.resolve(answer(channel, payload));
+  return request({ cluster: 'ask', channel, payload }, () => false);
+};
+
+if (clustered) {
+  process.on('message', (message) => {
+    if (!message || typeof message.cluster !== 'string') return;
+
+    if (message.cluster === 'reply') {
+      const request = pending.get(message.id);
+      if (!request) return;
+      pending.delete(message.id);
+      clearTimeout(request.timer);
+      request.resolve(message.result);
+    } else if (message.cluster === 'message') {
+      deliver(message.channel, message.payload);
+    } else if (message.cluster === 'ask') {
+      Promise.resolve(answer(message.channel, message.payload))
+        .catch(() => false)
+        .then(result => process.send({ cluster: 'answer', id: message.id, to: message.from, result }));
+    }
+  });
+}
+
+// express-rate-limit store backed by the shared counters
+class RateLimitStore {
+  constructor({ prefix = 'rl:' } = {}) {
+    this.prefix = prefix;
+    this.localKeys = !clustered;
+  }
+
+  init(options) {
+    this.windowMs = options.windowMs;
+  }
+
+  async increment(key) {
+    const { totalHits, resetTime } = await exports.call('increment', this.prefix + key, this.windowMs);
+    return { totalHits, resetTime: new Date(resetTime) };
+  }
+
+  async decrement(key) {
+    await exports.call('decrement', this.prefix + key);
+  }
+
+  async resetKey(key) {
+    await exports.call('resetKey', this.prefix + key);
+  }
+}
+
+exports.RateLimitStore = RateLimitStore;
@@ -0,0 +1,116 @@
+const mongoose = require('mongoose');
+const TaskCompletion = require('../models/TaskCompletion.model');
+const LRUCache = require('../utils/lruCache');
+const cluster = require('./cluster.service');
+
+// Per-user task completion index
+// "<taskId>|<period>" -> { used, slots }: completions that count against the
+// limit (pending or verified) and slot numbers taken (rejected rows keep
+// their unique periodKey). Loaded with one $group per user and then kept
+// current incrementally by completeTask.
+const cache = new LRUCache({
+  max: parseInt(process.env.COMPLETION_CACHE_MAX) || 20000,
+  ttl: parseInt(process.env.COMPLETION_CACHE_TTL_MS) || 10 * 60 * 1000
+});
+const loading = new Map();
+
+const pad = (n) => String(n).padStart(2, '0');
+
+// Period a completion counts against: 'once' for one-off tasks, otherwise
+// the UTC day, week (starting Monday) or month it falls in
+const periodOf = (task, date = new Date()) => {
+  if (!task.isRecurring) return 'once';
+
+  const day = `${date.getUTCFullYear()}-${pad(date.getUTCMonth() + 1)}-${pad(date.getUTCDate())}`;
+  switch (task.recurringPeriod) {
+    case 'weekly': {
+      const monday = new Date(date);
+      monday.setUTCDate(date.getUTCDate() - ((date.getUTCDay() + 6) % 7));
+      return `W${monday.getUTCFullYear()}-${pad(monday.getUTCMonth() + 1)}-${pad(monday.getUTCDate())}`;
+    }
+    case 'monthly':
+      return day.slice(0, 7);
+    default:
+      return day;
+  }
+};
+
+exports.periodOf = periodOf;
+
+const countKey = (taskId, period) => `${taskId}|${period}`;
+
+const loadCounts = async (userId) => {
+  const rows = await TaskCompletion.aggregate([
+    { $match: { user: new mongoose.Types.ObjectId(userId) } },
+    {
+      $group: {
+        _id: {
+          task: '$task',
+          period: { $arrayElemAt: [{ $split: [{ $ifNull: ['$periodKey', 'once'] }, '#'] }, 0] }
+        },
+        used: { $sum: { $cond: [{ $eq: ['$status', 'rejected'] }, 0, 1] } },
+        slots: { $max: { $toInt: { $ifNull: [{ $arrayElemAt: [{ $split: ['$periodKey', '#'] }, 1] }, '1'] } } }
+      }
+    }
+  ]);
+
+  const counts = new Map();
+  rows.forEach(row => counts.set(countKey(row._id.task, row._id.period), { used: row.used, slots: row.slots }));
+  return counts;
+};
+
+// Completion counts for a user; concurrent misses share one aggregation
+exports.getCounts = async (userId) => {
+  const key = userId.toString();
+  const cached = cache.get(key);
+  if (cached) return cached;
+
+  if (!loading.has(key)) {
+    loading.set(key, loadCounts(key)
+      .then(counts => {
+        cache.set(key, counts);
+        return counts;
+      })
+      .finally(() => loading.delete(key)));
+  }
+  return loading.get(key);
+};
+
+// Completions already used by a user in a task's current period
+exports.usedInPeriod = (task, counts, now = new Date()) =>
+  (counts.get(countKey(task._id, periodOf(task, now))) || { used: 0 }).used;
+
+// Next free slot number for a new completion in the current period
+exports.nextSlot = (task, counts, now = new Date()) =>
+  (counts.get(countKey(task._id, periodOf(task, now))) || { slots: 0 }).slots + 1;
+
+// Other workers drop their copy of this user's counts
+exports.recordCompletion = (userId, task, period, slot) => {
+  cluster.publish('completionIndex:invalidate', userId.toString());
+
+  const counts = cache.get(userId.toString());
+  if (!counts) return;
+
+  const key = countKey(task._id, period);
+  const current = counts.get(key) || { used: 0, slots: 0 };
+  counts.set(key, { used: current.used + 1, slots: Math.max(current.slots, slot) });
+};
+
+exports.invalidate = (userId) => {
+  cache.delete(userId.toString());
+  cluster.publish('completionIndex:invalidate', userId.toString());
+};
+
+cluster.subscribe('completionIndex:invalidate', userId => cache.delete(userId));
+
+// Whether a user can still complete a task right now
+exports.isAvailable = (task, counts, now = new Date()) => {
+  if (task.startDate && task.startDate > now) return false;
+  if (task.endDate && task.endDate < now) return false;
+
+  if (task.totalCompletionsLimit && task.currentCompletions >= task.totalCompletionsLimit) {
+    return false;
+  }
+
+  return exports.usedInPeriod(task, counts, now) < (task.maxCompletions || 1);
+};
@@ -0,0 +1,86 @@
+const mongoose = require('mongoose');
+const Reward = require('../models/Reward.model');
+const EarningsSummary = require('../models/EarningsSummary.model');
+
+// Per-user earnings aggregates
+// Incremented in bulk as Reward batches are inserted, so stats screens are
+// single-document reads; reconcile() recomputes them from the ledger.
+
+// Fold inserted reward rows into one $inc upsert per user
+exports.applyRewards = async (rows) => {
+  const byUser = new Map();
+
+  for (const row of rows) {
+    const key = row.user.toString();
+    if (!byUser.has(key)) byUser.set(key, {});
+    const $inc = byUser.get(key);
+    const amount = row.amount || 0;
+
+    $inc[`totals.${row.type}`] = ($inc[`totals.${row.type}`] || 0) + amount;
+    $inc[`counts.${row.type}`] = ($inc[`counts.${row.type}`] || 0) + 1;
+    $inc.total = ($inc.total || 0) + amount;
+    $inc.xp = ($inc.xp || 0) + (row.xp || 0);
+    $inc.rewardCount = ($inc.rewardCount || 0) + 1;
+  }
+
+  if (byUser.size === 0) return;
+
+  await EarningsSummary.bulkWrite([...byUser].map(([userId, $inc]) => ({
+    updateOne: {
+      filter: { _id: new mongoose.Types.ObjectId(userId) },
+      update: { $inc },
+      upsert: true
+    }
+  })), { ordered: false });
+};
+
+const EMPTY_SUMMARY = { totals: {}, counts: {}, total: 0, xp: 0, rewardCount: 0 };
+
+exports.getSummary = async (userId) => {
+  const summary = await EarningsSummary.findById(userId).lean();
+  return summary || { _id: userId, ...EMPTY_SUMMARY };
+};
+
+// Recompute summaries from the Reward collection (all users, or one).
+// Intended for an off-peak job: increments landing mid-run are overwritten.
+exports.reconcile = async (userId) => {
+  const match = userId ? [{ $match: { user: new mongoose.Types.ObjectId(userId) } }] : [];
+
+  await Reward.aggregate([
+    ...match,
+    {
+      $group: {
+        _id: { user: '$user', type: '$type' },
+        amount: { $sum: '$amount' },
+        xp: { $sum: { $ifNull: ['$xp', 0] } },
+        count: { $sum: 1 }
+      }
+    },
+    {
+      $group: {
+        _id: '$_id.user',
+        totals: { $push: { k: '$_id.type', v: '$amount' } },
+        counts: { $push: { k: '$_id.type', v: '$count' } },
+        total: { $sum: '$amount' },
+        xp: { $sum: '$xp' },
+        rewardCount: { $sum: '$count' }
+      }
+    },
+    {
+      $set: {
+        totals: { $arrayToObject: '$totals' },
+        counts: { $arrayToObject: '$counts' },
+        reconciledAt: '$$NOW',
+        updatedAt: '$$NOW'
+      }
+    },
+    {
+      $merge: {
+        into: EarningsSummary.collection.collectionName,
+        on: '_id',
+        whenMatched: 'merge',
+        whenNotMatched: 'insert'
+      }
+    }
+  ]).allowDiskUse(true);
+};
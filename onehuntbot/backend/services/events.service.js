@@ -0,0 +1,8 @@
+const EventEmitter = require('events');
+
+// Process-wide domain events
+// 'user:updated' (user) - emitted after a User write has been committed
+const events = new EventEmitter();
+events.setMaxListeners(50);
+
+module.exports = events;
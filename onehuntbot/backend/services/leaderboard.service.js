@@ -0,0 +1,138 @@
+const User = require('../models/User.model');
+const cluster = require('./cluster.service');
+
+// Leaderboard snapshots
+// Top-N tables are built on the leader on a schedule and broadcast to the
+// other workers, so leaderboard reads never touch the User collection.
+// Every board sorts on an indexed counter.
+const SNAPSHOT_SIZE = parseInt(process.env.LEADERBOARD_SNAPSHOT_SIZE) || 100;
+
+const activeUsers = { isActive: true, isBanned: false };
+
+const boards = {
+  balance: async () => {
+    const users = await User.find(activeUsers)
+      .select('username firstName balance level')
+      .sort({ balance: -1 })
+      .limit(SNAPSHOT_SIZE)
+      .lean();
+
+    return users.map((user, index) => ({
+      rank: index + 1,
+      user: {
+        username: user.username,
+        firstName: user.firstName,
+        balance: user.balance,
+        level: user.level
+      }
+    }));
+  },
+
+  level: async () => {
+    const users = await User.find(activeUsers)
+      .select('username firstName level xp balance')
+      .sort({ level: -1, xp: -1 })
+      .limit(SNAPSHOT_SIZE)
+      .lean();
+
+    return users.map((user, index) => ({
+      rank: index + 1,
+      user: {
+        username: user.username,
+        firstName: user.firstName,
+        level: user.level,
+        xp: user.xp,
+        balance: user.balance
+      }
+    }));
+  },
+
+  // Sorted by total referrals (leaderboard tab)
+  referrals: async () => {
+    const users = await User.find(activeUsers)
+      .select('username firstName totalReferralCount directReferralCount')
+      .sort({ totalReferralCount: -1, directReferralCount: -1 })
+      .limit(SNAPSHOT_SIZE)
+      .lean();
+
+    return users.map((user, index) => ({
+      rank: index + 1,
+      user: {
+        _id: user._id,
+        username: user.username,
+        firstName: user.firstName,
+        totalReferrals: user.totalReferralCount || 0,
+        directReferralsCount: user.directReferralCount || 0
+      }
+    }));
+  },
+
+  // Sorted by direct referrals (referral screen), served by the counter index
+  directReferrals: async () => {
+    const users = await User.find(activeUsers)
+      .select('username firstName directReferralCount indirectReferralCount')
+      .sort({ directReferralCount: -1, indirectReferralCount: -1 })
+      .limit(SNAPSHOT_SIZE)
+      .lean();
+
+    return users.map((user, index) => ({
+      rank: index + 1,
+      _id: user._id,
+      username: user.username,
+      firstName: user.firstName,
+      directCount: user.directReferralCount,
+      indirectCount: user.indirectReferralCount,
+      totalReferrals: user.directReferralCount + user.indirectReferralCount
+    }));
+  }
+};
+
+const snapshots = {};
+const inFlight = {};
+
+// Rebuild one board; concurrent callers share the same build
+const refresh = (name) => {
+  if (!inFlight[name]) {
+    inFlight[name] = boards[name]()
+      .then(rows => {
+        snapshots[name] = { generatedAt: new Date(), rows };
+        cluster.publish('leaderboard:snapshot', { name, snapshot: snapshots[name] });
+        return snapshots[name];
+      })
+      .finally(() => {
+        delete inFlight[name];
+      });
+  }
+  return inFlight[name];
+};
+
+exports.refresh = refresh;
+
+// Snapshots built by another worker (the leader's scheduled refresh)
+cluster.subscribe('leaderboard:snapshot', ({ name, snapshot }) => {
+  if (!boards[name]) return;
+  snapshots[name] = { generatedAt: new Date(snapshot.generatedAt), rows: snapshot.rows };
+});
+
+exports.refreshAll = async () => {
+  const results = await Promise.allSettled(Object.keys(boards).map(refresh));
+  results
+    .filter(result => result.status === 'rejected')
+    .forEach(result => console.error('❌ Leaderboard snapshot failed:', result.reason));
+};
+
+// Read a board from its snapshot, building it on first use
+exports.getBoard = async (name, limit = SNAPSHOT_SIZE) => {
+  if (!boards[name]) {
+    throw new Error(`Unknown leaderboard: ${name}`);
+  }
+
+  const snapshot = snapshots[name] || await refresh(name);
+
+  return {
+    generatedAt: snapshot.generatedAt,
+    rows: snapshot.rows.slice(0, Math.min(limit, SNAPSHOT_SIZE))
+  };
+};
+
+exports.SNAPSHOT_SIZE = SNAPSHOT_SIZE;
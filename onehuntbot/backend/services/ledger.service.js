@@ -0,0 +1,153 @@
+const path = require('path');
+const mongoose = require('mongoose');
+const LedgerEntry = require('../models/LedgerEntry.model');
+const BalanceSnapshot = require('../models/BalanceSnapshot.model');
+const Counter = require('../models/Counter.model');
+const BufferedWriter = require('../utils/bufferedWriter');
+
+// Double-entry balance ledger
+// Every change to User.balance is posted here as it is committed. Entries go
+// through the same spooled write-behind path as rewards. Each insert
+// attempt stamps its rows with a fresh seq range, so entries are ordered by
+// when they reached the database. A user's ledger balance is their
+// snapshot plus the entries after its seq.
+const SCALE = 100; // minor units per coin
+
+const toMinor = coins => Math.round(coins * SCALE);
+const fromMinor = minor => minor / SCALE;
+
+const writer = new BufferedWriter({
+  model: LedgerEntry,
+  name: 'ledger',
+  spoolDir: process.env.SPOOL_DIR || path.join(__dirname, '../../spool'),
+  batchSize: parseInt(process.env.LEDGER_BATCH_SIZE) || 500,
+  flushInterval: parseInt(process.env.LEDGER_FLUSH_INTERVAL_MS) || 1000,
+  beforeInsert: async (rows) => {
+    const { first } = await Counter.reserve('ledger', rows.length);
+    const insertedAt = new Date();
+    rows.forEach((row, index) => {
+      row.seq = first + index;
+      row.insertedAt = insertedAt;
+    });
+  }
+});
+
+/**
+ * Post one balance change for a user. Resolves once the entry is durable
+ * in the spool (it reaches the database with the next flush).
+ *
+ * amount is in coins (positive credits the user). The other side goes to
+ * system:<type>, or is split across `splits`: [{ account, amount }] where
+ * the amounts are the parts of `amount` (same sign) each account balances.
+ */
+const post = async ({ user, amount, type = 'adjustment', ref, description, splits }) => {
+  const minor = toMinor(amount);
+  if (minor === 0) return null;
+
+  const posting = new mongoose.Types.ObjectId();
+  const lines = [{ account: 'user', user, amount: minor }];
+
+  const counters = splits && splits.length > 0 ? splits : [{ account: `system:${type}`, amount }];
+  let remaining = -minor;
+  counters.forEach((split, index) => {
+    // The last line absorbs rounding so the posting always balances
+    const share = index === counters.length - 1 ? remaining : -toMinor(split.amount);
+    remaining -= share;
+    lines.push({ account: split.account, amount: share });
+  });
+
+  for (const line of lines) {
+    writer.enqueue({ posting, type, ref, description, ...line });
+  }
+  await writer.sync();
+  return posting;
+};
+
+exports.post = post;
+
+// Post several changes for one user (staged commits)
+exports.postAll = (user, entries) => Promise.all(entries.map(entry => post({ user, ...entry })));
+
+// Ledger balance for a user: snapshot + entries after it
+const balanceOf = async (userId) => {
+  const user = new mongoose.Types.ObjectId(userId.toString());
+  const snapshot = await BalanceSnapshot.findById(user).lean();
+
+  const match = { user };
+  if (snapshot) match.seq = { $gt: snapshot.lastSeq || 0 };
+
+  const [tail] = await LedgerEntry.aggregate([
+    { $match: match },
+    { $group: { _id: null, amount: { $sum: '$amount' }, count: { $sum: 1 } } }
+  ]);
+
+  const minor = (snapshot ? snapshot.balance : 0) + (tail ? tail.amount : 0);
+  return {
+    minor,
+    balance: fromMinor(minor),
+    snapshotAt: snapshot ? snapshot.takenAt : null,
+    tailEntries: tail ? tail.count : 0
+  };
+};
+
+exports.balanceOf = balanceOf;
+
+// Compare a user's stored balance with the ledger
+exports.verify = async (userId) => {
+  await writer.flush();
+
+  const [user, ledger] = await Promise.all([
+    mongoose.model('User').findById(userId).select('balance').lean(),
+    balanceOf(userId)
+  ]);
+  if (!user) return null;
+
+  const storedMinor = toMinor(user.balance);
+  return {
+    user: userId,
+    stored: user.balance,
+    ledger: ledger.balance,
+    difference: fromMinor(storedMinor - ledger.minor),
+    ok: storedMinor === ledger.minor,
+    tailEntries: ledger.tailEntries
+  };
+};
+
+// Balance-snapshot job: fold a seq window of user lines into the
+// snapshots. Each op only applies if the snapshot has not yet seen this
+// chunk's entries, so re-running a chunk after a crash is a no-op.
+exports.snapshotOps = (entries) => {
+  const byUser = new Map();
+  for (const entry of entries) {
+    const key = entry.user.toString();
+    const totals = byUser.get(key) || { user: entry.user, firstSeq: entry.seq, lastSeq: entry.seq, amount: 0, count: 0 };
+    totals.lastSeq = entry.seq;
+    totals.amount += entry.amount;
+    totals.count += 1;
+    byUser.set(key, totals);
+  }
+
+  const takenAt = new Date();
+  const ops = [];
+  for (const { user, firstSeq, lastSeq, amount, count } of byUser.values()) {
+    ops.push({
+      updateOne: {
+        filter: { _id: user },
+        update: { $setOnInsert: { balance: 0, entryCount: 0 } },
+        upsert: true
+      }
+    });
+    ops.push({
+      updateOne: {
+        filter: { _id: user, $or: [{ lastSeq: null }, { lastSeq: { $lt: firstSeq } }] },
+        update: { $inc: { balance: amount, entryCount: count }, $set: { lastSeq, takenAt } }
+      }
+    });
+  }
+  return ops;
+};
+
+exports.SCALE = SCALE;
+exports.toMinor = toMinor;
+exports.fromMinor = fromMinor;
+exports.writer = writer;
@@ -0,0 +1,74 @@
+const User = require('../models/User.model');
+const Task = require('../models/Task.model');
+const BatchLoader = require('../utils/batchLoader');
+const LRUCache = require('../utils/lruCache');
+const taskCatalog = require('./taskCatalog.service');
+
+// Request-scoped loaders for documents referenced by id
+// Controllers resolve references through req.loaders instead of populate(),
+// so every id touched by one request is fetched at most once, in one $in
+// query per model. Users are projected to the public card fields; tasks are
+// served from the catalog or a short-TTL cache shared by all requests.
+const USER_FIELDS = 'username firstName level balance createdAt';
+const TASK_FIELDS = taskCatalog.TASK_FIELDS;
+
+const taskCache = new LRUCache({
+  max: parseInt(process.env.TASK_CACHE_MAX) || 5000,
+  ttl: parseInt(process.env.TASK_CACHE_TTL_MS) || 30 * 1000
+});
+
+const byId = (docs) => new Map(docs.map(doc => [doc._id.toString(), doc]));
+
+const loadUsers = async (ids) => byId(
+  await User.find({ _id: { $in: ids } }).select(USER_FIELDS).lean()
+);
+
+// Active tasks come from the catalog; anything else (expired or disabled
+// tasks referenced by history) from the shared cache, then the database
+const loadTasks = async (ids) => {
+  const found = new Map();
+  const missing = [];
+
+  for (const id of ids) {
+    const task = await taskCatalog.getById(id) || taskCache.get(id);
+    if (task) found.set(id, task);
+    else missing.push(id);
+  }
+
+  if (missing.length) {
+    const tasks = await Task.find({ _id: { $in: missing } }).select(TASK_FIELDS).lean();
+    tasks.forEach(task => {
+      taskCache.set(task._id.toString(), task);
+      found.set(task._id.toString(), task);
+    });
+  }
+  return found;
+};
+
+exports.createLoaders = () => ({
+  users: new BatchLoader(loadUsers),
+  tasks: new BatchLoader(loadTasks)
+});
+
+// Copy of a loaded document restricted to a space-separated field list,
+// mirroring populate(path, fields); null stays null
+exports.pick = (doc, fields) => {
+  if (!doc) return null;
+
+  const picked = { _id: doc._id };
+  fields.split(' ').forEach(field => {
+    if (doc[field] !== undefined) picked[field] = doc[field];
+  });
+  return picked;
+};
+
+// Replace an id field on each row with the picked, loaded document
+exports.resolve = async (loader, rows, path, fields) => {
+  const docs = await loader.loadMany(rows.map(row => row[path]));
+  rows.forEach((row, index) => {
+    if (row[path] != null) row[path] = exports.pick(docs[index], fields);
+  });
+  return rows;
+};
+
+exports.USER_FIELDS = USER_FIELDS;
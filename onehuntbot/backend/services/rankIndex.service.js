@@ -0,0 +1,136 @@
+const User = require('../models/User.model');
+const SkipList = require('../utils/skipList');
+const events = require('./events.service');
+const cluster = require('./cluster.service');
+
+// In-memory rank index
+// One ordered set per leaderboard, kept current from User write events and
+// rebuilt periodically from Mongo. Answers rank queries in O(log n).
+const compareScores = (a, b) => {
+  for (let i = 0; i < a.length; i++) {
+    if (a[i] !== b[i]) return a[i] - b[i];
+  }
+  return 0;
+};
+
+const compareEntries = (a, b) => {
+  const byScore = compareScores(a.score, b.score);
+  if (byScore !== 0) return byScore;
+  return a.id < b.id ? -1 : a.id > b.id ? 1 : 0;
+};
+
+const scorers = {
+  balance: (user) => [user.balance || 0],
+  level: (user) => [user.level || 1, user.xp || 0]
+};
+
+const createIndexes = () => {
+  const indexes = {};
+  for (const name of Object.keys(scorers)) {
+    indexes[name] = { list: new SkipList(compareEntries), entries: new Map() };
+  }
+  return indexes;
+};
+
+const isRanked = (user) => user.isActive !== false && !user.isBanned;
+
+let indexes = createIndexes();
+let ready = false;
+let rebuilding = null;
+let pendingUpdates = null;
+
+const applyUpdate = (target, user) => {
+  const id = user._id.toString();
+
+  for (const [name, scoreOf] of Object.entries(scorers)) {
+    const { list, entries } = target[name];
+    const previous = entries.get(id);
+
+    if (!isRanked(user)) {
+      if (previous) {
+        list.remove(previous);
+        entries.delete(id);
+      }
+      continue;
+    }
+
+    const score = scoreOf(user);
+    if (previous && compareScores(previous.score, score) === 0) continue;
+    if (previous) list.remove(previous);
+
+    const entry = { id, score };
+    list.insert(entry);
+    entries.set(id, entry);
+  }
+};
+
+// Track a user's current stats
+const update = (user) => {
+  if (!user || !user._id) return;
+  applyUpdate(indexes, user);
+  if (pendingUpdates) pendingUpdates.set(user._id.toString(), user);
+};
+
+exports.update = update;
+
+// Writes land in one worker; every worker keeps its own index current
+events.on('user:updated', (user) => {
+  if (!user || !user._id) return;
+  update(user);
+  cluster.publish('rankIndex:update', {
+    _id: user._id.toString(),
+    balance: user.balance,
+    level: user.level,
+    xp: user.xp,
+    isActive: user.isActive,
+    isBanned: user.isBanned
+  });
+});
+
+cluster.subscribe('rankIndex:update', update);
+
+// Rebuild every index from Mongo and swap it in; writes that land while
+// the rebuild streams are replayed on top before the swap
+exports.rebuild = () => {
+  if (rebuilding) return rebuilding;
+
+  rebuilding = (async () => {
+    pendingUpdates = new Map();
+    const fresh = createIndexes();
+
+    const cursor = User.find({ isActive: true, isBanned: false })
+      .select('balance level xp isActive isBanned')
+      .lean()
+      .cursor({ batchSize: 5000 });
+
+    for await (const user of cursor) {
+      applyUpdate(fresh, user);
+    }
+
+    for (const user of pendingUpdates.values()) {
+      applyUpdate(fresh, user);
+    }
+
+    indexes = fresh;
+    ready = true;
+    console.log(`✅ Rank index rebuilt (${fresh.balance.list.size} users)`);
+  })()
+    .catch(error => console.error('❌ Rank index rebuild failed:', error))
+    .finally(() => {
+      pendingUpdates = null;
+      rebuilding = null;
+    });
+
+  return rebuilding;
+};
+
+exports.isReady = () => ready;
+
+// 1-based rank: number of ranked users with a strictly higher score, plus one
+exports.getRank = (name, user) => {
+  const { list } = indexes[name];
+  const score = scorers[name](user);
+  const atOrBelow = list.countWhile(entry => compareScores(entry.score, score) <= 0);
+
+  return list.size - atOrBelow + 1;
+};
@@ -0,0 +1,98 @@
+const mongoose = require('mongoose');
+const User = require('../models/User.model');
+const Referral = require('../models/Referral.model');
+const rewardWriter = require('./rewardWriter.service');
+const ledger = require('./ledger.service');
+const achievementService = require('./achievement.service');
+
+// Multi-level referral payouts
+// Each user stores a bounded `ancestors` path (nearest referrer first), so a
+// signup pays every level with one bulkWrite instead of walking the chain.
+const parseList = (value) => (value || '')
+  .split(',')
+  .map(item => parseInt(item))
+  .filter(item => !Number.isNaN(item));
+
+// Coins paid to the referrer at each level (index 0 = direct referrer)
+const LEVEL_REWARDS = parseList(process.env.REFERRAL_LEVEL_REWARDS).length > 0
+  ? parseList(process.env.REFERRAL_LEVEL_REWARDS)
+  : [
+    parseInt(process.env.REFERRAL_REWARD_DIRECT) || 100,
+    parseInt(process.env.REFERRAL_REWARD_INDIRECT) || 50
+  ];
+
+const MAX_DEPTH = parseInt(process.env.REFERRAL_MAX_DEPTH) || LEVEL_REWARDS.length;
+
+exports.LEVEL_REWARDS = LEVEL_REWARDS;
+exports.MAX_DEPTH = MAX_DEPTH;
+
+// Ancestor path for someone referred by `referrer`
+exports.ancestorsFor = (referrer) =>
+  [referrer._id, ...(referrer.ancestors || [])].slice(0, MAX_DEPTH);
+
+// A user who already has referees joined a chain: extend the stored path
+// of everyone below them with the user's new ancestors. A descendant at
+// depth d keeps its first d entries (up to and including the user).
+exports.extendDownline = (userId, ancestors) => {
+  const id = new mongoose.Types.ObjectId(userId.toString());
+  const keep = { $add: [{ $indexOfArray: ['$ancestors', id] }, 1] };
+
+  return User.updateMany({ ancestors: id }, [{
+    $set: {
+      ancestors: {
+        $slice: [{ $concatArrays: [{ $slice: ['$ancestors', keep] }, { $literal: ancestors }] }, MAX_DEPTH]
+      }
+    }
+  }]);
+};
+
+// Credit every ancestor of a new referee and record the edges and rewards
+exports.payout = async (referee, ancestors) => {
+  const levels = ancestors.slice(0, LEVEL_REWARDS.length);
+  if (levels.length === 0) return [];
+
+  await User.bulkWrite(levels.map((ancestorId, index) => ({
+    updateOne: {
+      filter: { _id: ancestorId },
+      update: {
+        $inc: {
+          balance: LEVEL_REWARDS[index],
+          totalEarned: LEVEL_REWARDS[index],
+          totalReferralCount: 1,
+          [index === 0 ? 'directReferralCount' : 'indirectReferralCount']: 1
+        }
+      }
+    }
+  })), { ordered: false });
+
+  await Referral.insertMany(levels.map((ancestorId, index) => ({
+    referrer: ancestorId,
+    referee: referee._id,
+    level: index + 1,
+    earnings: LEVEL_REWARDS[index]
+  })), { ordered: false });
+
+  await Promise.all(levels.map((ancestorId, index) => ledger.post({
+    user: ancestorId,
+    type: 'referral',
+    amount: LEVEL_REWARDS[index],
+    ref: referee._id
+  })));
+
+  // Referral counts and balances changed for every paid ancestor
+  await User.announce(levels);
+  achievementService.checkUsers(levels)
+    .catch(error => console.error('❌ Achievement check failed:', error));
+
+  levels.forEach((ancestorId, index) => rewardWriter.enqueue({
+    user: ancestorId,
+    type: 'referral',
+    amount: LEVEL_REWARDS[index],
+    description: index === 0
+      ? `Direct referral: ${referee.username}`
+      : `Level ${index + 1} referral: ${referee.username}`,
+    relatedReferral: referee._id
+  }));
+
+  return levels;
+};
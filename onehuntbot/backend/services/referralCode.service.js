@@ -0,0 +1,81 @@
+const crypto = require('crypto');
+const Counter = require('../models/Counter.model');
+const User = require('../models/User.model');
+
+// Referral code pool
+// Codes are sequence numbers from a shared counter pushed through a keyed
+// 32-bit permutation (a 4-round Feistel network), so they look random but
+// can never collide with each other. Each process reserves a range of
+// sequence numbers, drops any code already taken by a legacy random code,
+// and keeps the rest in memory; the pool refills in the background.
+const POOL_SIZE = parseInt(process.env.REFERRAL_CODE_POOL_SIZE) || 1000;
+const LOW_WATER = Math.floor(POOL_SIZE / 4);
+const MAX_SEQUENCE = 0xFFFFFFFF;
+
+const roundKeys = (() => {
+  const secret = process.env.REFERRAL_CODE_SECRET || process.env.JWT_SECRET || 'onehunt';
+  const digest = crypto.createHash('sha256').update(`referral-code:${secret}`).digest();
+  return [0, 1, 2, 3].map(i => digest.readUInt16BE(i * 2));
+})();
+
+const round = (half, key) => (Math.imul(half ^ key, 0x45d9f3b) >>> 16) & 0xFFFF;
+
+// Bijective map of 0..2^32-1 onto itself
+const permute = (n) => {
+  let left = (n >>> 16) & 0xFFFF;
+  let right = n & 0xFFFF;
+  for (const key of roundKeys) {
+    [left, right] = [right, left ^ round(right, key)];
+  }
+  return ((left << 16) | right) >>> 0;
+};
+
+const encode = n => permute(n).toString(16).toUpperCase().padStart(8, '0');
+
+let pool = [];
+let refilling = null;
+
+const refill = () => {
+  if (refilling) return refilling;
+
+  refilling = (async () => {
+    const { first, last } = await Counter.reserve('referralCode', POOL_SIZE);
+    if (last > MAX_SEQUENCE) throw new Error('Referral code space exhausted');
+
+    const codes = [];
+    for (let n = first; n <= last; n++) codes.push(encode(n));
+
+    // Legacy codes were random, so a generated one may already be in use
+    const taken = await User.find({ referralCode: { $in: codes } }).select('referralCode').lean();
+    const takenCodes = new Set(taken.map(user => user.referralCode));
+
+    pool = pool.concat(codes.filter(code => !takenCodes.has(code)));
+  })().finally(() => {
+    refilling = null;
+  });
+
+  return refilling;
+};
+
+// Next unused code; only waits for Mongo when the pool is empty
+exports.take = async () => {
+  if (pool.length <= LOW_WATER) {
+    const refilled = refill();
+    if (pool.length === 0) {
+      await refilled;
+    } else {
+      refilled.catch(error => console.error('❌ Referral code refill failed:', error));
+    }
+  }
+
+  const code = pool.pop();
+  return code || exports.take();
+};
+
+// Return a code that ended up not being used
+exports.release = (code) => {
+  if (code) pool.push(code);
+};
+
+exports.warm = refill;
+exports.encode = encode;
@@ -0,0 +1,16 @@
+const path = require('path');
+const Reward = require('../models/Reward.model');
+const BufferedWriter = require('../utils/bufferedWriter');
+const earningsService = require('./earnings.service');
+
+// Write-behind Reward ledger: reward rows are spooled locally and inserted
+// in batches instead of one save() per reward; each inserted batch is folded
+// into the per-user earnings summaries
+module.exports = new BufferedWriter({
+  model: Reward,
+  name: 'rewards',
+  spoolDir: process.env.SPOOL_DIR || path.join(__dirname, '../../spool'),
+  batchSize: parseInt(process.env.REWARD_BATCH_SIZE) || 500,
+  flushInterval: parseInt(process.env.REWARD_FLUSH_INTERVAL_MS) || 1000,
+  onInserted: earningsService.applyRewards
+});
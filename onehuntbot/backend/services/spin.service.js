@@ -0,0 +1,174 @@
+const path = require('path');
+const mongoose = require('mongoose');
+const User = require('../models/User.model');
+const Reward = require('../models/Reward.model');
+const AliasTable = require('../utils/aliasTable');
+const BufferedWriter = require('../utils/bufferedWriter');
+const cluster = require('./cluster.service');
+const earningsService = require('./earnings.service');
+const ledger = require('./ledger.service');
+const achievementService = require('./achievement.service');
+
+// Spin wheel engine
+// - Prize tables are config (SPIN_PRIZE_TABLES, JSON { name: [{ coins, xp,
+//   weight }] }), compiled to alias tables for O(1) weighted draws
+// - Each user gets SPIN_DAILY_LIMIT spins per UTC day, SPIN_COOLDOWN_MS
+//   apart, tracked in the shared in-memory store (persisted across restarts)
+// - Wins are spooled as Reward rows (credited: false) and committed in
+//   batches: one balance update per user per flush instead of a write per
+//   spin. The update skips rows already in the user's spinCredits, so a
+//   commit can be retried; sweep() retries rows a failed commit left behind
+const DEFAULT_TABLES = {
+  standard: [
+    { coins: 5, weight: 30 },
+    { coins: 10, weight: 25 },
+    { coins: 15, weight: 15 },
+    { coins: 20, weight: 10 },
+    { coins: 25, weight: 8 },
+    { coins: 50, weight: 6 },
+    { coins: 75, weight: 4 },
+    { coins: 100, weight: 2 }
+  ]
+};
+
+const COOLDOWN_MS = parseInt(process.env.SPIN_COOLDOWN_MS) || 10 * 1000;
+const DAILY_LIMIT = parseInt(process.env.SPIN_DAILY_LIMIT) || 10;
+const ACTIVE_TABLE = process.env.SPIN_TABLE || 'standard';
+const CREDIT_HISTORY = 50; // spin ids remembered per user for idempotency
+const SWEEP_AGE_MS = parseInt(process.env.SPIN_SWEEP_AGE_MS) || 30 * 1000;
+const SWEEP_BATCH = 500;
+
+const compile = (definitions) => {
+  const tables = {};
+  for (const [name, prizes] of Object.entries(definitions)) {
+    tables[name] = { prizes, sampler: new AliasTable(prizes.map(prize => prize.weight)) };
+  }
+  return tables;
+};
+
+const tables = compile(process.env.SPIN_PRIZE_TABLES
+  ? JSON.parse(process.env.SPIN_PRIZE_TABLES)
+  : DEFAULT_TABLES);
+
+if (!tables[ACTIVE_TABLE]) {
+  throw new Error(`Spin prize table "${ACTIVE_TABLE}" is not configured`);
+}
+
+// Pipeline crediting one user's spins, skipping any already applied
+const creditSpinStages = (spins) => [
+  {
+    $set: {
+      pendingSpins: {
+        $filter: {
+          input: { $literal: spins },
+          cond: { $not: { $in: ['$$this.id', { $ifNull: ['$spinCredits', []] }] } }
+        }
+      }
+    }
+  },
+  ...User.creditStages({ coins: { $sum: '$pendingSpins.coins' }, xp: { $sum: '$pendingSpins.xp' } }),
+  {
+    $set: {
+      spinCredits: {
+        $slice: [{ $concatArrays: [{ $ifNull: ['$spinCredits', []] }, '$pendingSpins.id'] }, -CREDIT_HISTORY]
+      }
+    }
+  },
+  { $unset: 'pendingSpins' }
+];
+
+// Rows replayed from the spool come back from JSON with string ids
+const toObjectId = (id) => new mongoose.Types.ObjectId(id.toString());
+
+// Credit spin rows: one idempotent update per user, then mark them credited
+const creditSpins = async (rows) => {
+  const byUser = new Map();
+  for (const row of rows) {
+    const key = row.user.toString();
+    if (!byUser.has(key)) byUser.set(key, { user: toObjectId(row.user), spins: [] });
+    byUser.get(key).spins.push({ id: toObjectId(row._id), coins: row.amount || 0, xp: row.xp || 0 });
+  }
+
+  await User.bulkWrite([...byUser.values()].map(({ user, spins }) => ({
+    updateOne: { filter: { _id: user }, update: creditSpinStages(spins) }
+  })), { ordered: false });
+
+  await Reward.updateMany({ _id: { $in: rows.map(row => toObjectId(row._id)) } }, { $set: { credited: true } });
+  await User.announce([...byUser.values()].map(({ user }) => user));
+};
+
+// Post-insert hook; a failure here leaves the rows for sweep()
+const commitSpins = async (rows) => {
+  await creditSpins(rows);
+  await earningsService.applyRewards(rows);
+  await achievementService.checkUsers([...new Set(rows.map(row => row.user.toString()))]);
+};
+
+const writer = new BufferedWriter({
+  model: Reward,
+  name: 'spins',
+  spoolDir: process.env.SPOOL_DIR || path.join(__dirname, '../../spool'),
+  batchSize: parseInt(process.env.SPIN_BATCH_SIZE) || 500,
+  flushInterval: parseInt(process.env.SPIN_FLUSH_INTERVAL_MS) || 1000,
+  onInserted: commitSpins
+});
+
+// Spin once for a user. Returns { allowed: false, reason, retryAfterMs }
+// when on cooldown or out of spins for today.
+exports.spin = async (userId, tableName = ACTIVE_TABLE) => {
+  const key = `spin:${userId}`;
+  const budget = await cluster.call('consume', key, COOLDOWN_MS, DAILY_LIMIT);
+  if (!budget.allowed) return budget;
+
+  try {
+    const table = tables[tableName] || tables[ACTIVE_TABLE];
+    const prize = table.prizes[table.sampler.sample()];
+
+    const row = writer.enqueue({
+      user: userId,
+      type: 'spin_wheel',
+      amount: prize.coins,
+      xp: prize.xp || 0,
+      description: 'Spin wheel reward',
+      credited: false
+    });
+    // Posted with the row, so the ledger does not depend on the batch commit
+    await ledger.post({ user: userId, amount: prize.coins, type: 'spin_wheel', ref: row._id });
+
+    // The credit lands with the next batch; report the balance it will give
+    const user = await User.findById(userId).select('balance').lean();
+    const balance = (user ? user.balance : 0) + prize.coins;
+
+    return { allowed: true, prize, balance, remaining: budget.remaining };
+  } catch (error) {
+    await cluster.call('refund', key);
+    throw error;
+  }
+};
+
+// Retry spins whose commit failed (leader, on a timer). Earnings summaries
+// for these rows are left to the nightly reconcile.
+exports.sweep = async () => {
+  let credited = 0;
+  for (;;) {
+    const rows = await Reward.find({
+      credited: false,
+      createdAt: { $lt: new Date(Date.now() - SWEEP_AGE_MS) }
+    })
+      .select('user amount xp')
+      .limit(SWEEP_BATCH)
+      .lean();
+    if (rows.length === 0) break;
+
+    await creditSpins(rows);
+    credited += rows.length;
+    if (rows.length < SWEEP_BATCH) break;
+  }
+
+  if (credited > 0) console.log(`✅ Credited ${credited} stranded spins`);
+  return credited;
+};
+
+exports.DAILY_LIMIT = DAILY_LIMIT;
+exports.COOLDOWN_MS = COOLDOWN_MS;
+exports.writer = writer;
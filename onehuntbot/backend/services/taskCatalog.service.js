@@ -0,0 +1,123 @@
+const crypto = require('crypto');
+const Task = require('../models/Task.model');
+const cluster = require('./cluster.service');
+
+// In-process catalog of active tasks
+// Loaded once, indexed by id and type, and reloaded when an admin changes a
+// task (or after TASK_CATALOG_TTL_MS as a safety net).
+const TASK_FIELDS = 'title description type category reward requirement difficulty ' +
+  'maxCompletions totalCompletionsLimit currentCompletions startDate endDate ' +
+  'isRecurring recurringPeriod isFeatured icon priority updatedAt';
+const TTL = parseInt(process.env.TASK_CATALOG_TTL_MS) || 5 * 60 * 1000;
+
+let catalog = null;
+let loading = null;
+
+const buildCatalog = (tasks) => {
+  const byId = new Map();
+  const byType = new Map();
+
+  for (const task of tasks) {
+    byId.set(task._id.toString(), task);
+    if (!byType.has(task.type)) byType.set(task.type, []);
+    byType.get(task.type).push(task);
+  }
+
+  return {
+    loadedAt: Date.now(),
+    tasks,
+    byId,
+    byType
+  };
+};
+
+const load = () => Task.find({ isActive: true })
+  .select(TASK_FIELDS)
+  .sort({ priority: -1, createdAt: -1 })
+  .lean()
+  .then(tasks => {
+    catalog = buildCatalog(tasks);
+    return catalog;
+  });
+
+// Reloads are coalesced; one requested while a load is in flight runs
+// again afterwards so it always observes writes made before the call
+let queued = null;
+
+const reload = () => {
+  if (!loading) {
+    loading = load().finally(() => {
+      loading = null;
+    });
+    return loading;
+  }
+
+  if (!queued) {
+    queued = loading.catch(() => {}).then(() => {
+      queued = null;
+      return reload();
+    });
+  }
+  return queued;
+};
+
+// Admin changes: reload here and tell the other workers to reload too
+exports.reload = () => {
+  cluster.publish('taskCatalog:reload');
+  return reload();
+};
+
+cluster.subscribe('taskCatalog:reload', () => {
+  reload().catch(error => console.error('❌ Task catalog reload failed:', error));
+});
+
+// A completion was counted against a task's global limit: patch the cached
+// entry here and in the other workers instead of reloading the catalog
+const countCompletion = (id) => {
+  const task = catalog && catalog.byId.get(id);
+  if (task) task.currentCompletions = (task.currentCompletions || 0) + 1;
+};
+
+exports.recordCompletion = (id) => {
+  countCompletion(id.toString());
+  cluster.publish('taskCatalog:completion', id.toString());
+};
+
+cluster.subscribe('taskCatalog:completion', countCompletion);
+
+// Current catalog; a stale one is served while it reloads in the background
+const getCatalog = async () => {
+  if (!catalog) return reload();
+
+  if (Date.now() - catalog.loadedAt > TTL) {
+    reload().catch(error => console.error('❌ Task catalog reload failed:', error));
+  }
+  return catalog;
+};
+
+const inWindow = (task, now) =>
+  (!task.startDate || task.startDate <= now) && (!task.endDate || task.endDate >= now);
+
+// Active tasks within their start/end window, optionally of one type
+exports.getActive = async (type, now = new Date()) => {
+  const { tasks, byType } = await getCatalog();
+  const list = type ? byType.get(type) || [] : tasks;
+  return list.filter(task => inWindow(task, now));
+};
+
+exports.getById = async (id) => {
+  const { byId } = await getCatalog();
+  return byId.get(id.toString()) || null;
+};
+
+// Validator for a list of catalog tasks, derived from the content only, so
+// every worker (and a restarted one) gives the same ETag for the same list
+exports.etagFor = (tasks) => {
+  const hash = crypto.createHash('sha1');
+  tasks.forEach(task => hash.update(
+    `${task._id}:${task.updatedAt ? new Date(task.updatedAt).getTime() : 0}:${task.currentCompletions || 0};`
+  ));
+  return `W/"${hash.digest('base64url')}"`;
+};
+
+exports.TASK_FIELDS = TASK_FIELDS;
@@ -0,0 +1,49 @@
+const crypto = require('crypto');
+
+// Uniform [0, 1) from 48 bits of the CSPRNG, so draws cannot be predicted
+const secureRandom = () => crypto.randomBytes(6).readUIntBE(0, 6) / 2 ** 48;
+
+// Weighted sampling in O(1) with Vose's alias method
+// Built once per table in O(n); each sample is one uniform draw over the
+// columns plus one biased coin flip.
+class AliasTable {
+  constructor(weights) {
+    const n = weights.length;
+    const total = weights.reduce((sum, weight) => sum + weight, 0);
+    if (n === 0 || !(total > 0) || weights.some(weight => !(weight >= 0))) {
+      throw new Error('Alias table needs non-negative weights with a positive total');
+    }
+
+    this.size = n;
+    this.probability = new Float64Array(n);
+    this.alias = new Uint32Array(n);
+
+    const scaled = weights.map(weight => (weight * n) / total);
+    const small = [];
+    const large = [];
+    scaled.forEach((value, index) => (value < 1 ? small : large).push(index));
+
+    while (small.length > 0 && large.length > 0) {
+      const less = small.pop();
+      const more = large.pop();
+      this.probability[less] = scaled[less];
+      this.alias[less] = more;
+
+      scaled[more] = scaled[more] + scaled[less] - 1;
+      (scaled[more] < 1 ? small : large).push(more);
+    }
+
+    // Leftovers are 1 up to rounding error
+    for (const index of large.concat(small)) this.probability[index] = 1;
+  }
+
+  // Index of the sampled entry
+  sample(random = secureRandom) {
+    const column = Math.floor(random() * this.size);
+    return random() < this.probability[column] ? column : this.alias[column];
+  }
+}
+
+AliasTable.secureRandom = secureRandom;
+
+module.exports = AliasTable;
@@ -0,0 +1,57 @@
+// DataLoader-style batching loader
+// Every load() issued in the same tick is collected, deduplicated by id and
+// resolved with a single call to batchFn(ids). Results are memoized for the
+// lifetime of the loader, so create one per request.
+class BatchLoader {
+  constructor(batchFn, { maxBatchSize = 1000 } = {}) {
+    this.batchFn = batchFn;
+    this.maxBatchSize = maxBatchSize;
+    this.memo = new Map();
+    this.queue = null;
+  }
+
+  load(id) {
+    if (id == null) return Promise.resolve(null);
+
+    const key = id.toString();
+    const memoized = this.memo.get(key);
+    if (memoized) return memoized;
+
+    if (!this.queue) {
+      this.queue = new Map();
+      process.nextTick(() => this.dispatch());
+    }
+
+    const promise = new Promise((resolve, reject) => {
+      this.queue.set(key, { resolve, reject });
+    });
+    this.memo.set(key, promise);
+    return promise;
+  }
+
+  loadMany(ids) {
+    return Promise.all(ids.map(id => this.load(id)));
+  }
+
+  async dispatch() {
+    const queue = this.queue;
+    this.queue = null;
+
+    const keys = [...queue.keys()];
+    for (let i = 0; i < keys.length; i += this.maxBatchSize) {
+      const batch = keys.slice(i, i + this.maxBatchSize);
+      try {
+        // batchFn returns a Map of id string -> document
+        const found = await this.batchFn(batch);
+        batch.forEach(key => queue.get(key).resolve(found.get(key) || null));
+      } catch (error) {
+        batch.forEach(key => {
+          this.memo.delete(key);
+          queue.get(key).reject(error);
+        });
+      }
+    }
+  }
+}
+
+module.exports = BatchLoader;
@@ -0,0 +1,232 @@
+const fs = require('fs');
+const path = require('path');
+const mongoose = require('mongoose');
+
+// Buffered write-behind inserter for append-only collections
+// Documents are appended to a local spool file as they are queued (so a
+// crash does not lose them), then inserted in bulk with
+// insertMany({ ordered: false }) once the batch is full or the flush timer
+// fires. _ids are assigned up front, which makes replaying a spool after a
+// crash idempotent: rows that already made it in fail as duplicates.
+const isOnlyDuplicates = (error) =>
+  Array.isArray(error.writeErrors) &&
+  error.writeErrors.length > 0 &&
+  error.writeErrors.every(writeError => (writeError.code || writeError.err?.code) === 11000);
+
+const isAlive = (pid) => {
+  try {
+    process.kill(pid, 0);
+    return true;
+  } catch (error) {
+    return error.code === 'EPERM';
+  }
+};
+
+class BufferedWriter {
+  constructor({ model, name, spoolDir, batchSize = 500, flushInterval = 1000, beforeInsert, onInserted }) {
+    this.model = model;
+    this.beforeInsert = beforeInsert;
+    this.onInserted = onInserted;
+    this.name = name;
+    this.spoolDir = spoolDir;
+    this.batchSize = batchSize;
+    this.flushInterval = flushInterval;
+
+    this.buffer = [];
+    this.fd = null;
+    this.flushing = null;
+    this.syncing = null;
+    this.recovering = null;
+    this.timer = null;
+    this.sequence = 0;
+    this.inFlight = new Set();
+    this.needsRecovery = false;
+  }
+
+  get activeSpool() {
+    return path.join(this.spoolDir, `${this.name}-${process.pid}.jsonl`);
+  }
+
+  openSpool() {
+    if (this.fd === null) {
+      fs.mkdirSync(this.spoolDir, { recursive: true });
+      this.fd = fs.openSync(this.activeSpool, 'a');
+    }
+    if (!this.timer) {
+      this.timer = setInterval(() => this.tick(), this.flushInterval);
+      this.timer.unref();
+    }
+  }
+
+  // Queue a document; returns it with its _id and timestamps assigned
+  enqueue(doc) {
+    const now = new Date();
+    const row = {
+      _id: new mongoose.Types.ObjectId(),
+      createdAt: now,
+      updatedAt: now,
+      ...doc
+    };
+
+    this.openSpool();
+    fs.writeSync(this.fd, `${JSON.stringify(row)}\n`);
+    this.buffer.push(row);
+
+    if (this.buffer.length >= this.batchSize) {
+      this.flush();
+    }
+    return row;
+  }
+
+  // Resolves once everything queued so far is on disk; calls made in the
+  // same tick share one fdatasync
+  sync() {
+    if (!this.syncing) {
+      this.syncing = new Promise((resolve, reject) => setImmediate(() => {
+        this.syncing = null;
+        try {
+          if (this.fd !== null) fs.fdatasyncSync(this.fd);
+          resolve();
+        } catch (error) {
+          reject(error);
+        }
+      }));
+    }
+    return this.syncing;
+  }
+
+  // Insert rows, returning the ones that were actually new. beforeInsert
+  // runs on every attempt (including spool replays).
+  async insert(rows) {
+    if (this.beforeInsert) await this.beforeInsert(rows);
+    try {
+      await this.model.insertMany(rows, { ordered: false });
+      return rows;
+    } catch (error) {
+      if (!isOnlyDuplicates(error)) throw error;
+      const duplicates = new Set(error.writeErrors.map(writeError => writeError.index));
+      return rows.filter((row, index) => !duplicates.has(index));
+    }
+  }
+
+  // Derived-data hook; failures are logged rather than retried because the
+  // rows themselves are already stored
+  async notifyInserted(rows) {
+    if (!this.onInserted || rows.length === 0) return;
+    try {
+      await this.onInserted(rows);
+    } catch (error) {
+      console.error(`❌ ${this.name} post-insert hook failed:`, error.message);
+    }
+  }
+
+  tick() {
+    this.flush();
+
+    if (this.needsRecovery && !this.recovering) {
+      this.needsRecovery = false;
+      this.recovering = this.recover()
+        .catch(error => {
+          this.needsRecovery = true;
+          console.error(`❌ ${this.name} spool replay failed:`, error.message);
+        })
+        .finally(() => {
+          this.recovering = null;
+        });
+    }
+  }
+
+  // Rotate the spool and insert everything buffered so far. On failure the
+  // rotated file is kept and retried by the next recover().
+  flush() {
+    if (this.flushing) {
+      return this.flushing.then(() => (this.buffer.length > 0 ? this.flush() : undefined));
+    }
+    if (this.buffer.length === 0) return Promise.resolve();
+
+    const rows = this.buffer;
+    this.buffer = [];
+
+    fs.fdatasyncSync(this.fd);
+    fs.closeSync(this.fd);
+    this.fd = null;
+    this.sequence += 1;
+    const rotated = path.join(
+      this.spoolDir,
+      `${this.name}-${process.pid}-${Date.now()}-${this.sequence}.flushing.jsonl`
+    );
+    fs.renameSync(this.activeSpool, rotated);
+    this.openSpool();
+
+    this.inFlight.add(rotated);
+    this.flushing = this.insert(rows)
+      .then(async inserted => {
+        await fs.promises.unlink(rotated);
+        await this.notifyInserted(inserted);
+      })
+      .catch(error => {
+        this.needsRecovery = true;
+        console.error(`❌ ${this.name} flush failed (spooled in ${rotated}):`, error.message);
+      })
+      .finally(() => {
+        this.inFlight.delete(rotated);
+        this.flushing = null;
+      });
+
+    return this.flushing;
+  }
+
+  // Replay spool files left behind by crashed processes or failed flushes
+  async recover() {
+    if (!fs.existsSync(this.spoolDir)) return 0;
+
+    const pattern = new RegExp(`^${this.name}-(\\d+)(-.+)?\\.jsonl$`);
+    let recovered = 0;
+
+    for (const file of await fs.promises.readdir(this.spoolDir)) {
+      const match = file.match(pattern);
+      if (!match) continue;
+
+      const pid = Number(match[1]);
+      const ownedElsewhere = pid !== process.pid && isAlive(pid);
+      const isOwnActive = pid === process.pid && !match[2];
+      if (ownedElsewhere || isOwnActive) continue;
+
+      const filePath = path.join(this.spoolDir, file);
+      if (this.inFlight.has(filePath)) continue;
+
+      const rows = (await fs.promises.readFile(filePath, 'utf8'))
+        .split('\n')
+        .filter(Boolean)
+        .map(line => JSON.parse(line));
+
+      for (let i = 0; i < rows.length; i += this.batchSize) {
+        await this.notifyInserted(await this.insert(rows.slice(i, i + this.batchSize)));
+      }
+      await fs.promises.unlink(filePath);
+      recovered += rows.length;
+    }
+
+    if (recovered > 0) {
+      console.log(`✅ Recovered ${recovered} spooled ${this.name} rows`);
+    }
+    return recovered;
+  }
+
+  // Flush and release the spool (graceful shutdown)
+  async close() {
+    clearInterval(this.timer);
+    this.timer = null;
+    await this.flush();
+
+    if (this.fd !== null) {
+      fs.closeSync(this.fd);
+      this.fd = null;
+      if (fs.statSync(this.activeSpool).size === 0) {
+        fs.unlinkSync(this.activeSpool);
+      }
+    }
+  }
+}
+
+module.exports = BufferedWriter;
@@ -0,0 +1,48 @@
+// Bounded LRU cache with per-entry TTL
+// Map iteration order doubles as recency order: reads re-insert the key,
+// and the oldest key is evicted once the cache is full.
+class LRUCache {
+  constructor({ max = 10000, ttl = 60 * 1000 } = {}) {
+    this.max = max;
+    this.ttl = ttl;
+    this.entries = new Map();
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry) return undefined;
+
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    return entry.value;
+  }
+
+  set(key, value, ttl = this.ttl) {
+    this.entries.delete(key);
+    this.entries.set(key, { value, expiresAt: Date.now() + ttl });
+
+    if (this.entries.size > this.max) {
+      this.entries.delete(this.entries.keys().next().value);
+    }
+    return this;
+  }
+
+  delete(key) {
+    return this.entries.delete(key);
+  }
+
+  clear() {
+    this.entries.clear();
+  }
+
+  get size() {
+    return this.entries.size;
+  }
+}
+
+module.exports = LRUCache;
@@ -0,0 +1,166 @@
+const fs = require('fs');
+const path = require('path');
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// In-memory rate-limit counters
+// Fixed windows (express-rate-limit), sliding windows (per-user limits) and
+// daily budgets with a cooldown (spins). In cluster mode the primary holds
+// one instance for all workers, otherwise each process uses its own.
+// Budgets outlive a restart: with `persistPath` (or persistTo()) they are
+// saved every `persistInterval` and loaded back on start. Only the process
+// that enforces the budgets should persist them.
+class MemoryStore {
+  constructor({ sweepInterval = 60 * 1000, persistPath = null, persistInterval = 30 * 1000 } = {}) {
+    this.counters = new Map(); // key -> { hits, resetTime }
+    this.windows = new Map();  // key -> [window index, previous hits, current hits, expires at]
+    this.budgets = new Map();  // key -> [UTC day, used, last use at]
+    this.sweeper = setInterval(() => this.sweep(), sweepInterval);
+    this.sweeper.unref();
+
+    this.persistPath = null;
+    if (persistPath) this.persistTo(persistPath, persistInterval);
+  }
+
+  // Load budgets from `persistPath` and save them there periodically
+  persistTo(persistPath, persistInterval = 30 * 1000) {
+    if (this.persistPath) return this;
+    this.persistPath = persistPath;
+    this.load();
+    this.saver = setInterval(() => this.save(), persistInterval);
+    this.saver.unref();
+    return this;
+  }
+
+  increment(key, windowMs, now = Date.now()) {
+    let counter = this.counters.get(key);
+    if (!counter || counter.resetTime <= now) {
+      counter = { hits: 0, resetTime: now + windowMs };
+      this.counters.set(key, counter);
+    }
+
+    counter.hits++;
+    return { totalHits: counter.hits, resetTime: counter.resetTime };
+  }
+
+  decrement(key) {
+    const counter = this.counters.get(key);
+    if (counter && counter.hits > 0) counter.hits--;
+  }
+
+  resetKey(key) {
+    this.counters.delete(key);
+    this.windows.delete(key);
+  }
+
+  // Sliding-window counter: the previous window's hits are weighted by how
+  // much of it still overlaps the sliding window. Two counters per key.
+  // Records the hit only if it is allowed.
+  slide(key, windowMs, limit, now = Date.now()) {
+    const index = Math.floor(now / windowMs);
+    let entry = this.windows.get(key);
+
+    if (!entry || entry[0] < index - 1) {
+      entry = [index, 0, 0, 0];
+      this.windows.set(key, entry);
+    } else if (entry[0] === index - 1) {
+      entry[0] = index;
+      entry[1] = entry[2];
+      entry[2] = 0;
+    }
+
+    const [, previous, current] = entry;
+    const windowStart = index * windowMs;
+    const elapsed = (now - windowStart) / windowMs;
+    const estimate = previous * (1 - elapsed) + current;
+
+    if (estimate < limit) {
+      entry[2]++;
+      entry[3] = windowStart + 2 * windowMs;
+      return { allowed: true, remaining: Math.max(0, Math.floor(limit - estimate - 1)), retryAfterMs: 0 };
+    }
+
+    // When the estimate will next drop below the limit
+    const retryAt = current < limit
+      ? windowStart + windowMs * (1 - (limit - current) / previous)
+      : windowStart + windowMs * (2 - limit / current);
+    return { allowed: false, remaining: 0, retryAfterMs: Math.max(1, Math.floor(retryAt - now) + 1) };
+  }
+
+  // Use one unit of a daily budget (UTC days), at most once per cooldown
+  consume(key, cooldownMs, dailyLimit, now = Date.now()) {
+    const day = Math.floor(now / DAY_MS);
+    let entry = this.budgets.get(key);
+    if (!entry || entry[0] !== day) {
+      entry = [day, 0, entry ? entry[2] : 0];
+      this.budgets.set(key, entry);
+    }
+
+    const cooldownLeft = entry[2] + cooldownMs - now;
+    if (cooldownLeft > 0) {
+      return { allowed: false, reason: 'cooldown', remaining: dailyLimit - entry[1], retryAfterMs: cooldownLeft };
+    }
+    if (entry[1] >= dailyLimit) {
+      return { allowed: false, reason: 'budget', remaining: 0, retryAfterMs: (day + 1) * DAY_MS - now };
+    }
+
+    entry[1]++;
+    entry[2] = now;
+    return { allowed: true, remaining: dailyLimit - entry[1], retryAfterMs: 0 };
+  }
+
+  // Give back a unit whose action failed (the cooldown stays)
+  refund(key) {
+    const entry = this.budgets.get(key);
+    if (entry && entry[1] > 0) entry[1]--;
+  }
+
+  sweep(now = Date.now()) {
+    for (const [key, counter] of this.counters) {
+      if (counter.resetTime <= now) this.counters.delete(key);
+    }
+    for (const [key, entry] of this.windows) {
+      if (entry[3] <= now) this.windows.delete(key);
+    }
+    const today = Math.floor(now / DAY_MS);
+    for (const [key, entry] of this.budgets) {
+      if (entry[0] < today && entry[2] < now - DAY_MS) this.budgets.delete(key);
+    }
+  }
+
+  // Budgets only; rate-limit windows are short enough to start fresh
+  save() {
+    if (!this.persistPath) return;
+    try {
+      const rows = [];
+      for (const [key, entry] of this.budgets) rows.push([key, ...entry]);
+
+      fs.mkdirSync(path.dirname(this.persistPath), { recursive: true });
+      const temporary = `${this.persistPath}.${process.pid}.tmp`;
+      fs.writeFileSync(temporary, JSON.stringify(rows));
+      fs.renameSync(temporary, this.persistPath);
+    } catch (error) {
+      console.error('❌ Saving budgets failed:', error.message);
+    }
+  }
+
+  load() {
+    try {
+      if (!fs.existsSync(this.persistPath)) return;
+      const rows = JSON.parse(fs.readFileSync(this.persistPath, 'utf8'));
+      for (const [key, day, used, lastAt] of rows) this.budgets.set(key, [day, used, lastAt]);
+      this.sweep();
+    } catch (error) {
+      console.error('❌ Loading budgets failed:', error.message);
+    }
+  }
+}
+
+// Operations workers may call on the shared instance
+MemoryStore.OPERATIONS = ['increment', 'decrement', 'resetKey', 'slide', 'consume', 'refund'];
+
+// Where a process's budgets are persisted
+MemoryStore.defaultPersistPath = () =>
+  path.join(process.env.SPOOL_DIR || path.join(__dirname, '../../spool'), 'budgets.json');
+
+module.exports = MemoryStore;
@@ -0,0 +1,143 @@
+const mongoose = require('mongoose');
+
+// Keyset (cursor) pagination over (createdAt, _id), newest first
+// Cursors are opaque base64url strings; every page is an index range scan,
+// so deep pages cost the same as the first one.
+const MAX_LIMIT = 100;
+
+const encodeCursor = (doc) =>
+  Buffer.from(`${new Date(doc.createdAt).getTime()}:${doc._id}`).toString('base64url');
+
+// ?limit= as an integer in [1, MAX_LIMIT]; anything else is a 400
+const parseLimit = (value, defaultLimit) => {
+  if (value === undefined || value === '') return defaultLimit;
+
+  const limit = Number(value);
+  if (!Number.isInteger(limit)) {
+    const error = new Error('Invalid limit');
+    error.statusCode = 400;
+    throw error;
+  }
+  return Math.min(Math.max(1, limit), MAX_LIMIT);
+};
+
+const decodeCursor = (cursor) => {
+  const [time, id] = Buffer.from(String(cursor), 'base64url').toString().split(':');
+  const createdAt = new Date(Number(time));
+
+  if (Number.isNaN(createdAt.getTime()) || !mongoose.Types.ObjectId.isValid(id)) {
+    const error = new Error('Invalid cursor');
+    error.statusCode = 400;
+    throw error;
+  }
+  return { createdAt, _id: new mongoose.Types.ObjectId(id) };
+};
+
+// Parse ?limit=&cursor= into a limit and the filter for the next page
+exports.parsePageQuery = (query, defaultLimit = 20) => {
+  const limit = parseLimit(query.limit, defaultLimit);
+
+  if (!query.cursor) return { limit, filter: {} };
+
+  const { createdAt, _id } = decodeCursor(query.cursor);
+  return {
+    limit,
+    filter: {
+      $or: [
+        { createdAt: { $lt: createdAt } },
+        { createdAt, _id: { $lt: _id } }
+      ]
+    }
+  };
+};
+
+exports.KEYSET_SORT = { createdAt: -1, _id: -1 };
+
+// Trim a limit + 1 fetch to one page and describe the next one
+exports.toPage = (docs, limit) => {
+  const hasMore = docs.length > limit;
+  const items = hasMore ? docs.slice(0, limit) : docs;
+
+  return {
+    items,
+    pagination: {
+      limit,
+      hasMore,
+      nextCursor: hasMore ? encodeCursor(items[items.length - 1]) : null
+    }
+  };
+};
+
+// Keyset pagination over an arbitrary sort, e.g. { level: 1, createdAt: -1,
+// _id: -1 } (the last key must be unique). Cursor values are type-tagged so
+// dates, ids and numbers round-trip.
+const invalidCursor = () => {
+  const error = new Error('Invalid cursor');
+  error.statusCode = 400;
+  return error;
+};
+
+const encodeValue = (value) => {
+  if (value instanceof Date) return `d${value.getTime()}`;
+  if (value instanceof mongoose.Types.ObjectId) return `o${value}`;
+  return `n${value == null ? 0 : value}`;
+};
+
+const decodeValue = (token) => {
+  const tag = token[0];
+  const raw = token.slice(1);
+
+  if (tag === 'o' && mongoose.Types.ObjectId.isValid(raw)) return new mongoose.Types.ObjectId(raw);
+  const number = Number(raw);
+  if (raw === '' || Number.isNaN(number)) throw invalidCursor();
+  if (tag === 'd') return new Date(number);
+  if (tag === 'n') return number;
+  throw invalidCursor();
+};
+
+const encodeSortCursor = (doc, sort) => Buffer.from(
+  Object.keys(sort).map(path => encodeValue(doc[path])).join(':')
+).toString('base64url');
+
+// Parse ?limit=&cursor= into a limit and the filter for the next page
+exports.parseSortedPageQuery = (query, sort, defaultLimit = 20) => {
+  const limit = parseLimit(query.limit, defaultLimit);
+
+  if (!query.cursor) return { limit, filter: {} };
+
+  const paths = Object.keys(sort);
+  const tokens = Buffer.from(String(query.cursor), 'base64url').toString().split(':');
+  if (tokens.length !== paths.length) throw invalidCursor();
+  const values = tokens.map(decodeValue);
+
+  // (a > x) or (a = x and b > y) or ..., with > flipped for descending keys
+  const $or = paths.map((path, index) => {
+    const clause = {};
+    paths.slice(0, index).forEach((prefix, i) => {
+      clause[prefix] = values[i];
+    });
+    clause[path] = { [sort[path] < 0 ? '$lt' : '$gt']: values[index] };
+    return clause;
+  });
+
+  return { limit, filter: { $or } };
+};
+
+// Trim a limit + 1 fetch to one page, with a cursor for the same sort
+exports.toSortedPage = (docs, limit, sort) => {
+  const hasMore = docs.length > limit;
+  const items = hasMore ? docs.slice(0, limit) : docs;
+
+  return {
+    items,
+    pagination: {
+      limit,
+      hasMore,
+      nextCursor: hasMore ? encodeSortCursor(items[items.length - 1], sort) : null
+    }
+  };
+};
+
+exports.parseLimit = parseLimit;
+exports.encodeCursor = encodeCursor;
+exports.decodeCursor = decodeCursor;
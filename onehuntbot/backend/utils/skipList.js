@@ -0,0 +1,112 @@
+// Indexable skip list
+// Ordered set with O(log n) insert/remove and O(log n) rank queries.
+// Every forward link stores its span (number of nodes it skips) so the
+// position of any key can be counted while searching for it.
+const MAX_LEVEL = 32;
+const P = 0.25;
+
+const createNode = (key, level) => ({
+  key,
+  next: new Array(level).fill(null),
+  span: new Array(level).fill(0)
+});
+
+const randomLevel = () => {
+  let level = 1;
+  while (level < MAX_LEVEL && Math.random() < P) level += 1;
+  return level;
+};
+
+class SkipList {
+  constructor(compare) {
+    this.compare = compare;
+    this.head = createNode(null, MAX_LEVEL);
+    this.level = 1;
+    this.size = 0;
+  }
+
+  insert(key) {
+    const update = new Array(MAX_LEVEL);
+    const rank = new Array(MAX_LEVEL);
+    let node = this.head;
+
+    for (let i = this.level - 1; i >= 0; i--) {
+      rank[i] = i === this.level - 1 ? 0 : rank[i + 1];
+      while (node.next[i] && this.compare(node.next[i].key, key) < 0) {
+        rank[i] += node.span[i];
+        node = node.next[i];
+      }
+      update[i] = node;
+    }
+
+    const level = randomLevel();
+    if (level > this.level) {
+      for (let i = this.level; i < level; i++) {
+        rank[i] = 0;
+        update[i] = this.head;
+        update[i].span[i] = this.size;
+      }
+      this.level = level;
+    }
+
+    const created = createNode(key, level);
+    for (let i = 0; i < level; i++) {
+      created.next[i] = update[i].next[i];
+      update[i].next[i] = created;
+      created.span[i] = update[i].span[i] - (rank[0] - rank[i]);
+      update[i].span[i] = rank[0] - rank[i] + 1;
+    }
+    for (let i = level; i < this.level; i++) {
+      update[i].span[i] += 1;
+    }
+
+    this.size += 1;
+  }
+
+  remove(key) {
+    const update = new Array(MAX_LEVEL);
+    let node = this.head;
+
+    for (let i = this.level - 1; i >= 0; i--) {
+      while (node.next[i] && this.compare(node.next[i].key, key) < 0) {
+        node = node.next[i];
+      }
+      update[i] = node;
+    }
+
+    const target = node.next[0];
+    if (!target || this.compare(target.key, key) !== 0) return false;
+
+    for (let i = 0; i < this.level; i++) {
+      if (update[i].next[i] === target) {
+        update[i].span[i] += target.span[i] - 1;
+        update[i].next[i] = target.next[i];
+      } else {
+        update[i].span[i] -= 1;
+      }
+    }
+    while (this.level > 1 && !this.head.next[this.level - 1]) {
+      this.level -= 1;
+    }
+
+    this.size -= 1;
+    return true;
+  }
+
+  // Number of leading keys for which `before(key)` is true; `before` must
+  // be monotonic over the ordering (true for a prefix, then false)
+  countWhile(before) {
+    let count = 0;
+    let node = this.head;
+
+    for (let i = this.level - 1; i >= 0; i--) {
+      while (node.next[i] && before(node.next[i].key)) {
+        count += node.span[i];
+        node = node.next[i];
+      }
+    }
+    return count;
+  }
+}
+
+module.exports = SkipList;
@@ -0,0 +1,10 @@
+// IANA time zone names accepted for users (e.g. "Europe/Berlin", "UTC")
+exports.isValidTimezone = (timezone) => {
+  if (typeof timezone !== 'string' || timezone.length === 0 || timezone.length > 64) return false;
+  try {
+    new Intl.DateTimeFormat('en-US', { timeZone: timezone });
+    return true;
+  } catch (error) {
+    return false;
+  }
+};
@@ -0,0 +1,36 @@
+// Token bucket rate limiter
+// Holds up to `capacity` tokens and refills at `rate` tokens per second.
+class TokenBucket {
+  constructor({ rate, capacity = rate }) {
+    this.rate = rate;
+    this.capacity = capacity;
+    this.tokens = capacity;
+    this.updatedAt = Date.now();
+  }
+
+  refill(now = Date.now()) {
+    const elapsed = (now - this.updatedAt) / 1000;
+    this.tokens = Math.min(this.capacity, this.tokens + elapsed * this.rate);
+    this.updatedAt = now;
+  }
+
+  // Milliseconds until a token is available (0 = available now)
+  wait(now = Date.now()) {
+    this.refill(now);
+    return this.tokens >= 1 ? 0 : Math.ceil(((1 - this.tokens) / this.rate) * 1000);
+  }
+
+  // Take a token if one is available; otherwise return the wait in ms
+  take(now = Date.now()) {
+    const wait = this.wait(now);
+    if (wait === 0) this.tokens -= 1;
+    return wait;
+  }
+
+  // Milliseconds until the bucket is full again (it can be forgotten after)
+  get idleMs() {
+    return Math.ceil((this.capacity / this.rate) * 1000);
+  }
+}
+
+module.exports = TokenBucket;
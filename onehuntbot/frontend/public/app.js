@@ -87,7 +87,8 @@ async function authenticateUser() {
             body: JSON.stringify({
                 telegramId: telegramUser.id,
                 username: telegramUser.username || '',
-                firstName: telegramUser.first_name || 'User'
+                firstName: telegramUser.first_name || 'User',
+                timezone: Intl.DateTimeFormat().resolvedOptions().timeZone
             })
         });
 
@@ -107,17 +108,37 @@ async function authenticateUser() {
     }
 }
 
+// Cached GET bodies keyed by URL, revalidated with If-None-Match
+const etagCache = new Map();
+
 async function fetchWithAuth(url, options = {}) {
     const token = localStorage.getItem('authToken');
+    const isGet = !options.method || options.method.toUpperCase() === 'GET';
+    const cached = isGet ? etagCache.get(url) : null;
 
-    return fetch(url, {
+    const response = await fetch(url, {
         ...options,
         headers: {
             ...options.headers,
+            ...(cached ? { 'If-None-Match': cached.etag } : {}),
             'Authorization': `Bearer ${token}`,
             'Content-Type': 'application/json'
         }
     });
+
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/json' }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (isGet && etag && response.ok) {
+        etagCache.set(url, { etag, body: await response.clone().text() });
+    }
+
+    return response;
 }
 
 async function getUserProfile() {
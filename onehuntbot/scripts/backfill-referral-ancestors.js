@@ -0,0 +1,72 @@
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+// Import models
+const User = require('../backend/models/User.model');
+const { MAX_DEPTH } = require('../backend/services/referral.service');
+
+// Fills User.ancestors for accounts created before the materialized path
+// existed, by walking each referredBy chain in memory. Safe to re-run.
+const BATCH_SIZE = 1000;
+
+async function backfillReferralAncestors() {
+  try {
+    // Connect to MongoDB
+    await mongoose.connect(process.env.MONGODB_URI);
+    console.log('📦 Connected to MongoDB');
+
+    // userId -> referredBy for every referred user
+    const parents = new Map();
+    const cursor = User.find({ referredBy: { $ne: null } })
+      .select('referredBy')
+      .lean()
+      .cursor({ batchSize: 5000 });
+
+    for await (const user of cursor) {
+      parents.set(user._id.toString(), user.referredBy);
+    }
+    console.log(`… loaded ${parents.size} referred users`);
+
+    let ops = [];
+    let updated = 0;
+
+    for (const [userId, referredBy] of parents) {
+      const ancestors = [];
+      let current = referredBy;
+
+      while (current && ancestors.length < MAX_DEPTH) {
+        if (ancestors.some(id => id.equals(current))) break; // corrupt cycle
+        ancestors.push(current);
+        current = parents.get(current.toString());
+      }
+
+      ops.push({
+        updateOne: {
+          filter: { _id: new mongoose.Types.ObjectId(userId) },
+          update: { $set: { ancestors } }
+        }
+      });
+
+      if (ops.length >= BATCH_SIZE) {
+        await User.bulkWrite(ops, { ordered: false });
+        updated += ops.length;
+        ops = [];
+        console.log(`… updated ${updated} users`);
+      }
+    }
+
+    if (ops.length > 0) {
+      await User.bulkWrite(ops, { ordered: false });
+      updated += ops.length;
+    }
+    await User.createIndexes();
+
+    console.log(`✅ Backfilled ancestors for ${updated} users (depth ${MAX_DEPTH})`);
+    process.exit(0);
+  } catch (error) {
+    console.error('❌ Error backfilling ancestors:', error);
+    process.exit(1);
+  }
+}
+
+backfillReferralAncestors();
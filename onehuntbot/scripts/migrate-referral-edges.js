@@ -0,0 +1,106 @@
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+// Import models
+const User = require('../backend/models/User.model');
+const Referral = require('../backend/models/Referral.model');
+const { LEVEL_REWARDS } = require('../backend/services/referral.service');
+
+// Moves the legacy directReferrals/indirectReferrals arrays on User into
+// Referral edges and maintained counters. Safe to re-run: edges are
+// upserted and counters are recomputed from the arrays being migrated.
+const BATCH_SIZE = 500;
+
+const edgeUpsert = (referrer, referee, level) => ({
+  updateOne: {
+    filter: { referrer, referee },
+    update: { $setOnInsert: { level, earnings: LEVEL_REWARDS[level - 1] || 0 } },
+    upsert: true
+  }
+});
+
+async function flush(edgeOps, userOps) {
+  if (edgeOps.length > 0) {
+    await Referral.bulkWrite(edgeOps, { ordered: false });
+  }
+  if (userOps.length > 0) {
+    await User.collection.bulkWrite(userOps, { ordered: false });
+  }
+}
+
+async function migrateReferralEdges() {
+  try {
+    // Connect to MongoDB
+    await mongoose.connect(process.env.MONGODB_URI);
+    console.log('📦 Connected to MongoDB');
+
+    // The arrays are no longer in the schema, so read the raw collection
+    const cursor = User.collection.find(
+      {
+        $or: [
+          { directReferrals: { $exists: true } },
+          { indirectReferrals: { $exists: true } }
+        ]
+      },
+      { projection: { directReferrals: 1, indirectReferrals: 1 } }
+    );
+
+    let edgeOps = [];
+    let userOps = [];
+    let users = 0;
+    let edges = 0;
+
+    for await (const user of cursor) {
+      const direct = user.directReferrals || [];
+      const indirect = user.indirectReferrals || [];
+
+      direct.forEach(referee => edgeOps.push(edgeUpsert(user._id, referee, 1)));
+      indirect.forEach(referee => edgeOps.push(edgeUpsert(user._id, referee, 2)));
+      edges += direct.length + indirect.length;
+
+      userOps.push({
+        updateOne: {
+          filter: { _id: user._id },
+          update: {
+            $set: {
+              directReferralCount: direct.length,
+              indirectReferralCount: indirect.length,
+              totalReferralCount: direct.length + indirect.length
+            },
+            $unset: { directReferrals: '', indirectReferrals: '' }
+          }
+        }
+      });
+      users += 1;
+
+      if (userOps.length >= BATCH_SIZE || edgeOps.length >= BATCH_SIZE * 10) {
+        await flush(edgeOps, userOps);
+        edgeOps = [];
+        userOps = [];
+        console.log(`… migrated ${users} users`);
+      }
+    }
+
+    await flush(edgeOps, userOps);
+
+    // Edges created before per-edge earnings were tracked: each paid the
+    // level reward once, at signup
+    for (let level = 1; level <= LEVEL_REWARDS.length; level++) {
+      await Referral.updateMany(
+        { level, earnings: { $exists: false } },
+        { $set: { earnings: LEVEL_REWARDS[level - 1] } }
+      );
+    }
+
+    await Referral.createIndexes();
+    await User.createIndexes();
+
+    console.log(`✅ Migrated ${users} users (${edges} referral edges)`);
+    process.exit(0);
+  } catch (error) {
+    console.error('❌ Error migrating referrals:', error);
+    process.exit(1);
+  }
+}
+
+migrateReferralEdges();
@@ -0,0 +1,26 @@
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const earningsService = require('../backend/services/earnings.service');
+
+// Recompute per-user earnings summaries from the Reward ledger.
+// Usage: node scripts/reconcile-earnings.js [userId]
+async function reconcileEarnings() {
+  try {
+    // Connect to MongoDB
+    await mongoose.connect(process.env.MONGODB_URI);
+    console.log('📦 Connected to MongoDB');
+
+    const userId = process.argv[2];
+    const startedAt = Date.now();
+    await earningsService.reconcile(userId);
+
+    console.log(`✅ Reconciled earnings for ${userId || 'all users'} in ${Date.now() - startedAt}ms`);
+    process.exit(0);
+  } catch (error) {
+    console.error('❌ Error reconciling earnings:', error);
+    process.exit(1);
+  }
+}
+
+reconcileEarnings();
@@ -0,0 +1,38 @@
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const jobs = require('../backend/jobs');
+
+// Run (or resume) one batch job by hand.
+// Usage: node scripts/run-job.js <job> [runKey YYYY-MM-DD]
+//        node scripts/run-job.js daily|weekly|snapshot|resume
+async function runJob() {
+  const [name, runKey] = process.argv.slice(2);
+
+  if (!name || (!jobs.definitions[name] && !['daily', 'weekly', 'snapshot', 'resume'].includes(name))) {
+    console.error(`Usage: node scripts/run-job.js <${Object.keys(jobs.definitions).join('|')}|daily|weekly|snapshot|resume> [runKey]`);
+    process.exit(1);
+  }
+
+  try {
+    // Connect to MongoDB
+    await mongoose.connect(process.env.MONGODB_URI);
+    console.log('📦 Connected to MongoDB');
+
+    const date = runKey ? new Date(`${runKey}T00:00:00.000Z`) : new Date();
+    let result;
+    if (name === 'daily') result = await jobs.runDaily(date);
+    else if (name === 'weekly') result = await jobs.runWeekly(date);
+    else if (name === 'snapshot') result = await jobs.runSnapshot();
+    else if (name === 'resume') result = await jobs.resumeUnfinished();
+    else result = await jobs.run(name, runKey);
+
+    console.log(result ? JSON.stringify(result, null, 2) : 'ℹ️  Already done or running elsewhere');
+    process.exit(0);
+  } catch (error) {
+    console.error('❌ Error running job:', error);
+    process.exit(1);
+  }
+}
+
+runJob();
@@ -0,0 +1,126 @@
+const http = require('http');
+
+// Local stand-in for the Telegram Bot API
+// Point the app at it with TELEGRAM_API_URL=http://localhost:8081 and
+// BOT_MODE=webhook, then run this script. It answers every Bot API method
+// with { ok: true }, logs what the bot sent, and (with --updates N) posts N
+// sample /start updates across a few chats to the app's /webhook.
+// The tests in test/ require it and use createStub() directly.
+const readBody = req => new Promise((resolve) => {
+  let data = '';
+  req.on('data', chunk => { data += chunk; });
+  req.on('end', () => {
+    if (!data) return resolve({});
+    try {
+      resolve(req.headers['content-type']?.includes('json')
+        ? JSON.parse(data)
+        : Object.fromEntries(new URLSearchParams(data)));
+    } catch (err) {
+      resolve({});
+    }
+  });
+});
+
+// Start a stub server; `sent` maps chat id -> texts received, in order
+const createStub = ({ port = 0, log = false } = {}) => new Promise((resolve) => {
+  let messageId = 0;
+  const sent = new Map();
+
+  const server = http.createServer(async (req, res) => {
+    const match = req.url.match(/^\/bot[^/]+\/(\w+)/);
+    const body = await readBody(req);
+    const method = match ? match[1] : 'unknown';
+
+    let result = true;
+    if (method === 'getMe') {
+      result = { id: 1, is_bot: true, first_name: 'Stub', username: 'stub_bot' };
+    } else if (method === 'getUpdates') {
+      result = [];
+    } else if (method === 'sendMessage') {
+      const chatId = String(body.chat_id);
+      if (!sent.has(chatId)) sent.set(chatId, []);
+      sent.get(chatId).push(body.text);
+      result = { message_id: ++messageId, chat: { id: body.chat_id }, date: Math.floor(Date.now() / 1000), text: body.text };
+    }
+
+    if (log) console.log(`📨 ${method}`, method === 'sendMessage' ? `chat=${body.chat_id}` : '');
+    res.writeHead(200, { 'Content-Type': 'application/json' });
+    res.end(JSON.stringify({ ok: true, result }));
+  });
+
+  server.listen(port, () => resolve({
+    server,
+    sent,
+    url: `http://localhost:${server.address().port}`,
+    close: () => new Promise(done => server.close(done))
+  }));
+});
+
+// Sample /start and /help updates, round-robin over `chats` chats.
+// update_ids keep increasing across calls, like Telegram's
+let lastUpdateId = Date.now();
+
+const sampleUpdates = (count, chats = 5) => {
+  const base = Date.now();
+  return Array.from({ length: count }, (_, index) => {
+    const i = index + 1;
+    const chatId = 1000 + (i % chats);
+    return {
+      update_id: ++lastUpdateId,
+      message: {
+        message_id: i,
+        date: Math.floor(base / 1000),
+        chat: { id: chatId, type: 'private' },
+        from: { id: chatId, is_bot: false, first_name: `User${chatId}` },
+        text: i % 2 ? '/start' : '/help'
+      }
+    };
+  });
+};
+
+// POST updates to a webhook one at a time, as Telegram does; returns the
+// response status for each
+const postUpdates = async (webhookUrl, updates, secret = process.env.TELEGRAM_WEBHOOK_SECRET) => {
+  const headers = { 'Content-Type': 'application/json' };
+  if (secret) headers['X-Telegram-Bot-Api-Secret-Token'] = secret;
+
+  const statuses = [];
+  for (const update of updates) {
+    const res = await fetch(webhookUrl, { method: 'POST', headers, body: JSON.stringify(update) });
+    statuses.push(res.status);
+  }
+  return statuses;
+};
+
+module.exports = { createStub, sampleUpdates, postUpdates };
+
+if (require.main === module) {
+  require('dotenv').config();
+  const PORT = parseInt(process.env.TELEGRAM_STUB_PORT) || 8081;
+  const WEBHOOK_URL = process.env.TELEGRAM_STUB_WEBHOOK || `http://localhost:${process.env.PORT || 3000}/webhook`;
+
+  const args = process.argv.slice(2);
+  const updateCount = args.includes('--updates') ? parseInt(args[args.indexOf('--updates') + 1]) || 10 : 0;
+
+  createStub({ port: PORT, log: true }).then(async (stub) => {
+    console.log(`🧪 Telegram Bot API stub listening on ${stub.url}`);
+
+    if (updateCount) {
+      try {
+        const statuses = {};
+        for (const status of await postUpdates(WEBHOOK_URL, sampleUpdates(updateCount))) {
+          statuses[status] = (statuses[status] || 0) + 1;
+        }
+        console.log('📬 Webhook responses:', statuses);
+      } catch (err) {
+        console.error('❌ Posting updates failed:', err.message);
+      }
+    }
+
+    process.once('SIGINT', () => {
+      console.log('\n📊 Messages sent per chat:');
+      for (const [chatId, texts] of stub.sent) console.log(`  ${chatId}: ${texts.length}`);
+      process.exit(0);
+    });
+  });
+}
@@ -0,0 +1,76 @@
+const mongoose = require('mongoose');
+require('dotenv').config();
+
+const User = require('../backend/models/User.model');
+const ledger = require('../backend/services/ledger.service');
+
+// Compare stored balances with the ledger (snapshot + tail scan per user).
+// Usage: node scripts/verify-ledger.js [userId] [--fix]
+// --fix posts an "opening" entry (users with no ledger history yet) or an
+// "adjustment" entry for each difference; the ledger itself is never edited.
+const BATCH_SIZE = 200;
+const CONCURRENCY = 10;
+
+async function verifyLedger() {
+  const args = process.argv.slice(2);
+  const fix = args.includes('--fix');
+  const userId = args.find(arg => !arg.startsWith('--'));
+
+  try {
+    // Connect to MongoDB
+    await mongoose.connect(process.env.MONGODB_URI);
+    console.log('📦 Connected to MongoDB');
+
+    const stats = { checked: 0, mismatched: 0, fixed: 0 };
+
+    const check = async (id) => {
+      const result = await ledger.verify(id);
+      if (!result) return;
+      stats.checked++;
+      if (result.ok) return;
+
+      stats.mismatched++;
+      console.log(`⚠️  ${id}: stored ${result.stored}, ledger ${result.ledger} (difference ${result.difference})`);
+
+      if (fix) {
+        const hasHistory = result.ledger !== 0 || result.tailEntries > 0;
+        await ledger.post({
+          user: id,
+          amount: result.difference,
+          type: hasHistory ? 'adjustment' : 'opening',
+          description: 'Ledger reconciliation'
+        });
+        stats.fixed++;
+      }
+    };
+
+    if (userId) {
+      await check(userId);
+    } else {
+      let lastId = null;
+      for (;;) {
+        const users = await User.find(lastId ? { _id: { $gt: lastId } } : {})
+          .select('_id')
+          .sort({ _id: 1 })
+          .limit(BATCH_SIZE)
+          .lean();
+        if (users.length === 0) break;
+        lastId = users[users.length - 1]._id;
+
+        for (let i = 0; i < users.length; i += CONCURRENCY) {
+          await Promise.all(users.slice(i, i + CONCURRENCY).map(user => check(user._id)));
+        }
+        console.log(`🔎 Checked ${stats.checked} users...`);
+      }
+    }
+
+    await ledger.writer.close();
+    console.log(`✅ Checked ${stats.checked} users: ${stats.mismatched} mismatched, ${stats.fixed} fixed`);
+    process.exit(0);
+  } catch (error) {
+    console.error('❌ Error verifying ledger:', error);
+    process.exit(1);
+  }
+}
+
+verifyLedger();
@@ -0,0 +1,42 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const AliasTable = require('../backend/utils/aliasTable');
+
+// Default spin table weights (see backend/services/spin.service.js)
+const WEIGHTS = [30, 25, 15, 10, 8, 6, 4, 2];
+
+test('secureRandom returns uniform values in [0, 1)', () => {
+  for (let i = 0; i < 10000; i++) {
+    const value = AliasTable.secureRandom();
+    assert.ok(value >= 0 && value < 1, `out of range: ${value}`);
+  }
+});
+
+test('draws follow the weights with the default random source', () => {
+  const table = new AliasTable(WEIGHTS);
+  const draws = 200000;
+  const counts = new Array(WEIGHTS.length).fill(0);
+
+  for (let i = 0; i < draws; i++) counts[table.sample()]++;
+
+  const total = WEIGHTS.reduce((sum, weight) => sum + weight, 0);
+  WEIGHTS.forEach((weight, index) => {
+    const expected = (weight / total) * draws;
+    // Well over 5 standard deviations for every bucket
+    assert.ok(Math.abs(counts[index] - expected) < 6 * Math.sqrt(expected) + 1,
+      `bucket ${index}: ${counts[index]} draws, expected about ${Math.round(expected)}`);
+  });
+});
+
+test('zero-weight entries are never drawn', () => {
+  const table = new AliasTable([0, 1, 0, 3]);
+  for (let i = 0; i < 20000; i++) {
+    assert.ok([1, 3].includes(table.sample()));
+  }
+});
+
+test('rejects empty or non-positive weights', () => {
+  assert.throws(() => new AliasTable([]));
+  assert.throws(() => new AliasTable([0, 0]));
+  assert.throws(() => new AliasTable([1, -1]));
+});
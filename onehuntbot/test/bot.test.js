@@ -0,0 +1,135 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const express = require('express');
+const UpdateQueue = require('../backend/bot/updateQueue');
+const LRUCache = require('../backend/utils/lruCache');
+const { createStub, sampleUpdates, postUpdates } = require('../scripts/telegram-api-stub');
+
+// Ingestion pipeline against the local Bot API stand-in: updates are posted
+// to the webhook handler server.js mounts, dispatched to the bot commands,
+// and the replies reach the stub through a real TelegramBot client
+// (baseApiUrl) and the outbox.
+const SECRET = 'test-secret';
+
+let stub;
+let telegram;
+let webhook;
+
+// Mount a webhook handler the way server.js does
+const listen = handler => new Promise((resolve) => {
+  const app = express();
+  app.use(express.json());
+  app.post('/webhook', handler);
+  const server = app.listen(0, () => resolve({
+    url: `http://localhost:${server.address().port}/webhook`,
+    close: () => new Promise(done => server.close(done))
+  }));
+});
+
+// The command a reply from commands.dispatch answers
+const commandOf = text => (text.startsWith('Welcome') ? '/start' : text.includes('Commands') ? '/help' : text);
+
+const repliesTo = chatId => (stub.sent.get(String(chatId)) || []).map(commandOf);
+
+const settle = async () => {
+  await telegram.updateQueue.onIdle();
+  await telegram.outbox.drain();
+};
+
+test.before(async () => {
+  stub = await createStub();
+  Object.assign(process.env, {
+    TELEGRAM_BOT_TOKEN: 'test',
+    TELEGRAM_API_URL: stub.url,
+    TELEGRAM_WEBHOOK_SECRET: SECRET,
+    BOT_MODE: 'webhook',
+    TELEGRAM_GLOBAL_RATE: '1000',
+    TELEGRAM_CHAT_RATE: '1000',
+    TELEGRAM_CHAT_BURST: '1000'
+  });
+  telegram = require('../backend/bot');
+  webhook = await listen(telegram.webhook);
+});
+
+test.after(async () => {
+  await telegram.stop();
+  await webhook.close();
+  await stub.close();
+});
+
+test.beforeEach(() => stub.sent.clear());
+
+test('replies reach each chat in the order its updates arrived', { timeout: 10000 }, async () => {
+  const updates = sampleUpdates(60, 5);
+  const statuses = await postUpdates(webhook.url, updates, SECRET);
+  assert.ok(statuses.every(status => status === 200));
+
+  await settle();
+
+  for (const chatId of new Set(updates.map(update => update.message.chat.id))) {
+    const expected = updates
+      .filter(update => update.message.chat.id === chatId)
+      .map(update => update.message.text);
+    assert.deepStrictEqual(repliesTo(chatId), expected);
+  }
+});
+
+test('updates without the secret token are rejected', { timeout: 10000 }, async () => {
+  const updates = sampleUpdates(2, 1);
+  assert.deepStrictEqual(await postUpdates(webhook.url, updates.slice(0, 1), null), [401]);
+  assert.deepStrictEqual(await postUpdates(webhook.url, updates.slice(1), 'wrong'), [401]);
+
+  await settle();
+  assert.strictEqual(stub.sent.size, 0);
+});
+
+test('redelivered update_ids are acknowledged once and handled once', { timeout: 10000 }, async () => {
+  const [update] = sampleUpdates(1);
+  const statuses = await postUpdates(webhook.url, [update, update, update], SECRET);
+  assert.deepStrictEqual(statuses, [200, 200, 200]);
+
+  await settle();
+  assert.deepStrictEqual(repliesTo(update.message.chat.id), [update.message.text]);
+});
+
+test('a full leader queue answers 503 and accepts the retry once it has room', { timeout: 10000 }, async () => {
+  const cluster = require('../backend/services/cluster.service');
+  const webhookHandler = require('../backend/bot/webhook');
+  const { dispatch } = require('../backend/bot/commands');
+
+  let release;
+  const gate = new Promise(resolve => { release = resolve; });
+  const queue = new UpdateQueue({
+    handler: async (update) => {
+      await gate;
+      await dispatch(telegram.outbox, update);
+    },
+    concurrency: 1,
+    maxSize: 2,
+    recent: new LRUCache({ max: 1000, ttl: 60 * 1000 })
+  });
+
+  // Same path as a follower worker: ask the leader to queue the update
+  cluster.subscribe('test:update', update => queue.push(update));
+  const small = await listen(webhookHandler({
+    ingest: update => cluster.askLeader('test:update', update),
+    secret: SECRET
+  }));
+
+  try {
+    const updates = sampleUpdates(4, 1);
+    assert.deepStrictEqual(await postUpdates(small.url, updates, SECRET), [200, 200, 503, 503]);
+
+    release();
+    await queue.onIdle();
+
+    // Telegram retries the rejected updates; they were not remembered
+    assert.deepStrictEqual(await postUpdates(small.url, updates.slice(2), SECRET), [200, 200]);
+    await queue.onIdle();
+    await telegram.outbox.drain();
+
+    assert.deepStrictEqual(repliesTo(updates[0].message.chat.id), updates.map(update => update.message.text));
+  } finally {
+    await small.close();
+  }
+});